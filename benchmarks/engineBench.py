@@ -0,0 +1,128 @@
+import json
+import os
+import platform
+import sys
+import time
+import argparse   as ap
+import logging    as lg
+import subprocess as sp
+import typing     as ty
+
+# Kept on the path, as the engine imports some modules only when used
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import engine
+import render
+import vecphys
+
+DEFAULT_COUNTS = (10, 100, 1000, 10000, 100000)
+# Body counts with object-to-object collisions, which pile up past these in
+# the default window
+COLLIDE_COUNTS = (10, 100, 1000)
+
+
+def timeIt(fn: ty.Callable[[], ty.Any], repeat: int,
+           setup: ty.Callable[[], ty.Any] | None = None) -> dict[str, float]:
+    """
+    > param fn: Function to time
+    > param repeat: Number of calls
+    > param setup: Function to call (untimed) before each call
+    > return: Minimum and mean seconds per call
+    """
+    times: list[float]
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "mean": sum(times) / len(times)}
+
+
+def benchCount(n: int, backend: str, seed: int, size: tuple[int, int],
+               repeat: int, collide: bool = False) -> dict[str, ty.Any]:
+    """
+    Time Engine.update, Engine._doesObjCrossBndries and Engine._consScr for a 
+    default scene of n squares, rendering into an off-screen window.
+    > param collide: Whether objects collide with each other
+    > return: Result record
+    """
+    eng = engine.Engine(render.OffscreenWin(*size), lg.getLogger("bench"),
+                        {"seed": seed, "backend": backend,
+                         "collide": collide})
+    eng._spawnDefaultScene(n)
+    cnt = len(eng.movObjs)
+
+    def bndries() -> None:
+        check = eng._doesObjCrossBndries
+        for obj in eng.movObjs:
+            check(obj)
+
+    # One warm-up step, so that the first render does not draw every cell
+    eng.update(engine.DEFAULT_DT)
+    eng._consScr(0.0)
+    phases = {
+        "update": timeIt(lambda: eng.update(engine.DEFAULT_DT), repeat),
+        "bndries": timeIt(bndries, repeat),
+        # Rendered frames follow a step, so that there is something to redraw
+        "consScr": timeIt(lambda: eng._consScr(0.0), repeat,
+                          lambda: eng.update(engine.DEFAULT_DT))
+    }
+    return {"bodies": n, "objects": cnt, "backend": backend,
+            "collide": collide, "phases": phases,
+            "nsPerObj": {name: t["min"] / cnt * 1e9
+                         for name, t in phases.items()}}
+
+
+def meta() -> dict[str, ty.Any]:
+    try:
+        commit = sp.run(("git", "rev-parse", "HEAD"), capture_output=True,
+                        text=True, check=True,
+                        cwd=os.path.dirname(os.path.abspath(__file__))
+                        ).stdout.strip()
+    except (OSError, sp.CalledProcessError):
+        commit = None
+    return {"commit": commit, "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": vecphys.np.__version__ if vecphys.AVAILABLE else None}
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Benchmark the engine phases "
+                                           "separately, at several body counts")
+    parser.add_argument("-n", "--bodies", type=int, nargs='+', default=None,
+                        help="Body counts. Default: "
+                             f"{', '.join(map(str, DEFAULT_COUNTS))}, or "
+                             f"{', '.join(map(str, COLLIDE_COUNTS))} with "
+                             "--collide")
+    parser.add_argument("-b", "--backend", nargs='+', default=["scalar"],
+                        choices=["scalar", "numpy"], help="Physics backends")
+    parser.add_argument("-c", "--collide", action="store_true",
+                        default=False,
+                        help="Enable object-to-object collisions")
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="Calls to time per phase")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="Seed for the random number generator")
+    parser.add_argument("--size", type=int, nargs=2, default=[40, 120],
+                        metavar=("LINES", "COLS"),
+                        help="Size of the off-screen window")
+    parser.add_argument("-o", "--output", default="bench.json",
+                        help="JSON file to write the results to")
+    args    = parser.parse_args()
+    counts  = args.bodies or (COLLIDE_COUNTS if args.collide
+                              else DEFAULT_COUNTS)
+    results = []
+    for backend in args.backend:
+        for n in counts:
+            results.append(res := benchCount(n, backend, args.seed,
+                                             tuple(args.size), args.repeat,
+                                             args.collide))
+            print(f"{backend:>6} {n:>7}: " + "  ".join(
+                f"{name}={t['min'] * 1e3:.3f}ms"
+                for name, t in res["phases"].items()))
+    with open(args.output, 'w') as f:
+        json.dump({"meta": meta(), "results": results}, f, indent=1)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,126 @@
+import json
+import math
+import os
+import sys
+import time
+import argparse as ap
+import logging  as lg
+import typing   as ty
+
+# Kept on the path, as the engine imports some modules only when used
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import engine
+import objects as objs
+import physics
+import vecphys
+
+
+def energy(eng: engine.Engine, origin: list[float]) -> list[float]:
+    """
+    > param origin: Interleaved positions the potentials are measured from
+    > return: Energy per unit mass of every body: kinetic, plus the potential
+              of its (constant) acceleration, -a . (p - origin)
+    """
+    store = eng.store
+    pos, vel, accl = store.pos, store.vel, store.accl
+    return [0.5 * (vel[j] ** 2 + vel[j + 1] ** 2)
+            - (accl[j] * (pos[j] - origin[j])
+               + accl[j + 1] * (pos[j + 1] - origin[j + 1]))
+            for j in range(0, 2 * store.cnt, 2)]
+
+
+def exact(p: float, v: float, a: float, drag: float, t: float) -> float:
+    """
+    > return: Coordinate after t seconds of a body starting at p with 
+              velocity v, accelerated by a less drag times its velocity
+    """
+    if not drag:
+        return p + v * t + a * t * t / 2
+    return p + a / drag * t + (v - a / drag) * -math.expm1(-drag * t) / drag
+
+
+def benchIntegrator(integrator: str, backend: str, n: int, steps: int,
+                    dt: float, seed: int, drag: float = 0.0) \
+        -> dict[str, ty.Any]:
+    """
+    Fly n squares ballistically, in a world large enough for none of them to
+    reach a boundary, and measure the energy drift, the error from the exact
+    trajectories and the step rate.
+    NOTE: With drag, the energy is lost on purpose, and only the error tells
+          the integrators apart.
+    > return: Result record
+    """
+    eng = engine.Engine(None, lg.getLogger("bench"),
+                        {"seed": seed, "backend": backend, "sleep": False,
+                         "integrator": integrator, "drag": drag,
+                         # Collisions would change the energy of the bodies
+                         "collide": False,
+                         "worldSize": (10 ** 7, 10 ** 7)})
+    rng = eng.rng
+    for i in range(n):
+        eng._createMovObj(objs.Sq, f"test{i}",
+                          [5 * 10 ** 6 + rng.uniform(-100, 100),
+                           5 * 10 ** 6 + rng.uniform(-100, 100)],
+                          [rng.uniform(-50, 50), rng.uniform(-50, 50)],
+                          [rng.uniform(-10, 10), rng.uniform(-10, 10)], 1, 1)
+    origin = eng.store.pos[:2 * n].tolist()
+    vel0   = eng.store.vel[:2 * n].tolist()
+    before = energy(eng, origin)
+    start  = time.perf_counter()
+    for _ in range(steps):
+        eng.update(dt)
+    elapsed = time.perf_counter() - start
+    # Relative to the initial energy, which is all kinetic
+    drift   = [abs(b - a) / max(abs(a), 1e-12)
+               for a, b in zip(before, energy(eng, origin))]
+    accl    = eng.store.accl
+    error   = [abs(p - exact(origin[j], vel0[j], accl[j], drag, steps * dt))
+               for j, p in enumerate(eng.store.pos[:2 * n])]
+    eng.close()
+    return {"integrator": integrator, "backend": backend, "bodies": n,
+            "steps": steps, "dt": dt, "drag": drag,
+            "stepsPerSec": steps / elapsed if elapsed else float("inf"),
+            "meanDrift": sum(drift) / len(drift), "maxDrift": max(drift),
+            "meanError": sum(error) / len(error), "maxError": max(error)}
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Compare the energy drift and the "
+                                           "throughput of the integrators")
+    parser.add_argument("-i", "--integrator", nargs='+',
+                        default=list(physics.INTEGRATORS),
+                        choices=physics.INTEGRATORS, help="Integrators")
+    parser.add_argument("-b", "--backend", nargs='+',
+                        default=["numpy" if vecphys.AVAILABLE else "scalar"],
+                        choices=["scalar", "numpy"], help="Physics backends")
+    parser.add_argument("-n", "--bodies", type=int, default=10000,
+                        help="Number of bodies")
+    parser.add_argument("--steps", type=int, default=600,
+                        help="Number of steps")
+    parser.add_argument("--dt", type=float, default=1 / 60,
+                        help="Timestep in seconds")
+    parser.add_argument("--drag", type=float, default=0.0,
+                        help="Linear drag, in 1 / seconds; without it, "
+                             "verlet and rk4 are both exact")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="Seed for the random number generator")
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file to write the results to")
+    args    = parser.parse_args()
+    results = []
+    for backend in args.backend:
+        for integrator in args.integrator:
+            results.append(res := benchIntegrator(
+                integrator, backend, args.bodies, args.steps, args.dt,
+                args.seed, args.drag))
+            print(f"{backend:>6} {integrator:>6}: "
+                  f"{res['stepsPerSec']:10.2f} steps/s  "
+                  f"drift mean={res['meanDrift']:.3e} "
+                  f"max={res['maxDrift']:.3e}  "
+                  f"error mean={res['meanError']:.3e} "
+                  f"max={res['maxError']:.3e}")
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,69 @@
+import os
+import sys
+import argparse  as ap
+import tracemalloc
+
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import objects as objs
+import store   as st
+sys.path.pop(1)
+
+
+class LegacySq:
+    """
+    Replica of the original dictionary-and-list based Sq, for the "before"
+    measurement.
+    """
+    def __init__(self, name: str, pos: list[float], vel: list[float],
+                 accl: list[float], cor: float, side: int,
+                 char: str = '#') -> None:
+        self.name  = name
+        self.txt   = ''
+        self.lns   = 0
+        self.cols  = 0
+        self.pos   = pos
+        self.vel   = vel
+        self.accl  = accl
+        self.cor   = cor
+        self.char  = char
+        self.invis = False
+        self.side  = side
+        self.txt   = '\n'.join([self.char * self.side for _ in range(self.side)])
+        self.lns   = len(self.txt.splitlines())
+        self.cols  = max([len(i) for i in self.txt.splitlines()])
+
+
+def measure(n: int, compact: bool) -> int:
+    """
+    > param n: Number of bodies to create
+    > param compact: Whether to use the store-backed objects
+    > return: Bytes allocated per body
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    if compact:
+        bodyStore = st.BodyStore(n)
+        bodies    = [objs.Sq(f"test{i}", [float(i), 2.0], [5.5, 6.5],
+                             [0.0, 10.0], 1, 2, store=bodyStore)
+                     for i in range(n)]
+    else:
+        bodies    = [LegacySq(f"test{i}", [float(i), 2.0], [5.5, 6.5],
+                              [0.0, 10.0], 1, 2) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del bodies
+    return used // n
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Bytes per body, before and after "
+                                           "the store-backed objects")
+    parser.add_argument("-n", "--bodies", type=int, default=30000,
+                        help="Number of bodies to create")
+    args   = parser.parse_args()
+    before = measure(args.bodies, False)
+    after  = measure(args.bodies, True)
+    print(f"Bodies: {args.bodies}")
+    print(f"Before: {before} B/body")
+    print(f"After:  {after} B/body ({after / before:.0%})")
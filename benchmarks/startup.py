@@ -0,0 +1,129 @@
+import json
+import os
+import select
+import statistics
+import sys
+import time
+import argparse   as ap
+import subprocess as sp
+import typing     as ty
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = ROOT + os.sep + "main.py"
+# Commands timed from start to exit, by name
+CASES = {
+    "interpreter": ["-c", "pass"],
+    "help"       : [MAIN, "--help"],
+    "headless"   : [MAIN, "--headless", "1", "--bodies", "0"]
+}
+# Text of the player, which is on screen once the first frame is drawn
+FIRST_FRAME_MARK = b"PLA"
+
+
+def timeCommand(args: list[str], repeat: int) -> list[float]:
+    """
+    > param args: Arguments to the interpreter
+    > param repeat: Number of runs
+    > return: Seconds each run took, from start to exit
+    """
+    times: list[float]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sp.run([sys.executable, *args], stdout=sp.DEVNULL, stderr=sp.DEVNULL,
+               check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def timeFirstFrame(repeat: int, timeout: float = 10.0) -> list[float]:
+    """
+    Run main.py in a pseudo-terminal, and time how long it takes to draw its
+    first frame (until FIRST_FRAME_MARK is written). Needs a POSIX system.
+    > param repeat: Number of runs
+    > param timeout: Seconds to wait for a frame before giving up on a run
+    > return: Seconds to the first frame of each run
+    """
+    import pty
+    import signal
+    times: list[float]
+    times = []
+    for _ in range(repeat):
+        start   = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.environ.setdefault("TERM", "xterm")
+            os.execv(sys.executable, [sys.executable, MAIN, "--bodies", "0"])
+        out = b''
+        while FIRST_FRAME_MARK not in out and \
+                time.perf_counter() - start < timeout:
+            if select.select([fd], [], [], 0.05)[0]:
+                try:
+                    out += os.read(fd, 1 << 16)
+                except OSError:
+                    break
+        if FIRST_FRAME_MARK in out:
+            times.append(time.perf_counter() - start)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        os.close(fd)
+    return times
+
+
+def importTimes(top: int) -> list[tuple[str, int]]:
+    """
+    > param top: Number of modules to return
+    > return: Modules imported directly by main.py and engine.py (and their
+              imports) during a headless start, with their cumulative import
+              time in microseconds, slowest first
+    """
+    res   = sp.run([sys.executable, "-X", "importtime", *CASES["headless"]],
+                   capture_output=True, text=True, check=True)
+    times = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Top-level imports, and the imports of engine.py
+        if len(name) - len(name.lstrip()) <= 3:
+            times.append((name.strip(), int(cumulative)))
+    times.sort(key=lambda t: t[1], reverse=True)
+    return times[:top]
+
+
+def summary(times: list[float]) -> dict[str, ty.Any]:
+    return {"runs": len(times), "min": min(times, default=float("nan")),
+            "median": statistics.median(times) if times else float("nan")}
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Measure the cold start of main.py")
+    parser.add_argument("-r", "--repeat", type=int, default=10,
+                        help="Number of runs of each case")
+    parser.add_argument("--first-frame", action="store_true", default=False,
+                        help="Also time the first frame drawn in a "
+                             "pseudo-terminal (POSIX only)")
+    parser.add_argument("--imports", type=int, default=0,
+                        help="Also list the given number of slowest imports")
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file to write the results to")
+    args    = parser.parse_args()
+    results = {name: summary(timeCommand(cmd, args.repeat))
+               for name, cmd in CASES.items()}
+    if args.first_frame:
+        if os.name == "posix":
+            results["firstFrame"] = summary(timeFirstFrame(args.repeat))
+        else:
+            print("The first frame can only be timed on POSIX systems")
+    for name, res in results.items():
+        print(f"{name:>12}: min {res['min'] * 1e3:8.1f} ms  "
+              f"median {res['median'] * 1e3:8.1f} ms  ({res['runs']} runs)")
+    if args.imports:
+        results["imports"] = importTimes(args.imports)
+        print("Slowest imports (cumulative):")
+        for name, us in results["imports"]:
+            print(f"{name:>24}: {us / 1e3:8.1f} ms")
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"Results written to {args.output}")
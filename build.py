@@ -1,9 +1,14 @@
+import hashlib
+import importlib.metadata
+import json
 import os
 import sys
+import sysconfig
 import argparse   as ap
 import shutil     as sh
 import subprocess as sp
 import traceback  as tb
+from concurrent import futures as cf
 
 BOLD      = "\033[1m"
 BLINK     = "\033[5m"
@@ -15,6 +20,16 @@ RESET     = "\033[0m"
 UNDERLINE = "\033[4m"
 YELLOW    = "\033[93m"
 
+# Compiled core modules are kept here between builds, with the hash of the 
+# source and flags each one was compiled from in the manifest, so that only
+# the modules which changed are compiled again
+CACHE_DIR  = "core_cache"
+MANIFEST   = CACHE_DIR + os.sep + "manifest.json"
+# Suffix Nuitka gives compiled modules (e.g. .cp312-win_amd64.pyd, 
+# .cpython-312-x86_64-linux-gnu.so), and the one they are renamed to
+EXT_SUFFIX = sysconfig.get_config_var("EXT_SUFFIX") or ".pyd"
+EXT        = ".pyd" if sys.platform == "win32" else ".so"
+
 
 def reportCalledProcessError(e: sp.CalledProcessError) -> None:
     print(f"{BOLD + RED}FAIL:{RESET} Build failed on command: {' '.join(e.cmd)}")
@@ -22,9 +37,61 @@ def reportCalledProcessError(e: sp.CalledProcessError) -> None:
     print(f"{BOLD + RED}STDERR:{RESET}{('\n' + e.stderr) if e.stderr else ''}")
 
 
+def nuitkaVersion() -> str:
+    """
+    > return: Version of the Nuitka the modules are compiled with, or '' if 
+              it is not installed
+    """
+    try:
+        return importlib.metadata.version("nuitka")
+    except importlib.metadata.PackageNotFoundError:
+        return ''
+
+
+def moduleHash(path: str, flags: list[str]) -> str:
+    """
+    > param path: Path of the module's source
+    > param flags: Everything besides the source the compiled module depends
+                   on (interpreter, Nuitka version, compile command)
+    > return: Hash of the module's source and the flags
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read())
+    h.update('\0'.join(flags).encode("utf-8"))
+    return h.hexdigest()
+
+
+def compileModule(command: list[str], env: dict[str, str], capture: bool,
+                  name: str) -> tuple[int, list[str], str, str] | None:
+    """
+    Compile a core module into CACHE_DIR, and rename it to <name>EXT. Runs in
+    a worker process of compileCore.
+    > return: None on success; else the return code, command, stdout and 
+              stderr of the failed command, as CalledProcessError does not
+              keep its output across processes
+    """
+    try:
+        sp.run(command, env=env, capture_output=capture, text=True, check=True)
+    except sp.CalledProcessError as e:
+        return e.returncode, e.cmd, e.stdout, e.stderr
+    os.replace(CACHE_DIR + os.sep + name + EXT_SUFFIX,
+               CACHE_DIR + os.sep + name + EXT)
+    if os.path.isfile(stub := CACHE_DIR + os.sep + name + ".pyi"):
+        os.remove(stub)
+    return None
+
+
 def compileCore(env: dict[str, str], normout: bool, noquiet: bool,
-                warnings: str, noremovecomments: bool) -> int:
+                warnings: str, noremovecomments: bool, jobs: int | None,
+                force: bool) -> int:
     """
+    Compile the modules in core/ into core_, in parallel. Modules whose 
+    source and flags are unchanged since they were last compiled are copied
+    from CACHE_DIR instead (see moduleHash).
+    > param jobs: Number of modules compiled at once; defaults to the number
+                  of CPUs
+    > param force: Compile every module, ignoring the cache
     > return: Error code:
           0: Success
           1: CalledProcessError (An error was encountered while running the 
@@ -32,50 +99,90 @@ def compileCore(env: dict[str, str], normout: bool, noquiet: bool,
           2: Permission error
           -1: Unknown error
     """
+    manifest: dict[str, str]
     try:
         sh.rmtree("core_", ignore_errors=False)
-        os.makedirs("core_", exist_ok=False)
     except FileNotFoundError:
         pass
     except PermissionError:
         print("Access is denied to directory 'core_'")
         return 2
+    try:
+        os.makedirs("core_", exist_ok=False)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except PermissionError as e:
+        print(f"({e.__class__.__name__}) {e}")
+        return 2
+    manifest = {}
+    if not force and os.path.isfile(MANIFEST):
+        try:
+            with open(MANIFEST) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            print(f"{YELLOW}Cannot read {MANIFEST}; compiling every module{RESET}")
     print(f"{BOLD + GREEN}Using Python at {sys.executable} for CORE FILES{RESET}")
+    flags   = [sys.executable, sys.version, nuitkaVersion()]
+    modules = {}
+    todo    = []
     for fileOrDir in os.scandir("core"):
-        if not os.path.isfile(fileOrDir):
+        if not fileOrDir.is_file() or not fileOrDir.name.endswith(".py"):
             continue
-        try:
-            command = [
-                sys.executable,
-                "-OO" if not noremovecomments else '',
-                "-W",
-                warnings,
-                "-m",
-                "nuitka",
-                "--module",
-                "--remove-output" if not normout else '',
-                "--output-dir=core_",
-                "--quiet" if not noquiet else '',
-                fileOrDir.path
-            ]
-            command = [i for i in command if i]
-            print(f"Execute: {' '.join(command)}")
-            sp.run(command, env=env, capture_output=True if not noquiet else False,
-                   text=True, check=True)
-            os.rename("core_" + os.sep + f"{fileOrDir.name[:-3]}.cp312-win_amd64.pyd",
-                      "core_" + os.sep + f"{fileOrDir.name[:-3]}.pyd")
-            os.remove("core_" + os.sep + fileOrDir.name[:-3] + ".pyi")
-        except sp.CalledProcessError as e:
-            reportCalledProcessError(e)
-            return 1
-        except PermissionError as e:
-            print(f"({e.__class__.__name__}) {e}")
-            return 2
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            print(f"({e.__class__.__name__}) {e}")
-            return -1
+        name    = fileOrDir.name[:-3]
+        command = [
+            sys.executable,
+            "-OO" if not noremovecomments else '',
+            "-W",
+            warnings,
+            "-m",
+            "nuitka",
+            "--module",
+            "--remove-output" if not normout else '',
+            f"--output-dir={CACHE_DIR}",
+            "--quiet" if not noquiet else '',
+            fileOrDir.path
+        ]
+        command       = [i for i in command if i]
+        # The command but the source, which is hashed by itself
+        modules[name] = moduleHash(fileOrDir.path, flags + command[:-1])
+        if manifest.get(name) == modules[name] and \
+                os.path.isfile(CACHE_DIR + os.sep + name + EXT):
+            print(f"Up to date: {fileOrDir.path}")
+            continue
+        todo.append((name, command))
+    # Modules no longer in core/
+    manifest = {name: digest for name, digest in manifest.items()
+                if name in modules}
+
+    err = 0
+    try:
+        with cf.ProcessPoolExecutor(jobs) as pool:
+            running = {}
+            for name, command in todo:
+                print(f"Execute: {' '.join(command)}")
+                running[pool.submit(compileModule, command, env, not noquiet,
+                                    name)] = name
+            for future in cf.as_completed(running):
+                if (failed := future.result()) is not None:
+                    reportCalledProcessError(sp.CalledProcessError(*failed))
+                    pool.shutdown(cancel_futures=True)
+                    err = 1
+                    break
+                # Saved as each module is done, so that a failed build 
+                # keeps the modules compiled before it failed
+                manifest[running[future]] = modules[running[future]]
+                with open(MANIFEST, 'w') as f:
+                    json.dump(manifest, f, indent=1)
+        if err:
+            return err
+        for name in modules:
+            sh.copy2(CACHE_DIR + os.sep + name + EXT, "core_")
+    except PermissionError as e:
+        print(f"({e.__class__.__name__}) {e}")
+        return 2
+    except Exception as e:
+        tb.print_exc()
+        print(f"({e.__class__.__name__}) {e}")
+        return -1
     return 0
 
 
@@ -128,58 +235,67 @@ def compileMainProg(env: dict[str, str], file: str, normout: bool,
         return -1
 
 
-built  = False
-try:
-    env    = os.environ.copy()
-    parser = ap.ArgumentParser()
-    parser.add_argument("file", help="Main program file to compile")
-    parser.add_argument("-nro", "--normout", help="Remove output (<file>.build)",
-                        action="store_true", default=False)
-    parser.add_argument("-nfi", "--nofollowimports", help="Do not follow imports",
-                        action="store_true", default=False)
-    parser.add_argument("-nq", "--noquiet", help="Do not quiet compile",
-                        action="store_true", default=False)
-    parser.add_argument("-w",  "--warnings", "--warn", help="Enable warnings",
-                        default="error", choices=["ignore", "default", "error"],
-                        type=str.lower)
-    parser.add_argument("-nrc", "--noremovecomments", help="Remove comments",
-                        action="store_true", default=False)
-    parser.add_argument("-ns", "--nostandalone", help="Nuitka standalone option",
-                        action="store_true", default=False)
-    parser.add_argument("-r", "--run", help="Run the compiled program",
-                        action="store_true", default=False)
-    parser.add_argument("-ra", "--runargs", help="Arguments to pass to the program",
-                        default="", type=str)
-    args   = parser.parse_args()
+if __name__ == "__main__":
+    # Guarded, as the worker processes of compileCore import this module
+    built  = False
+    try:
+        env    = os.environ.copy()
+        parser = ap.ArgumentParser()
+        parser.add_argument("file", help="Main program file to compile")
+        parser.add_argument("-nro", "--normout", help="Remove output (<file>.build)",
+                            action="store_true", default=False)
+        parser.add_argument("-nfi", "--nofollowimports", help="Do not follow imports",
+                            action="store_true", default=False)
+        parser.add_argument("-nq", "--noquiet", help="Do not quiet compile",
+                            action="store_true", default=False)
+        parser.add_argument("-w",  "--warnings", "--warn", help="Enable warnings",
+                            default="error", choices=["ignore", "default", "error"],
+                            type=str.lower)
+        parser.add_argument("-nrc", "--noremovecomments", help="Remove comments",
+                            action="store_true", default=False)
+        parser.add_argument("-ns", "--nostandalone", help="Nuitka standalone option",
+                            action="store_true", default=False)
+        parser.add_argument("-r", "--run", help="Run the compiled program",
+                            action="store_true", default=False)
+        parser.add_argument("-ra", "--runargs", help="Arguments to pass to the program",
+                            default="", type=str)
+        parser.add_argument("-j", "--jobs", help="Number of core modules to "
+                            "compile at once (default: number of CPUs)",
+                            default=None, type=int)
+        parser.add_argument("-f", "--force", help="Compile every core module, "
+                            "even the ones whose source has not changed",
+                            action="store_true", default=False)
+        args   = parser.parse_args()
     
-    if (errCore := compileCore(env, args.normout, args.noquiet, args.warnings,
-                                args.noremovecomments)):
-        print(f"Failed trying to compile CORE FILES; return code {errCore}")
-        sys.exit(errCore)
-    if (errMainProg := compileMainProg(env, args.file, args.normout,
-                                        args.nofollowimports, args.noquiet,
-                                        args.warnings, args.noremovecomments,
-                                        args.nostandalone)):
-        print(f"Failed trying to compile the MAIN PROGRAM; return code {errMainProg}")
-        sys.exit(errMainProg)
+        if (errCore := compileCore(env, args.normout, args.noquiet, args.warnings,
+                                    args.noremovecomments, args.jobs,
+                                    args.force)):
+            print(f"Failed trying to compile CORE FILES; return code {errCore}")
+            sys.exit(errCore)
+        if (errMainProg := compileMainProg(env, args.file, args.normout,
+                                            args.nofollowimports, args.noquiet,
+                                            args.warnings, args.noremovecomments,
+                                            args.nostandalone)):
+            print(f"Failed trying to compile the MAIN PROGRAM; return code {errMainProg}")
+            sys.exit(errMainProg)
     
-    built = True
-    print(f"{BOLD + GREEN}Build successful{RESET}")
-    if args.run:
-        if args.nostandalone:
-            print(f"Execute: .{os.sep}main.exe", args.runargs)
-            os.system(f".{os.sep}main.exe {args.runargs}")
-        else:
-            print(f"Execute: cd \"{''.join(args.file.split('.')[:-1])}.dist\"")
-            os.chdir(f"{''.join(args.file.split('.')[:-1])}.dist")
-            print(f"Execute: .{os.sep}{''.join(args.file.split('.')[:-1])}.exe {args.runargs}")
-            os.system(f".{os.sep}{''.join(args.file.split('.')[:-1])}.exe {args.runargs}")
-
-except (KeyboardInterrupt, EOFError):
-    print(f"{BOLD + RED}User interrupted build{RESET}") if not built else None
-    sys.exit(-2)
-
-except Exception as e:
-    print(f"{BOLD + RED}Unknown error:{RESET}")
-    tb.print_exc()
-    sys.exit(-3)
+        built = True
+        print(f"{BOLD + GREEN}Build successful{RESET}")
+        if args.run:
+            if args.nostandalone:
+                print(f"Execute: .{os.sep}main.exe", args.runargs)
+                os.system(f".{os.sep}main.exe {args.runargs}")
+            else:
+                print(f"Execute: cd \"{''.join(args.file.split('.')[:-1])}.dist\"")
+                os.chdir(f"{''.join(args.file.split('.')[:-1])}.dist")
+                print(f"Execute: .{os.sep}{''.join(args.file.split('.')[:-1])}.exe {args.runargs}")
+                os.system(f".{os.sep}{''.join(args.file.split('.')[:-1])}.exe {args.runargs}")
+
+    except (KeyboardInterrupt, EOFError):
+        print(f"{BOLD + RED}User interrupted build{RESET}") if not built else None
+        sys.exit(-2)
+
+    except Exception as e:
+        print(f"{BOLD + RED}Unknown error:{RESET}")
+        tb.print_exc()
+        sys.exit(-3)
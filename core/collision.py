@@ -0,0 +1,321 @@
+import array
+import sleeping
+import spatial
+import typing   as ty
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import objects as objs
+    import store   as st
+
+
+def _impulse(vi: float, vj: float, e: float) -> tuple[float, float]:
+    """
+    Velocities along the normal after a collision between two bodies of equal
+    mass, where j is on the positive side of i.
+    """
+    if vi - vj <= 0:
+        # Already separating
+        return vi, vj
+    dv = (1 + e) / 2 * (vi - vj)
+    return vi - dv, vj + dv
+
+
+class Collider:
+    """
+    Body-vs-body and body-vs-InternalWall collisions. Candidate pairs come
+    from a SpatialHash rebuilt every step (a CellGrid, with NumPy; see 
+    _stepBatch), and only those are resolved with an AABB narrowphase. Restitution is the product of the CORs of the two
+    objects. Sleeping bodies are treated as immovable, and are only woken up
+    when hit by a body which is not calm (see sleeping.isCalm). Given the 
+    positions the bodies had before the step, bodies are also swept against
+    the InternalWalls (see _sweepWall), so that fast bodies cannot pass 
+    through them.
+    """
+    def __init__(self, bodies: bool = True, batch: bool | None = None) \
+            -> None:
+        """
+        > param bodies: Whether bodies collide with each other; when False,
+                        only InternalWall collisions are resolved
+        > param batch: Whether to resolve the collisions with NumPy (see 
+                       _stepBatch); by default, if it is installed
+        """
+        self.bodies = bodies
+        self.batch  = vecphys.AVAILABLE if batch is None else batch
+        self.grid   = spatial.SpatialHash()
+        self.cells  = spatial.CellGrid() if self.batch else None
+        self.hits   = 0
+
+    def step(self, store: "st.BodyStore",
+             walls: ty.Sequence["objs.InternalWall"],
+             sleeper: "sleeping.SleepTracker | None" = None,
+             prev: list[float] | None = None) -> None:
+        """
+        Resolve every collision of the bodies in `store`.
+        > param store: Store holding the bodies
+        > param walls: Internal walls to collide with
+        > param sleeper: Sleep tracker of the bodies, if they can sleep
+        > param prev: Interleaved positions of the bodies before the step 
+                      they were just moved by; None to only resolve overlaps
+        """
+        hit : list[tuple[int, int]]
+        if not store.cnt or not (self.bodies or walls):
+            return
+        if self.batch:
+            self._stepBatch(store, walls, sleeper, prev)
+            return
+        n2   = 2 * store.cnt
+        pos  = store.pos[:n2].tolist()
+        vel  = store.vel[:n2].tolist()
+        ext  = store.ext[:n2].tolist()
+        cor  = store.cor[:store.cnt].tolist()
+        hits = 0
+        # (sleeping body, awake body) pairs that collided
+        hit  = []
+        self.grid.build(pos, ext, range(store.cnt))
+        asleep = ([sleeping.isAsleep(s) for s in store.still[:store.cnt]]
+                  if sleeper is not None else [False] * store.cnt)
+
+        if self.bodies:
+            for i, j in self.grid.pairs():
+                if self._resolvePair(pos, vel, ext, cor, asleep, i, j):
+                    hits += 1
+                    if asleep[i] or asleep[j]:
+                        hit.append((i, j) if asleep[i] else (j, i))
+        # Farthest a body moved in the step, by which the wall queries are
+        # widened to find the bodies which may have passed through a wall
+        reach = (max(abs(p - q) for p, q in zip(pos, prev))
+                 if walls and prev is not None else 0.0)
+        for wall in walls:
+            wx, wy = wall.pos
+            for i in self.grid.query(wx - reach, wy - reach,
+                                     wx + wall.cols + reach,
+                                     wy + wall.lns + reach):
+                if asleep[i]:
+                    continue
+                if prev is not None and \
+                        self._sweepWall(pos, prev, vel, ext, cor[i], wall, i):
+                    hits += 1
+                else:
+                    hits += self._resolveWall(pos, vel, ext, cor[i], wall, i)
+
+        store.pos[:n2] = array.array('d', pos)
+        store.vel[:n2] = array.array('d', vel)
+        self.hits      = hits
+        accl           = store.accl
+        for i, j in hit:
+            if not sleeping.isCalm(vel[2 * j], vel[2 * j + 1], accl[2 * j],
+                                   accl[2 * j + 1]):
+                sleeper.wake(store, i)
+
+    def _stepBatch(self, store: "st.BodyStore",
+                   walls: ty.Sequence["objs.InternalWall"],
+                   sleeper: "sleeping.SleepTracker | None",
+                   prev: list[float] | None) -> None:
+        """
+        step, with NumPy. The candidate pairs come from a CellGrid (see 
+        spatial.CellGrid.pairs), and every contact between bodies is resolved
+        at once (see _resolveBatch). The walls are then resolved body by 
+        body, as in step, but only for the bodies the grid finds near them,
+        and on the store's buffers directly.
+        """
+        np     = vecphys.np
+        views  = vecphys.storeViews(store)
+        pos    = views["pos"]
+        asleep = (views["still"] >= sleeping.ASLEEP if sleeper is not None
+                  else np.zeros(store.cnt, dtype=bool))
+        # Over the bodies rather than the world, whose size is not known here
+        self.cells.build(pos, views["ext"],
+                         (max(int(pos[:, 1].max()), 0) + 1,
+                          max(int(pos[:, 0].max()), 0) + 1))
+        hits = (self._resolveBatch(store, views, asleep, sleeper)
+                if self.bodies else 0)
+        reach = (float(np.abs(pos.reshape(-1) - prev).max())
+                 if walls and prev is not None else 0.0)
+        pos, vel, ext, cor = store.pos, store.vel, store.ext, store.cor
+        for wall in walls:
+            wx, wy = wall.pos
+            for i in self.cells.query(wx - reach, wy - reach,
+                                      wx + wall.cols + reach,
+                                      wy + wall.lns + reach).tolist():
+                if asleep[i]:
+                    continue
+                if prev is not None and \
+                        self._sweepWall(pos, prev, vel, ext, cor[i], wall, i):
+                    hits += 1
+                else:
+                    hits += self._resolveWall(pos, vel, ext, cor[i], wall, i)
+        self.hits = hits
+
+    def _resolveBatch(self, store: "st.BodyStore",
+                      views: dict[str, "vecphys.np.ndarray"],
+                      asleep: "vecphys.np.ndarray",
+                      sleeper: "sleeping.SleepTracker | None") -> int:
+        """
+        Resolve every contact between bodies at once, each as _resolvePair 
+        does. A body in several contacts is moved, and its velocity changed,
+        by the mean of what they ask for along each axis, so that it is not 
+        pushed several times over.
+        > return: Number of contacts
+        """
+        np             = vecphys.np
+        pos, vel, ext  = views["pos"], views["vel"], views["ext"]
+        i, j           = self.cells.pairs()
+        over           = (np.minimum(pos[i] + ext[i], pos[j] + ext[j])
+                          - np.maximum(pos[i], pos[j]))
+        m              = ((over[:, 0] > 0) & (over[:, 1] > 0)
+                          & ~(asleep[i] & asleep[j]))
+        i, j, over     = i[m], j[m], over[m]
+        if not len(i):
+            return 0
+        # Axis of least penetration, and the pair ordered along it
+        k              = (over[:, 0] >= over[:, 1]).astype(np.intp)
+        o              = np.where(k, over[:, 1], over[:, 0])
+        p, v           = pos.reshape(-1), vel.reshape(-1)
+        swap           = p[2 * i + k] > p[2 * j + k]
+        i, j           = np.where(swap, j, i), np.where(swap, i, j)
+        fi, fj         = 2 * i + k, 2 * j + k
+        si, sj         = asleep[i], asleep[j]
+        e              = views["cor"][i] * views["cor"][j]
+        vi, vj         = v[fi], v[fj]
+        # Share of the separation each body takes; a sleeping body stays put
+        wi             = np.where(sj, 1.0, np.where(si, 0.0, 0.5))
+        # _impulse between awake bodies, reflection off a sleeping one
+        dv             = np.where(vi - vj > 0, (1 + e) / 2 * (vi - vj), 0.0)
+        dvi            = np.where(si, 0.0, np.where(
+            sj, np.where(vi > 0, -(1 + e) * vi, 0.0), -dv))
+        dvj            = np.where(sj, 0.0, np.where(
+            si, np.where(vj < 0, -(1 + e) * vj, 0.0), dv))
+        at             = np.concatenate((fi, fj))
+        dp             = np.concatenate((-o * wi, o * (1 - wi)))
+        dv             = np.concatenate((dvi, dvj))
+        for buf, d in ((p, dp), (v, dv)):
+            cnt  = np.bincount(at, d != 0, len(buf))
+            sums = np.bincount(at, d, len(buf))
+            some = np.flatnonzero(cnt)
+            buf[some] += sums[some] / cnt[some]
+        if sleeper is not None and (one := si ^ sj).any():
+            # Sleeping bodies hit by a body which is not calm
+            slept = np.where(si, i, j)[one]
+            awake = np.where(si, j, i)[one]
+            calm  = (np.abs(vel[awake]) < np.sqrt(2 * np.abs(
+                views["accl"][awake])) + sleeping.SLEEP_VEL).all(1)
+            if not calm.all():
+                sleeper.wakeMany(store, np.unique(slept[~calm]))
+        return len(i)
+
+    @staticmethod
+    def _resolvePair(pos: list[float], vel: list[float], ext: list[float],
+                     cor: list[float], asleep: list[bool], i: int, j: int) \
+            -> int:
+        if asleep[i] and asleep[j]:
+            return 0
+        xi, yi, xj, yj = pos[2 * i], pos[2 * i + 1], pos[2 * j], pos[2 * j + 1]
+        ox = min(xi + ext[2 * i], xj + ext[2 * j]) - max(xi, xj)
+        oy = min(yi + ext[2 * i + 1], yj + ext[2 * j + 1]) - max(yi, yj)
+        if ox <= 0 or oy <= 0:
+            return 0
+        # Separate along the axis of least penetration, half each
+        k = 0 if ox < oy else 1
+        o = ox if ox < oy else oy
+        if pos[2 * i + k] > pos[2 * j + k]:
+            i, j = j, i
+        e = cor[i] * cor[j]
+        if asleep[i] or asleep[j]:
+            # The sleeping body stays put, like an InternalWall
+            if asleep[j]:
+                pos[2 * i + k] -= o
+                if vel[2 * i + k] > 0:
+                    vel[2 * i + k] = -vel[2 * i + k] * e
+            else:
+                pos[2 * j + k] += o
+                if vel[2 * j + k] < 0:
+                    vel[2 * j + k] = -vel[2 * j + k] * e
+            return 1
+        pos[2 * i + k] -= o / 2
+        pos[2 * j + k] += o / 2
+        vel[2 * i + k], vel[2 * j + k] = _impulse(vel[2 * i + k],
+                                                  vel[2 * j + k], e)
+        return 1
+
+    @staticmethod
+    def _sweepWall(pos: list[float], prev: list[float], vel: list[float],
+                   ext: list[float], cor: float, wall: "objs.InternalWall",
+                   i: int) -> int:
+        """
+        Swept AABB test of a body against a wall, over the step it was just
+        moved by (from prev to pos). If the body entered the wall
+        during the step, it is put back against the side it entered through,
+        where it was at its time of impact, and its velocity is reflected if
+        it still points into the wall.
+        > return: 1 if the body hit the wall during the step, else 0 (also 
+                  if it was overlapping the wall from the start)
+        """
+        # Entry and exit times, as fractions of the step, of the body into 
+        # the wall grown by the body's extents, on each axis
+        times = []
+        moved = []
+        for k, lo, size in ((0, wall.pos[0], wall.cols),
+                            (1, wall.pos[1], wall.lns)):
+            p0 = prev[2 * i + k]
+            d  = pos[2 * i + k] - p0
+            moved.append(d)
+            lo = lo - ext[2 * i + k]
+            hi = lo + ext[2 * i + k] + size
+            if d == 0:
+                if not lo < p0 < hi:
+                    return 0
+                times.append((float("-inf"), float("inf")))
+            else:
+                t0, t1 = (lo - p0) / d, (hi - p0) / d
+                times.append((t0, t1) if t0 < t1 else (t1, t0))
+        (tx0, tx1), (ty0, ty1) = times
+        enter = max(tx0, ty0)
+        if not 0 <= enter <= 1 or enter >= min(tx1, ty1):
+            return 0
+        # Axis the body entered through
+        k = 0 if tx0 > ty0 else 1
+        j = 2 * i + k
+        e = cor * wall.cor
+        if moved[k] > 0:
+            pos[j] = wall.pos[k] - ext[j]
+            if vel[j] > 0:
+                vel[j] = -vel[j] * e
+        else:
+            pos[j] = wall.pos[k] + (wall.cols, wall.lns)[k]
+            if vel[j] < 0:
+                vel[j] = -vel[j] * e
+        return 1
+
+    @staticmethod
+    def _resolveWall(pos: list[float], vel: list[float], ext: list[float],
+                     cor: float, wall: "objs.InternalWall", i: int) -> int:
+        wx, wy = wall.pos
+        x, y   = pos[2 * i], pos[2 * i + 1]
+        # Penetration depth towards each side of the wall
+        left   = x + ext[2 * i] - wx
+        right  = wx + wall.cols - x
+        top    = y + ext[2 * i + 1] - wy
+        bottom = wy + wall.lns - y
+        if min(left, right, top, bottom) <= 0:
+            return 0
+        e = cor * wall.cor
+        if min(left, right) < min(top, bottom):
+            if left < right:
+                pos[2 * i] -= left
+                if vel[2 * i] > 0:
+                    vel[2 * i] = -vel[2 * i] * e
+            else:
+                pos[2 * i] += right
+                if vel[2 * i] < 0:
+                    vel[2 * i] = -vel[2 * i] * e
+        else:
+            if top < bottom:
+                pos[2 * i + 1] -= top
+                if vel[2 * i + 1] > 0:
+                    vel[2 * i + 1] = -vel[2 * i + 1] * e
+            else:
+                pos[2 * i + 1] += bottom
+                if vel[2 * i + 1] < 0:
+                    vel[2 * i + 1] = -vel[2 * i + 1] * e
+        return 1
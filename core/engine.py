@@ -1,43 +1,149 @@
+import asyncio
+import math
 import random
 import time
 import curses    as cur
+import collision
 import logging   as lg
 import objects   as objs
+import physics
+import pool      as bp
+import profiler
+import render
+import sleeping
+import store     as st
 import traceback as tb
 import typing    as ty
+import vecphys
+from concurrent import futures as cf
 
 global sd
 
+# World size (lines, columns) used when running without a window
+DEFAULT_WORLD_SIZE = (24, 80)
+# Fixed timestep used by headless runs when none is given
+DEFAULT_DT         = 1 / 60
+# Downward acceleration of the objects of the default scene, in cells per second squared
+DEFAULT_GRAVITY    = 10
+# Upper limit of fixed steps taken for a single frame, so that a stalled 
+# frame cannot make the simulation fall further and further behind
+MAX_FRAME_STEPS    = 8
+# Farthest a body may move in one substep, in cells, so that it cannot skip
+# over a body or wall; a step is split into as many substeps as needed, up 
+# to MAX_SUBSTEPS (past which, collisions are swept)
+MAX_TRAVEL         = 1.0
+MAX_SUBSTEPS       = 8
+# Seconds between two polls of the keyboard
+INPUT_POLL         = 1 / 250
+# Store fields copied for the renderer after each step
+SHOWN_FIELDS       = ("pos", "ext", "still")
+
+# Action bound to each key, as (name of the action in Engine.actions, 
+# arguments)
+KEYMAP = {
+    # ^C and ^Z
+    3: ("quit", ), 26: ("quit", ),
+    # 'w', 'a', 's', 'd'
+    ord('w'): ("nudge", 1, -1), ord('a'): ("nudge", 0, -1),
+    ord('s'): ("nudge", 1, 1), ord('d'): ("nudge", 0, 1),
+    # 'W', 'A', 'S', 'D'
+    ord('W'): ("nudge", 1, -2), ord('A'): ("nudge", 0, -2),
+    ord('S'): ("nudge", 1, 2), ord('D'): ("nudge", 0, 2),
+    # 'e' and 'E'
+    ord('e'): ("halt", ), ord('E'): ("halt", ),
+    # 'r' and 'R'
+    ord('r'): ("respawn", ), ord('R'): ("respawn", ),
+    # If the terminal window is resized
+    cur.KEY_RESIZE: ("resize", ),
+}
+
 
 class Engine:
-    def __init__(self, stdscr: cur.window, lgr: lg.Logger,
+    def __init__(self, stdscr: cur.window | None, lgr: lg.Logger,
                  args: dict[str, ty.Any]) -> None:
+        """
+        > param stdscr: Window to render to. If None, the engine runs 
+                        headless
+        > param lgr: Logger
+        > param args: Argument data, as returned by main.parseArgs. The world
+                      size (lines, columns) is args["worldSize"]; without it,
+                      the world is the size of the window, and follows its
+                      resizes
+        """
         # TODO: Remove these test variables!
         self.testFile     = open("test.txt", 'w+')
-        self.testFileBin  = open("testBin.bin", 'wb+')
         self.roughTimeCnt = 0
         self.movObjs  : list[objs.MovableObj]
         self.immovObjs: list[objs.ImmovableObj]
+        self.intWalls : list[objs.InternalWall]
         self.stdscr       = stdscr
         self.lgr          = lgr
         self.err          = 0
         self.lastTime     = time.perf_counter()
         self.movObjs      = []
         self.immovObjs    = []
+        self.intWalls     = []
         self.movObjsApp   = self.movObjs.append
+        self.store        = st.BodyStore(1024)
+        # Spawns and despawns the movable objects, and applies the limits on
+        # them
+        self.pool         = bp.BodyPool(self.store, self.movObjs,
+                                        args.get("maxBodies"), args.get("ttl"),
+                                        args.get("offscreen"))
         self.immovObjsApp = self.immovObjs.append
-        self.termSize     = self.stdscr.getmaxyx()
+        self.termSize     = (self.stdscr.getmaxyx() if self.stdscr is not None
+                             else tuple(args.get("worldSize",
+                                                 DEFAULT_WORLD_SIZE)))
+        self.worldSize    = tuple(args.get("worldSize", self.termSize))
+        self.fitWorld     = "worldSize" not in args
+        self.rng          = random.Random(args.get("seed"))
+        self.player       = None
+        self.playerVel    = args.get("playerVel")
+        self.gravity      = args.get("gravity", DEFAULT_GRAVITY)
+        self.fixGravity   = "gravity" in args
+        self.fixedDt      = args.get("dt", 0.0)
+        # Integration method, one of physics.INTEGRATORS
+        self.integrator   = args.get("integrator", "euler")
+        self.fixIntegr    = "integrator" in args
+        # Linear drag coefficient of the bodies, in 1 / seconds
+        self.drag         = args.get("drag", 0.0)
+        self.fixDrag      = "drag" in args
+        self.accum        = 0.0
+        # Substeps the last update was split into
+        self.substeps     = 1
         self.lWall        = objs.BoundaryObj("lWall", (0, 0),
-                                             self.termSize[0], 1, invis=True)
-        self.rWall        = objs.BoundaryObj("rWall", (self.termSize[1] - 1, 0),
-                                             self.termSize[0], 1, invis=True)
+                                             self.worldSize[0], 1, invis=True)
+        self.rWall        = objs.BoundaryObj("rWall",
+                                             (self.worldSize[1] - 1, 0),
+                                             self.worldSize[0], 1, invis=True)
         self.ceiling      = objs.BoundaryObj("ceiling", (0, 0),
-                                             self.termSize[1], 1, invis=True)
-        self.ground       = objs.BoundaryObj("ground", (0, self.termSize[0] - 1),
-                                             self.termSize[1], 1, invis=True)
+                                             self.worldSize[1], 1, invis=True)
+        self.ground       = objs.BoundaryObj("ground",
+                                             (0, self.worldSize[0] - 1),
+                                             self.worldSize[1], 1, invis=True)
         self.tgtFrameRt   = 1e1000
         self.debugFPS     = False
         self.debugObjCnt  = False
+        self.debugProf    = False
+        self.renderer     = (render.Renderer(self.stdscr)
+                             if self.stdscr is not None else None)
+        self.collider     = collision.Collider(bodies=args.get("collide", False))
+        self.sleeper      = (sleeping.SleepTracker() if args.get("sleep", True)
+                             else None)
+        self.backend      = None
+        self.recorder     = None
+        # Publishes the bodies and the frame counters for other processes
+        # (see publish.Publisher)
+        self.publisher    = None
+        # Per-phase frame timing; `lap` marks the end of a phase, and is a 
+        # no-op unless profiling
+        self.profiler     = None
+        self.lap          = profiler.noLap
+        self.tracePath    = args.get("trace")
+        # Actions keys can be bound to in KEYMAP
+        self.actions      = {"quit": self._quit, "nudge": self._nudge,
+                             "halt": self._halt, "respawn": self._respawn,
+                             "resize": self._onResize}
         
         # Update with argument data
         if "fps" in args:
@@ -48,13 +154,37 @@ class Engine:
                 self.debugFPS = True
             if "objc" in lowerDebug:
                 self.debugObjCnt = True
-        if "playerVel" in args:
-            self.player.vel = args["playerVel"]
+            if "prof" in lowerDebug:
+                self.debugProf = True
+        if self.debugProf or self.tracePath is not None:
+            self.profiler = profiler.Profiler(trace=self.tracePath is not None)
+            self.lap      = self.profiler.lap
         if "wallCOR" in args:
             self.lWall.cor   = args["wallCOR"]
             self.rWall.cor   = args["wallCOR"]
             self.ceiling.cor = args["wallCOR"]
             self.ground.cor  = args["wallCOR"]
+        if "record" in args:
+            import recorder
+            self.recorder = recorder.Recorder(args["record"])
+            if self.renderer is None:
+                # Headless; frames are rendered off-screen for the recording
+                self.renderer = render.Renderer(
+                    render.OffscreenWin(*self.termSize))
+            self.renderer.keepRuns = True
+        if "publish" in args:
+            import publish
+            self.publisher = publish.Publisher(args["publish"],
+                                               self.store.cap)
+        if args.get("backend") == "parallel":
+            import parallel
+            self.backend = parallel.ShardedIntegrator(args.get("workers"))
+        elif args.get("backend") == "numpy":
+            if vecphys.AVAILABLE:
+                self.backend = vecphys.VecIntegrator()
+            else:
+                self.lgr.warning("NumPy is not installed; falling back to the "
+                                 "scalar backend")
 
     def _createTestObjs(self, n: int = 16) -> int | None:
         """
@@ -69,21 +199,179 @@ class Engine:
             self._createMovObj(
                 objs.Sq,
                 f"test{i}",
-                [random.randint(1, self.termSize[1] - 1), random.randint(1, self.termSize[1] - 1)],
-                [random.randint(10, 30), random.randint(7, 20)],
-                # [random.randint(6, 15), random.randint(4, 10)],
-                [0, 10], 1, 2, char=syms[i]
+                [self.rng.randint(1, self.worldSize[1] - 1), self.rng.randint(1, self.worldSize[1] - 1)],
+                [self.rng.randint(10, 30), self.rng.randint(7, 20)],
+                # [self.rng.randint(6, 15), self.rng.randint(4, 10)],
+                [0, self.gravity], 1, 2, char=syms[i]
             )
         return None
     
+    def _spawnDefaultScene(self, n: int = 30000) -> None:
+        """
+        Spawn the default test scene: n squares, the test objects and the 
+        player.
+        > param n: Number of squares
+        """
+        for i in range(n):
+            # self._createMovObj(objs.Sq, f"test{i}", [2, 20], [10, 10], [0, 0], 1, 3)
+            self._createMovObj(objs.Sq, f"test{i}",
+                               [self.rng.randint(1, self.worldSize[1] - 1), self.rng.randint(1, self.worldSize[1] - 1)],
+                               [self.rng.randint(5, 10), self.rng.randint(5, 10)], [0, self.gravity], 1, 2)
+        self._createTestObjs()
+        self._spawnPlayer()
+
+    def _spawnPlayer(self, pos: list[float] | None = None,
+                     vel: list[float] | None = None,
+                     accl: list[float] | None = None, cor: float = 1,
+                     wd: int = 2, ht: int = 2, txt: str = "PLA\nYER") -> None:
+        """
+        Spawn the player, at the bottom-left corner of the world by default.
+        The player velocity given in the arguments, if any, overrides `vel`.
+        > param txt: Text of the player; if empty, a wd x ht rectangle
+        """
+        self.player = self._createMovObj(
+            objs.Player, "player",
+            pos if pos is not None else [0, self.worldSize[0] - 1],
+            vel if vel is not None else [12, 12],
+            accl if accl is not None else [0, self.gravity], cor, wd, ht,
+            fullTxt=txt)
+        if self.playerVel is not None:
+            self.player.vel = self.playerVel
+
+    def loadScene(self, path: str) -> None:
+        """
+        Spawn the objects of a scene file (see scene.load). The default 
+        player is spawned if the scene has none.
+        > param path: Path of the scene file
+        """
+        import scene
+        scene.load(self, path)
+        if self.player is None:
+            self._spawnPlayer()
+
+    def saveSnapshot(self, path: str) -> None:
+        """
+        Save the full engine state to a binary snapshot (see snapshot.save).
+        > param path: Path of the snapshot file
+        """
+        import snapshot
+        snapshot.save(self, path)
+
+    def loadSnapshot(self, path: str) -> None:
+        """
+        Resume from a snapshot written by saveSnapshot, replacing the current
+        state.
+        > param path: Path of the snapshot file
+        """
+        import snapshot
+        snapshot.load(self, path)
+        if self.sleeper is not None:
+            # Sleeping bodies have been replaced
+            self.sleeper.version += 1
+        if self.stdscr is not None:
+            # Unless a world size was given, the window decides it
+            self._resize(self.stdscr.getmaxyx())
+
+    def _resize(self, termSize: tuple[int, int]) -> None:
+        """
+        Adapt to a new terminal size. If the world follows the size of the 
+        window, the boundaries are moved to fit it.
+        > param termSize: New terminal size, as returned by window.getmaxyx
+        """
+        self.termSize = termSize
+        if self.fitWorld:
+            self._setWorldSize(termSize)
+        if self.renderer is not None:
+            self.renderer.resize(self.termSize)
+
+    def _setWorldSize(self, worldSize: tuple[int, int]) -> None:
+        """
+        Change the world size, moving the boundaries and the bodies (see 
+        _reflow) to fit it.
+        > param worldSize: New world size (lines, columns)
+        """
+        old              = self.worldSize
+        self.worldSize   = tuple(worldSize)
+        self.lWall.pos   = (0, 0)
+        self.rWall.pos   = (self.worldSize[1] - 1, 0)
+        self.ceiling.pos = (0, 0)
+        self.ground.pos  = (0, self.worldSize[0] - 1)
+        self._reflow(old)
+
+    def _reflow(self, old: tuple[int, int]) -> None:
+        """
+        Fit the bodies to a world size just changed: move the ones now (even
+        partly) outside the world back in, in one pass, and wake the ones 
+        along the boundaries that moved, which may have been resting on 
+        them. Every other body is left as it was, asleep or not.
+        > param old: Previous world size (lines, columns)
+        """
+        store  = self.store
+        ht, wd = self.worldSize
+        if not store.cnt:
+            return
+        # Bodies reaching within a cell of the nearer position of a moved 
+        # boundary; only the right wall and the ground can move
+        xEdge  = min(old[1], wd) - 2 if old[1] != wd else math.inf
+        yEdge  = min(old[0], ht) - 2 if old[0] != ht else math.inf
+        if vecphys.AVAILABLE:
+            np       = vecphys.np
+            views    = vecphys.storeViews(store)
+            pos, ext = views["pos"], views["ext"]
+            # As placed by the boundary collisions (see physics.stepRange)
+            np.minimum(pos, np.maximum(np.array([wd - 1, ht - 1]) - ext, 1),
+                       out=pos)
+            ids = np.flatnonzero((pos[:, 0] + ext[:, 0] >= xEdge)
+                                 | (pos[:, 1] + ext[:, 1] >= yEdge))
+        else:
+            pos, ext = store.pos, store.ext
+            ids      = []
+            for j in range(0, 2 * store.cnt, 2):
+                pos[j]     = min(pos[j], max(wd - 1 - ext[j], 1))
+                pos[j + 1] = min(pos[j + 1], max(ht - 1 - ext[j + 1], 1))
+                if pos[j] + ext[j] >= xEdge or \
+                        pos[j + 1] + ext[j + 1] >= yEdge:
+                    ids.append(j // 2)
+        if self.sleeper is not None:
+            self.sleeper.wakeMany(store, ids)
+
     def _createMovObj(self, obj: type[objs.MovableObj], *args: ty.Any,
                       **kwargs: ty.Any) -> objs.MovableObj:
-        self.movObjsApp(temp := obj(*args, **kwargs))
-        return temp
+        # Movable objects are views over the engine's store, so the index of 
+        # an object in movObjs is also its body ID
+        return self.pool.spawn(obj, *args, **kwargs)
+
+    def despawn(self, obj: objs.MovableObj) -> None:
+        """
+        Remove a movable object. The last one takes its ID (see 
+        pool.BodyPool.despawn).
+        > param obj: Object to remove; not the player
+        """
+        if obj is self.player:
+            raise ValueError("The player cannot be despawned")
+        self.pool.despawn(obj)
+        if self.sleeper is not None:
+            # It may have been drawn in the layer of sleeping bodies
+            self.sleeper.version += 1
+
+    def _cull(self, dt: float) -> int:
+        """
+        Age the bodies, and despawn the ones past the limits of the pool.
+        > param dt: Seconds passed since the last call
+        > return: Number of bodies despawned
+        """
+        cnt = self.pool.step(
+            dt, self.renderer.view() if self.renderer is not None else None,
+            self.player.id if self.player is not None else -1)
+        if cnt and self.sleeper is not None:
+            self.sleeper.version += 1
+        return cnt
     
     def _createImmovObj(self, obj: type[objs.ImmovableObj], *args: ty.Any,
                         **kwargs: ty.Any) -> objs.ImmovableObj:
         self.immovObjsApp(temp := obj(*args, **kwargs))
+        if isinstance(temp, objs.InternalWall):
+            self.intWalls.append(temp)
         return temp
 
     def _doesObjCrossBndries(self, obj: objs.ImmovableObj | objs.MovableObj) \
@@ -105,160 +393,235 @@ class Engine:
         groundCross  = obj.pos[1] + obj.lns > self.ground.pos[1]
         return lWallCross, rWallCross, ceilingCross, groundCross
     
-    def _consScr(self, fps: float) -> None:
+    def _consScr(self, fps: float, store: st.BodyStore | None = None,
+                 sleepVer: int | None = None) -> None:
         """
         Construct each frame to be rendered.
-        Draws borders, and add a frame counter at the top-right corner.
-        NOTE: The player object needs to have the name "player" so as to be 
-              rendered on top.
+        Only the cells that changed since the last frame are written (see 
+        render.Renderer); the border is drawn by the renderer once. Adds a 
+        frame counter at the top-right corner, over the frame (see 
+        render.Renderer.overlay). The camera follows the player,
+        and only the bodies in view are drawn.
+        NOTE: The player is always rendered on top.
         > param fps: Floating-point value representing number of frames 
                      rendered in the last second
+        > param store: Store holding the positions to draw, e.g. a copy of
+                       the engine's; defaults to the engine's
+        > param sleepVer: SleepTracker.version as of when `store` was copied
+                          (see _sleepVer); only read if `store` is given
         """
-        # TODO: Might need to implement such that the player is always 
-        # rendered on top, i.e. player should always be visible. Keep that in 
-        # mind, if needed.
-        self.stdscr.clear()
-        for obj in self.movObjs:
-            if obj.name == "player":
-                continue
-            for i, line in enumerate(obj.txt.splitlines()):
-                self.stdscr.addnstr(int(obj.pos[1]) + i, int(obj.pos[0]),
-                                    line, self.termSize[1])
-        for i, line in enumerate(self.player.txt.splitlines()):
-            self.stdscr.addnstr(int(self.player.pos[1]) + i,
-                                int(self.player.pos[0]),
-                                line, self.termSize[1])
-        self.stdscr.border()
-        self.stdscr.addnstr(0, self.termSize[1] - len(f"{fps:<07.7f}") - 5,
-                            f"FPS={fps:<07.7f}", self.termSize[1],
-                            cur.A_REVERSE) if self.debugFPS else None
-        self.stdscr.addnstr(self.termSize[0] - 1, self.termSize[1] \
-                                - (len(str(tmp := (len(self.movObjs) + 5)))) \
-                                - len(str(self.roughTimeCnt)) - 12,
-                           f"@T={self.roughTimeCnt} OBJCNT={tmp}",
-                           self.termSize[1], cur.A_REVERSE) \
-                               if self.debugObjCnt else None
+        if store is None:
+            store    = self.store
+            sleepVer = self._sleepVer()
+        renderer = self.renderer
+        pid      = self.player.id
+        renderer.follow(store.pos[2 * pid], store.pos[2 * pid + 1],
+                        self.player.cols, self.player.lns, self.worldSize)
+        back     = renderer.compose(
+            self.movObjs, store, self.player, self.intWalls, sleepVer,
+            self._inView(renderer.view(), store))
+        self.lap("compose")
+        renderer.present(back)
+        # Through the renderer, so that the next frame draws over them
+        overlay = renderer.overlay
+        overlay(0, self.termSize[1] - len(f"{fps:<07.7f}") - 5,
+                f"FPS={fps:<07.7f}", self.termSize[1],
+                cur.A_REVERSE) if self.debugFPS else None
+        overlay(self.termSize[0] - 1, self.termSize[1] \
+                    - (len(str(tmp := (len(self.movObjs) + 5)))) \
+                    - len(str(self.roughTimeCnt)) - 12,
+                f"@T={self.roughTimeCnt} OBJCNT={tmp}",
+                self.termSize[1], cur.A_REVERSE) \
+                    if self.debugObjCnt else None
+        if self.debugProf:
+            lines = self.profiler.overlay()[:self.termSize[0] - 2]
+            for i, line in enumerate(lines):
+                overlay(i + 1, 1, line, self.termSize[1] - 2, cur.A_REVERSE)
+        self.lap("present")
     
+    def _sleepVer(self) -> int | None:
+        """
+        > return: SleepTracker.version, or None if bodies cannot sleep
+        """
+        return self.sleeper.version if self.sleeper is not None else None
+
+    def _inView(self, rect: tuple[int, int, int, int],
+                store: st.BodyStore) -> ty.Iterable[int] | None:
+        """
+        Find the bodies which might overlap a rectangle of the world.
+        NOTE: Every body is tested, rather than looked up in a grid (see 
+              spatial.CellGrid): there is only one query per frame, and most
+              bodies move between frames, so the grid would cost more to keep
+              up to date than it saves.
+        > param rect: Rectangle, as returned by render.Renderer.view
+        > param store: Store holding the bodies
+        > return: Sorted body IDs, or None if the rectangle covers the whole 
+                  world
+        """
+        x0, y0, x1, y1 = rect
+        if x0 <= 1 and y0 <= 1 and x1 >= self.worldSize[1] - 1 and \
+                y1 >= self.worldSize[0] - 1:
+            return None
+        if vecphys.AVAILABLE:
+            views    = vecphys.storeViews(store)
+            pos, ext = views["pos"], views["ext"]
+            return vecphys.np.flatnonzero(
+                (pos[:, 0] < x1) & (pos[:, 1] < y1)
+                & (pos[:, 0] + ext[:, 0] > x0)
+                & (pos[:, 1] + ext[:, 1] > y0)).tolist()
+        pos, ext = store.pos, store.ext
+        return [i for i in range(store.cnt)
+                if pos[2 * i] < x1 and pos[2 * i + 1] < y1
+                and pos[2 * i] + ext[2 * i] > x0
+                and pos[2 * i + 1] + ext[2 * i + 1] > y0]
+
     def update(self, dt: float) -> None:
         """
-        Update all objects.
+        Update all objects: integrate, resolve boundary collisions, then 
+        resolve object-to-object and internal wall collisions. Bodies which
+        have settled are then put to sleep, and are skipped by later updates
+        until they are woken up. If the fastest body would move more than 
+        MAX_TRAVEL cells, the update is split into substeps (see _substeps).
         > param dt: Floating-point number representing seconds passed after 
                     last update (delta time)
         """
-        for obj in self.movObjs:
-            bndryData = self._doesObjCrossBndries(obj)
-
-            obj.vel[0] += obj.accl[0] * dt
-            obj.vel[1] += obj.accl[1] * dt
-            obj.pos[0] += obj.vel[0] * dt
-            obj.pos[1] += obj.vel[1] * dt
-
-            # If the object crosses the boundaries, move the object inside 
-            # the boundaries
-            obj.pos[0] = max(0, min(obj.pos[0], self.termSize[1] - obj.cols))
-            obj.pos[1] = max(0, min(obj.pos[1], self.termSize[0] - obj.lns))
-
-            if bndryData[0] and (obj.vel[0] < 0 or obj.pos[0] <= 1):
-                obj.vel[0] = -obj.vel[0] * self.lWall.cor
-                obj.pos[0] = 1
-            if bndryData[1] and (obj.vel[0] > 0
-                                 or obj.pos[0] + obj.cols >= self.termSize[1]):
-                obj.vel[0] = -obj.vel[0] * self.rWall.cor
-                obj.pos[0] = self.termSize[1] - obj.cols + 1 - 2
-            if bndryData[2] and (obj.vel[1] > 0 or obj.pos[1] <= 1):
-                obj.vel[1] = -obj.vel[1] * self.ceiling.cor
-                obj.pos[1] = 1
-            if bndryData[3] and (obj.vel[1] < 0
-                                 or obj.pos[1] + obj.lns >= self.termSize[0]):
-                obj.vel[1] = -obj.vel[1] * self.ground.cor
-                obj.pos[1] = self.termSize[0] - obj.lns + 1 - 2
+        self.substeps = self._substeps(dt)
+        dt           /= self.substeps
+        for _ in range(self.substeps):
+            # Positions before the step, for the InternalWall sweeps
+            prev = (self.store.pos[:2 * self.store.cnt].tolist()
+                    if self.intWalls else None)
+            if self.backend is not None:
+                self.backend.step(self, dt)
+            else:
+                self._updateScalar(dt)
+            self.lap("update")
+            self.collider.step(self.store, self.intWalls, self.sleeper, prev)
+            self.lap("collide")
+            if self.sleeper is not None:
+                self.sleeper.step(self.store, dt)
+                self.lap("update")
+
+    def _substeps(self, dt: float) -> int:
+        """
+        > return: Number of substeps to split a step of dt into, so that no 
+                  body moves more than MAX_TRAVEL cells per substep (at most
+                  MAX_SUBSTEPS)
+        """
+        store = self.store
+        if not store.cnt:
+            return 1
+        n2 = 2 * store.cnt
+        if vecphys.AVAILABLE:
+            views = vecphys.storeViews(store)
+            vMax  = float(vecphys.np.abs(views["vel"]).max())
+            aMax  = float(vecphys.np.abs(views["accl"]).max())
+        else:
+            vMax  = max(max(store.vel[:n2]), -min(store.vel[:n2]))
+            aMax  = max(max(store.accl[:n2]), -min(store.accl[:n2]))
+        travel = (vMax + aMax * dt) * dt
+        return min(max(math.ceil(travel / MAX_TRAVEL), 1), MAX_SUBSTEPS)
+
+    def _bndry(self) -> tuple[float, ...]:
+        """
+        > return: Boundary data for the physics kernels: (lWall x, rWall x, 
+                  ceiling y, ground y, lWall COR, rWall COR, ceiling COR, 
+                  ground COR)
+        """
+        return (self.lWall.pos[0], self.rWall.pos[0], self.ceiling.pos[1],
+                self.ground.pos[1], self.lWall.cor, self.rWall.cor,
+                self.ceiling.cor, self.ground.cor)
+
+    def _updateScalar(self, dt: float) -> None:
+        """
+        Integrate and resolve boundary collisions, one object at a time.
+        > param dt: Delta time
+        """
+        # Works on the store's buffers directly rather than through the 
+        # objects' views
+        physics.stepRange(self.store.pos, self.store.vel, self.store.accl,
+                          self.store.ext, 0, self.store.cnt, dt, self.worldSize,
+                          self._bndry(), self.store.still
+                                         if self.sleeper is not None else None,
+                          self.integrator, self.drag)
     
-    def start(self) -> None:
-        """
-        Start the engine, I guess?
-        """
-        fpsList: list[float]
-        fpsCount   = 0
-        fpsList    = []
-        dataCount  = 0
-        fpsListApp = fpsList.append
-        lastFPS    = 0.0
-        fpsTime    = time.perf_counter()
-        for i in range(30000):
-            # self._createMovObj(objs.Sq, f"test{i}", [2, 20], [10, 10], [0, 0], 1, 3)
-            self._createMovObj(objs.Sq, f"test{i}",
-                               [random.randint(1, self.termSize[1] - 1), random.randint(1, self.termSize[1] - 1)],
-                               [random.randint(5, 10), random.randint(5, 10)], [0, 10], 1, 2)
-        self._createTestObjs()
-        self.player = self._createMovObj(objs.Player, "player",
-                                         [0, self.termSize[0] - 1], [12, 12],
-                                         [0, 10], 1, 2, 2, fullTxt="PLA\nYER")
+    def advance(self, frameTime: float) -> int:
+        """
+        Advance the simulation by the time a frame took, in steps of 
+        self.fixedDt. The remainder is accumulated and carried over to the 
+        next frame, so the result does not depend on the frame rate.
+        > param frameTime: Seconds passed since the last frame
+        > return: Number of steps taken
+        """
+        steps       = 0
+        self.accum += min(frameTime, self.fixedDt * MAX_FRAME_STEPS)
+        while self.accum >= self.fixedDt:
+            self.update(self.fixedDt)
+            self.accum -= self.fixedDt
+            steps      += 1
+        return steps
 
-        try:
-            while True:
-                fpsCount += 1
-                self.update((now := time.perf_counter()) - self.lastTime)
-                lastTimeCp    = self.lastTime
-                self.lastTime = now
-                self._consScr(lastFPS)
-
-                if self.debugFPS and now - fpsTime >= 1:
-                    dataCount += 1
-                    fpsListApp(lastFPS := (fpsCount / (now - fpsTime)))
-                    print(f"{dataCount}: {lastFPS}")
-                    fpsTime            = now
-                    fpsCount           = 0
-                    self.roughTimeCnt += 1
-                    self._createTestObjs()
-
-                key = self.stdscr.getch()
-                # No key
-                if key == -1:
-                    pass
-                # ^C and ^Z
-                elif key in (3, 26):
-                    print(f"Avg. {sum(fpsList) / len(fpsList)}") \
-                        if self.debugFPS else None
-                    break
-                # 'w', 'a', 's', 'd'
-                elif key == 119:
-                    self.player.vel[1] -= 1
-                elif key == 97:
-                    self.player.vel[0] -= 1
-                elif key == 115:
-                    self.player.vel[1] += 1
-                elif key == 100:
-                    self.player.vel[0] += 1
-                # 'W', 'A', 'S', 'D'
-                elif key == 87:
-                    self.player.vel[1] -= 2
-                elif key == 65:
-                    self.player.vel[0] -= 2
-                elif key == 83: 
-                    self.player.vel[1] += 2
-                elif key == 68:
-                    self.player.vel[0] += 2
-                # 'e' and 'E'
-                elif key in (101, 69):
-                    self.player.vel = [0.0, 0.0]
-                # 'r' and 'R'
-                elif key in (114, 82):
-                    self.player.pos = [1.0, 1.0]
-                    self.player.vel = [0.0, 0.0]
-                # If the terminal window is resized
-                elif key == cur.KEY_RESIZE:
-                    cur.resize_term(*self.stdscr.getmaxyx())
-                    self.termSize    = self.stdscr.getmaxyx()
-                    self.lWall.pos   = (0, 0)
-                    self.rWall.pos   = (self.termSize[1] - 1, 0)
-                    self.ceiling.pos = (0, 0)
-                    self.ground.pos  = (0, self.termSize[0] - 1)
-                else:
-                    # TODO: Remove this!
-                    self.testFile.write(str(key) + '\n')
+    def runHeadless(self, steps: int, n: int = 30000,
+                    onStep: ty.Callable[[float], None] | None = None) -> float:
+        """
+        Run a number of fixed steps as fast as possible, without rendering. 
+        The default scene is spawned first, if there are no objects yet.
+        > param steps: Number of steps to run
+        > param n: Number of squares in the default scene
+        > param onStep: Called with the timestep after each step, e.g. to 
+                        gather statistics (see sweep.Tracker)
+        > return: Steps per second
+        """
+        if not self.movObjs:
+            self._spawnDefaultScene(n)
+        dt    = self.fixedDt or DEFAULT_DT
+        start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.begin()
+        for _ in range(steps):
+            self.update(dt)
+            self._cull(dt)
+            if self.recorder is not None:
+                self._consScr(0.0)
+                self.recorder.frame(self.renderer, self.store)
+                self.lap("record")
+            self._publish(self.store, 0.0)
+            if onStep is not None:
+                onStep(dt)
+            if self.profiler is not None:
+                self.profiler.endFrame()
+        elapsed = time.perf_counter() - start
+        return steps / elapsed if elapsed else float("inf")
+
+    def close(self) -> None:
+        """
+        Release the resources held by the physics backend, the recorder and 
+        the publisher, if any, and write the profiler trace, if one was asked
+        for.
+        """
+        if (close := getattr(self.backend, "close", None)) is not None:
+            close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        if self.tracePath is not None:
+            self.profiler.export(self.tracePath)
+            self.tracePath = None
+
+    def start(self, n: int = 30000) -> None:
+        """
+        Start the engine, I guess? Spawns the default scene if nothing has 
+        been spawned, then runs the main loop (see _run) until ^C or ^Z.
+        > param n: Number of squares in the default scene
+        """
+        if not self.movObjs:
+            self._spawnDefaultScene(n)
 
-                time.sleep(max(1 / self.tgtFrameRt - (now - lastTimeCp), 0))
-                self.stdscr.refresh()
+        try:
+            asyncio.run(self._run())
 
         except cur.error:
             print(f"Last obj cnt = {self.roughTimeCnt * 10 + 5 + 10000}")
@@ -270,3 +633,189 @@ class Engine:
 
         except Exception:
             self.lgr.fatal(tb.format_exc())
+
+        finally:
+            self.close()
+
+    async def _run(self) -> None:
+        """
+        Main loop, as three tasks: input (_pollInput), which queues the 
+        actions of the keys pressed; physics (_simulate), which applies them
+        between steps and steps the simulation in a worker thread; and 
+        rendering (_render), which draws the last stepped frame. Frame N is
+        thus drawn and written to the terminal while frame N + 1 is being 
+        stepped. Returns once a task finishes (i.e. on ^C or ^Z) or fails.
+        NOTE: Curses is only ever used from the event loop's thread, and the
+              objects and the store are only changed from it while the worker
+              is idle; the renderer draws from a copy of the store (`shown`).
+        """
+        self.running    = True
+        self.pending    = []
+        self.fpsList    = []
+        self.shown      = st.BodyStore(self.store.cnt)
+        # Version of the sleeping bodies in `shown`, which the worker may 
+        # have changed since
+        self.shownVer   = self._sleepVer()
+        # Phase times of the physics task and of the worker, charged to the
+        # next frame drawn (see profiler.Profiler.add)
+        self.shownTimes = []
+        self.frameReady = asyncio.Event()
+        with cf.ThreadPoolExecutor(1) as pool:
+            tasks = [asyncio.create_task(coro)
+                     for coro in (self._pollInput(), self._simulate(pool),
+                                  self._render())]
+            try:
+                done, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            for task in done:
+                # Re-raise the exception of a failed task, if any
+                task.result()
+
+    async def _pollInput(self) -> None:
+        """
+        Input task: read every pending key, and queue the action bound to it
+        in KEYMAP, every INPUT_POLL seconds.
+        """
+        getch = self.stdscr.getch
+        while True:
+            while (key := getch()) != -1:
+                if (action := KEYMAP.get(key)) is None:
+                    # TODO: Remove this!
+                    self.testFile.write(str(key) + '\n')
+                    continue
+                if self.sleeper is not None:
+                    # The player may be about to be moved
+                    self.pending.append((self.sleeper.wake,
+                                         (self.store, self.player.id)))
+                self.pending.append((self.actions[action[0]], action[1:]))
+            await asyncio.sleep(INPUT_POLL)
+
+    async def _simulate(self, pool: cf.Executor) -> None:
+        """
+        Physics task: apply the queued actions, step the simulation in the 
+        worker thread, then publish the new frame to the render task, at 
+        most tgtFrameRt times per second.
+        > param pool: Executor of the worker thread
+        """
+        loop          = asyncio.get_running_loop()
+        tick          = 1 / self.tgtFrameRt
+        self.lastTime = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if self.profiler is not None:
+                # Only the actions are charged to "input", not the time this
+                # task was waiting
+                self.profiler.begin()
+            changed = bool(self.pending)
+            for action, args in self.pending:
+                action(*args)
+            self.pending.clear()
+            if self._cull(now - self.lastTime) or changed:
+                # The objects may no longer match the frame being drawn
+                self.shown.copyFrom(self.store, SHOWN_FIELDS)
+                self.shownVer = self._sleepVer()
+            self.lap("input")
+            times = await loop.run_in_executor(pool, self._step,
+                                               now - self.lastTime)
+            self.lastTime = now
+            self.shown.copyFrom(self.store, SHOWN_FIELDS)
+            self.shownVer = self._sleepVer()
+            if self.profiler is not None:
+                self.shownTimes += (self.profiler.take(), times)
+            self.frameReady.set()
+            # Without time to wait, the next step is handed to the worker 
+            # before yielding, so that it runs while the frame is drawn
+            if (left := tick - (time.perf_counter() - now)) > 0:
+                await asyncio.sleep(left)
+
+    def _step(self, frameTime: float) -> dict[str, float] | None:
+        """
+        Advance the simulation by the time a frame took; run by the worker 
+        thread.
+        > param frameTime: Seconds passed since the last frame
+        > return: Phase times of the step, if profiling
+        """
+        if self.profiler is not None:
+            self.profiler.begin()
+        if self.fixedDt:
+            self.advance(frameTime)
+        else:
+            self.update(frameTime)
+        return self.profiler.take() if self.profiler is not None else None
+
+    async def _render(self) -> None:
+        """
+        Render task: draw each frame published by the physics task. Frames 
+        published while one is being drawn are skipped, but the last one.
+        NOTE: The "sleep" phase of the profiler is the time spent waiting for
+              a frame. The phases of the physics task and of the worker are
+              charged to the frame they produced.
+        """
+        fpsCount = 0
+        lastFPS  = 0.0
+        fpsTime  = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.begin()
+        while True:
+            await self.frameReady.wait()
+            self.frameReady.clear()
+            self.lap("sleep")
+            if self.profiler is not None:
+                for times in self.shownTimes:
+                    self.profiler.add(times)
+                self.shownTimes.clear()
+            fpsCount += 1
+            self._consScr(lastFPS, self.shown, self.shownVer)
+            if self.recorder is not None:
+                self.recorder.frame(self.renderer, self.shown)
+                self.lap("record")
+            self.stdscr.refresh()
+            self.lap("refresh")
+            self._publish(self.shown, lastFPS)
+            if self.profiler is not None:
+                self.profiler.endFrame()
+
+            if (now := time.perf_counter()) - fpsTime >= 1:
+                lastFPS  = fpsCount / (now - fpsTime)
+                fpsTime  = now
+                fpsCount = 0
+                if self.debugFPS:
+                    self.fpsList.append(lastFPS)
+                    print(f"{len(self.fpsList)}: {lastFPS}")
+                    self.roughTimeCnt += 1
+                    self.pending.append((self._createTestObjs, ()))
+
+    def _publish(self, store: st.BodyStore, fps: float) -> None:
+        """
+        Publish a frame to the publisher, if there is one.
+        > param store: Store holding the bodies of the frame
+        > param fps: Frames per second, as last measured
+        """
+        if self.publisher is None:
+            return
+        self.publisher.publish(store, fps, self.substeps,
+                               self.player.id if self.player is not None
+                               else -1, self.worldSize)
+        self.lap("publish")
+
+    def _quit(self) -> None:
+        if self.debugFPS:
+            print(f"Avg. {sum(self.fpsList) / len(self.fpsList)}")
+        self.running = False
+
+    def _nudge(self, axis: int, dv: float) -> None:
+        self.player.vel[axis] += dv
+
+    def _halt(self) -> None:
+        self.player.vel = [0.0, 0.0]
+
+    def _respawn(self) -> None:
+        self.player.pos = [1.0, 1.0]
+        self.player.vel = [0.0, 0.0]
+
+    def _onResize(self) -> None:
+        cur.resize_term(*self.stdscr.getmaxyx())
+        self._resize(self.stdscr.getmaxyx())
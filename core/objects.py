@@ -1,28 +1,156 @@
+import functools as ft
+import itertools as it
+import typing    as ty
+import store     as st
+
+# Source of Sprite.uid
+_spriteIds  = it.count()
+# Incremented whenever the sprite of an object is set, so that anything 
+# caching the sprites of many objects (the renderer) knows to refresh
+spriteEpoch = 0
+
+
+class Sprite:
+    """
+    Immutable, shared text of an object: the text, its lines (also encoded, 
+    for the renderer) and its dimensions, computed once. `uid` is unique to
+    the sprite, so that the renderer can group bodies by sprite.
+    NOTE: The renderer draws one byte per cell, so the text must be 
+          printable ASCII; anything else raises a ValueError, rather than
+          being drawn as something else.
+    """
+    __slots__ = ("uid", "txt", "lines", "data", "lns", "cols")
+
+    def __init__(self, txt: str) -> None:
+        lines = tuple(txt.splitlines())
+        if not txt.isascii() or not all(i.isprintable() for i in lines):
+            raise ValueError(f"Object text must be printable ASCII: {txt!r}")
+        self.uid   = next(_spriteIds)
+        self.txt   = txt
+        self.lines = lines
+        self.data  = tuple(i.encode("ascii") for i in lines)
+        self.lns   = len(self.lines)
+        self.cols  = max([len(i) for i in self.lines], default=0)
+
+
+@ft.cache
+def textSprite(txt: str) -> Sprite:
+    """
+    > return: The interned sprite for the given text
+    """
+    return Sprite(txt)
+
+
+@ft.cache
+def getSprite(shape: str, wd: int, ht: int, char: str) -> Sprite:
+    """
+    > param shape: Shape of the sprite. Valid values: rect
+    > param wd: Width of the shape
+    > param ht: Height of the shape
+    > param char: Character the shape is drawn with
+    > return: The interned sprite for the given shape, size and character
+    """
+    if shape == "rect":
+        return textSprite('\n'.join([char * wd for _ in range(ht)]))
+    raise ValueError(f"Unknown sprite shape: {shape}")
+
+
+def _vecProp(field: str) -> property:
+    """
+    Property exposing a vector field of the body's store as a Vec2 view.
+    """
+    def getter(self: "MovableObj") -> st.Vec2:
+        return st.Vec2(self.store, field, self.id)
+
+    def setter(self: "MovableObj", val: ty.Sequence[float]) -> None:
+        j   = 2 * self.id
+        buf = getattr(self.store, field)
+        buf[j], buf[j + 1] = val
+
+    return property(getter, setter)
+
+
+def _extProp(k: int) -> property:
+    """
+    Property exposing one component of the body's extents (0: columns,
+    1: lines) as an integer.
+    """
+    def getter(self: "MovableObj") -> int:
+        return int(self.store.ext[2 * self.id + k])
+
+    def setter(self: "MovableObj", val: int) -> None:
+        self.store.ext[2 * self.id + k] = val
+
+    return property(getter, setter)
+
+
 class BaseObj:
+    __slots__ = ("name", "_sprite")
+
     def __init__(self, name: str):
-        self.name = name
-        self.txt  = ''
-        self.lns   = 0
-        self.cols  = 0
+        self.name   = name
+        self.sprite = textSprite('')
+        self.lns    = 0
+        self.cols   = 0
+
+    @property
+    def sprite(self) -> Sprite:
+        return self._sprite
+
+    @sprite.setter
+    def sprite(self, val: Sprite) -> None:
+        global spriteEpoch
+        self._sprite  = val
+        spriteEpoch  += 1
+
+    @property
+    def txt(self) -> str:
+        return self.sprite.txt
+
+    @txt.setter
+    def txt(self, val: str) -> None:
+        self.sprite = textSprite(val)
 
 
 class MovableObj(BaseObj):
+    """
+    Movable body. The physical state lives in a store.BodyStore, and the
+    object is only a view over it (by its ID), so `pos`, `vel` and `accl`
+    read and write the store directly.
+    """
+    __slots__ = ("store", "id", "char", "invis")
+
+    pos  = _vecProp("pos")
+    vel  = _vecProp("vel")
+    accl = _vecProp("accl")
+    cols = _extProp(0)
+    lns  = _extProp(1)
+
     def __init__(self, name: str, pos: list[float], vel: list[float],
                  accl: list[float], cor: float, char: str = '#',
-                 invis: bool = False) -> None:
+                 invis: bool = False, store: st.BodyStore | None = None) \
+            -> None:
+        self.store = store if store is not None else st.BodyStore(1)
+        self.id    = self.store.add(pos, vel, accl, cor)
         super().__init__(name)
-        self.pos   = pos
-        self.vel   = vel
-        self.accl  = accl
-        self.cor   = cor
         self.char  = char
         self.invis = invis
+
+    @property
+    def cor(self) -> float:
+        return self.store.cor[self.id]
+
+    @cor.setter
+    def cor(self, val: float) -> None:
+        self.store.cor[self.id] = val
     
     def __str__(self) -> str:
         return f"MovableObj({self.name}, {self.pos}, {self.vel}, {self.accl})"
 
 
 class ImmovableObj(BaseObj):
+    __slots__ = ("lns", "cols", "pos", "cor", "char", "invis")
+
     def __init__(self, name: str, pos: tuple[float, float], cor: float,
                  char: str = '#', invis: bool = False) -> None:
         super().__init__(name)
@@ -36,6 +164,8 @@ class ImmovableObj(BaseObj):
 
 
 class BoundaryObj(ImmovableObj):
+    __slots__ = ("size", )
+
     def __init__(self, name: str, pos: tuple[float, float], size: int,
                  cor: float, char: str = '#', invis: bool = False) -> None:
         super().__init__(name, pos, cor, char, invis)
@@ -43,21 +173,27 @@ class BoundaryObj(ImmovableObj):
 
 
 class Sq(MovableObj):
+    __slots__ = ("side", )
+
     def __init__(self, name: str, pos: list[float], vel: list[float],
                  accl: list[float], cor: float, side: int, char: str = '#',
-                 invis: bool = False) -> None:
-        super().__init__(name, pos, vel, accl, cor, char, invis)
-        self.side = side
-        self.txt  = '\n'.join([self.char * self.side for _ in range(self.side)])
-        self.lns  = len(self.txt.splitlines())
-        self.cols = max([len(i) for i in self.txt.splitlines()])
+                 invis: bool = False, store: st.BodyStore | None = None) \
+            -> None:
+        super().__init__(name, pos, vel, accl, cor, char, invis, store)
+        self.side   = side
+        self.sprite = getSprite("rect", side, side, self.char)
+        self.lns    = self.sprite.lns
+        self.cols   = self.sprite.cols
 
 
 class Diamond(MovableObj):
+    __slots__ = ("ht", )
+
     def __init__(self, name: str, pos: list[float], vel: list[float],
                     accl: list[float], cor: float, ht: int, char: str = '#',
-                    invis: bool = False) -> None:
-        super().__init__(name, pos, vel, accl, cor, char, invis)
+                    invis: bool = False, store: st.BodyStore | None = None) \
+            -> None:
+        super().__init__(name, pos, vel, accl, cor, char, invis, store)
         lines: list[str]
         self.ht = ht
         lines   = []
@@ -69,26 +205,33 @@ class Diamond(MovableObj):
 
 
 class InternalWall(ImmovableObj):
+    __slots__ = ("wd", "ht")
+
     def __init__(self, name: str, pos: tuple[float, float], cor: float,
                  wd: int, ht: int, char: str = '#',
                  invis: bool = False) -> None:
         super().__init__(name, pos, cor, char, invis)
-        self.wd  = wd
-        self.ht  = ht
-        self.txt = '\n'.join([self.char * self.wd for _ in range(self.ht)])
+        self.wd     = wd
+        self.ht     = ht
+        self.sprite = getSprite("rect", wd, ht, self.char)
+        self.lns    = ht
+        self.cols   = wd
 
 
 class Player(MovableObj):
+    __slots__ = ("health", )
+
     def __init__(self, name: str, pos: list[float], vel: list[float],
                  accl: list[float], cor: float, wd: int, ht: int,
                  char: str = '@', fullTxt: str = '',
-                 invis: bool = False) -> None:
-        super().__init__(name, pos, vel, accl, cor, char, invis)
+                 invis: bool = False, store: st.BodyStore | None = None) \
+            -> None:
+        super().__init__(name, pos, vel, accl, cor, char, invis, store)
         self.char    = char
-        self.txt     = ('\n'.join([self.char * wd for _ in range(ht)])
-                        if not fullTxt else fullTxt)
-        self.lns     = len(self.txt.splitlines())
-        self.cols    = max([len(i) for i in self.txt.splitlines()])
+        self.sprite  = (getSprite("rect", wd, ht, self.char)
+                        if not fullTxt else textSprite(fullTxt))
+        self.lns     = self.sprite.lns
+        self.cols    = self.sprite.cols
         self.health  = 100
 
 
@@ -0,0 +1,200 @@
+import os
+import sys
+import multiprocessing as mp
+import typing          as ty
+import physics
+import store           as st
+import vecphys
+from multiprocessing import shared_memory as shm
+
+if ty.TYPE_CHECKING:
+    import engine
+
+# Store fields the workers step, and their components; the names of their 
+# segments are sent in this order
+SHARED_FIELDS = (("pos", 2), ("vel", 2), ("accl", 2), ("ext", 2),
+                 ("still", 1))
+# Below this many bodies per worker, dispatching costs more than it saves, and
+# the bodies are stepped in-process instead
+MIN_SHARD     = 2048
+
+# Worker side: names of the segments currently attached, the segments, and a
+# float64 view of each
+_attached: tuple[tuple[str, ...], list[shm.SharedMemory], list[memoryview]]
+_attached = ((), [], [])
+
+
+def _release(seg: shm.SharedMemory, view: memoryview) -> None:
+    view.release()
+    seg.close()
+
+
+def _attach(names: tuple[str, ...]) -> dict[str, memoryview]:
+    global _attached
+    if names != _attached[0]:
+        for oldSeg, oldView in zip(_attached[1], _attached[2]):
+            _release(oldSeg, oldView)
+        segs = []
+        for name in names:
+            try:
+                # The parent owns the segment, and unlinks it
+                segs.append(shm.SharedMemory(name, track=False))
+            except TypeError:
+                # Python < 3.13; workers share the parent's resource tracker,
+                # so the segment is still only unlinked once
+                segs.append(shm.SharedMemory(name))
+        _attached = (names, segs, [seg.buf.cast('d') for seg in segs])
+    return {field: view
+            for (field, _), view in zip(SHARED_FIELDS, _attached[2])}
+
+
+def _stepShard(names: tuple[str, ...], lo: int, hi: int, dt: float,
+               worldSize: tuple[int, int], bndry: tuple[float, ...],
+               integrator: str, drag: float) -> None:
+    """
+    Worker entry point: step bodies lo to hi - 1 of the store.
+    > param names: Names of the segments of SHARED_FIELDS
+    """
+    views = _attach(names)
+    if vecphys.AVAILABLE:
+        np  = vecphys.np
+        arr = {field: np.frombuffer(views[field][comps * lo:comps * hi],
+                                    dtype=np.float64).reshape(
+                                        (hi - lo, 2) if comps == 2
+                                        else (hi - lo, ))
+               for field, comps in SHARED_FIELDS}
+        vecphys.stepBodies(arr["pos"], arr["vel"], arr["accl"], arr["ext"],
+                           dt, worldSize, bndry, arr["still"], integrator,
+                           drag)
+    else:
+        physics.stepRange(views["pos"], views["vel"], views["accl"],
+                          views["ext"], lo, hi, dt, worldSize, bndry,
+                          views["still"], integrator, drag)
+
+
+class ShardedIntegrator:
+    """
+    Parallel physics backend. The buffers of the engine's store are moved 
+    into shared memory, one segment per buffer (see _alloc), so that the 
+    workers step the store itself, split into contiguous shards; only the 
+    segment names and the shard bounds are sent to them, and nothing is 
+    copied in or out.
+    NOTE: Every step still costs a round trip to each worker, which only 
+          pays off with a CPU per worker and tens of thousands of bodies;
+          below that, the numpy backend is faster.
+    """
+    def __init__(self, workers: int | None = None) -> None:
+        """
+        > param workers: Number of worker processes; defaults to the number of
+                         CPUs
+        """
+        self.segs   : dict[int, shm.SharedMemory]
+        self.stale  : list[shm.SharedMemory]
+        self.workers = workers or os.cpu_count() or 1
+        # Store whose buffers are in shared memory, and its generation when
+        # `names` was found
+        self.store   = None
+        self.gen     = -1
+        self.names   = ()
+        # Segments by the id of their mmap, which the store's buffers keep as
+        # their `obj`, and the unlinked ones still to be closed
+        self.segs    = {}
+        self.stale   = []
+        self.local   = vecphys.VecIntegrator() if vecphys.AVAILABLE else None
+        # The workers import this module by name, so the core directory has
+        # to be importable in them, even with the "spawn" start method
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        try:
+            if os.name == "posix":
+                # Start the resource tracker before the workers, so that they
+                # share it with this process
+                from multiprocessing import resource_tracker
+                resource_tracker.ensure_running()
+            self.pool = mp.Pool(self.workers)
+        finally:
+            sys.path.pop(0)
+
+    def _alloc(self, size: int) -> memoryview:
+        """
+        Allocator of the store's buffers (see st.BodyStore): a new shared 
+        memory segment.
+        """
+        seg = shm.SharedMemory(create=True, size=size)
+        self.segs[id(seg.buf.obj)] = seg
+        return seg.buf[:size]
+
+    def _adopt(self, store: "st.BodyStore") -> None:
+        """
+        Find the segments of the store's current buffers, and free the ones 
+        it no longer uses.
+        """
+        live       = {id(getattr(store, field).obj) for field, _ in st.FIELDS}
+        self.names = tuple(self.segs[id(getattr(store, field).obj)].name
+                           for field, _ in SHARED_FIELDS)
+        for key in [key for key in self.segs if key not in live]:
+            seg = self.segs.pop(key)
+            seg.unlink()
+            self.stale.append(seg)
+        self._closeStale()
+        self.gen = store.gen
+
+    def _closeStale(self) -> None:
+        stale = []
+        for seg in self.stale:
+            try:
+                seg.close()
+            except BufferError:
+                # Still viewed, e.g. by NumPy arrays over an old buffer
+                stale.append(seg)
+        self.stale = stale
+
+    def step(self, eng: "engine.Engine", dt: float) -> None:
+        """
+        Step every movable object of the engine.
+        > param eng: Engine whose movable objects are to be updated
+        > param dt: Delta time
+        """
+        store  = eng.store
+        cnt    = store.cnt
+        shards = min(self.workers, cnt // MIN_SHARD)
+        if shards < 2:
+            if self.local is not None:
+                self.local.step(eng, dt)
+            else:
+                eng._updateScalar(dt)
+            return
+        if store is not self.store:
+            self._free()
+            self.store = store
+            store.realloc(self._alloc)
+        if store.gen != self.gen:
+            self._adopt(store)
+        bounds = [cnt * i // shards for i in range(shards + 1)]
+        bndry  = eng._bndry()
+        self.pool.starmap(_stepShard,
+                          [(self.names, lo, hi, dt, eng.worldSize, bndry,
+                            eng.integrator, eng.drag)
+                           for lo, hi in zip(bounds, bounds[1:])])
+
+    def _free(self) -> None:
+        """
+        Move the store back out of shared memory, and free every segment.
+        """
+        if self.store is not None:
+            self.store.realloc(bytearray)
+            self.store = None
+        for seg in self.segs.values():
+            seg.unlink()
+            self.stale.append(seg)
+        self.segs  = {}
+        self.gen   = -1
+        self.names = ()
+        self._closeStale()
+
+    def close(self) -> None:
+        """
+        Stop the worker processes and free the shared memory segments.
+        """
+        self.pool.terminate()
+        self.pool.join()
+        self._free()
@@ -0,0 +1,131 @@
+import typing as ty
+import sleeping
+
+# Integration methods, by name (see stepRange). A body's acceleration is its
+# own, constant during a step, less a linear drag: accl - drag * vel. 
+# Without drag, verlet and rk4 are both exact, and only differ by rounding:
+# euler:  semi-implicit (symplectic) Euler; the velocity is updated first,
+#         and the position with the new velocity
+# verlet: velocity Verlet; the drag at the end of the step depends on the
+#         new velocity, which is solved for
+# rk4:    classical fourth-order Runge-Kutta
+INTEGRATORS = ("euler", "verlet", "rk4")
+
+
+def sweep(p: float, p0: float, v: float, plane: float, cor: float,
+          dt: float) -> tuple[float, float]:
+    """
+    Reflect a body which has moved past a boundary during a step at its time
+    of impact, instead of at the end of the step: it spends the time since
+    the impact moving away from the boundary.
+    NOTE: The time of impact is found from the distance moved in the step,
+          not from v, which can be 0 at the end of the step (e.g. with
+          verlet) even though the body crossed the boundary.
+    > param p: Coordinate of the body at the end of the step, past the 
+               boundary
+    > param p0: Coordinate of the body at the start of the step, clear of 
+                the boundary
+    > param v: Velocity of the body along the axis at the end of the step
+    > param plane: Coordinate the body touches the boundary at
+    > param cor: COR of the boundary
+    > param dt: Delta time
+    > return: Velocity and coordinate at the end of the step
+    """
+    since = dt * (p - plane) / (p - p0)
+    v     = -v * cor
+    return v, plane + v * since
+
+
+def stepRange(pos: ty.Any, vel: ty.Any, accl: ty.Any, ext: ty.Any, lo: int,
+              hi: int, dt: float, worldSize: tuple[int, int],
+              bndry: tuple[float, ...], still: ty.Any = None,
+              integrator: str = "euler", drag: float = 0.0) -> None:
+    """
+    Integrate, clamp and reflect bodies lo to hi - 1, one at a time. Works on
+    interleaved buffers as in BodyStore (memoryviews or anything indexable 
+    the same way). Sleeping bodies are skipped. A body which was clear of a
+    boundary and would end up past the world's edge is reflected at its time
+    of impact (see sweep) rather than clamped, so that fast bodies bounce 
+    off the boundaries even when a step is long.
+    > param pos, vel, accl, ext: Interleaved position, velocity, acceleration
+                                 and extent (cols, lns) buffers
+    > param lo: ID of the first body
+    > param hi: ID after the last body
+    > param dt: Delta time
+    > param worldSize: World size (lines, columns)
+    > param bndry: Tuple (lWall x, rWall x, ceiling y, ground y, lWall COR,
+                   rWall COR, ceiling COR, ground COR)
+    > param still: Still time buffer, as in BodyStore; None if no body sleeps
+    > param integrator: One of INTEGRATORS
+    > param drag: Linear drag coefficient, in 1 / seconds
+    """
+    lX, rX, cY, gY, lCor, rCor, cCor, gCor = bndry
+    ht, wd = worldSize
+    method = INTEGRATORS.index(integrator)
+    h      = dt * 0.5
+    for i in range(lo, hi):
+        if still is not None and still[i] >= sleeping.ASLEEP:
+            continue
+        j         = 2 * i
+        x, y      = pos[j], pos[j + 1]
+        cols, lns = ext[j], ext[j + 1]
+        # Engine._doesObjCrossBndries, inlined
+        bndryData = (x - 1 < lX, x + cols > rX, y - 1 < cY, y + lns > gY)
+
+        vx, vy = vel[j], vel[j + 1]
+        ax, ay = accl[j], accl[j + 1]
+        if method == 0:
+            vx += (ax - drag * vx) * dt
+            vy += (ay - drag * vy) * dt
+            x  += vx * dt
+            y  += vy * dt
+        elif method == 1:
+            x  += (vx + (ax - drag * vx) * h) * dt
+            y  += (vy + (ay - drag * vy) * h) * dt
+            vx  = (vx * (1 - drag * h) + ax * dt) / (1 + drag * h)
+            vy  = (vy * (1 - drag * h) + ay * dt) / (1 + drag * h)
+        else:
+            # Velocities of the stages, which are also the slopes of the 
+            # position; s is their weighted sum
+            vx2 = vx + (ax - drag * vx) * h
+            vx3 = vx + (ax - drag * vx2) * h
+            vx4 = vx + (ax - drag * vx3) * dt
+            sx  = vx + 2 * vx2 + 2 * vx3 + vx4
+            vy2 = vy + (ay - drag * vy) * h
+            vy3 = vy + (ay - drag * vy2) * h
+            vy4 = vy + (ay - drag * vy3) * dt
+            sy  = vy + 2 * vy2 + 2 * vy3 + vy4
+            x  += sx * dt / 6
+            y  += sy * dt / 6
+            vx += (6 * ax - drag * sx) * dt / 6
+            vy += (6 * ay - drag * sy) * dt / 6
+
+        if x < 0 and not bndryData[0]:
+            vx, x = sweep(x, pos[j], vx, 1, lCor, dt)
+        elif x > wd - cols and not bndryData[1]:
+            vx, x = sweep(x, pos[j], vx, wd - cols - 1, rCor, dt)
+        if y < 0 and not bndryData[2]:
+            vy, y = sweep(y, pos[j + 1], vy, 1, cCor, dt)
+        elif y > ht - lns and not bndryData[3]:
+            vy, y = sweep(y, pos[j + 1], vy, ht - lns - 1, gCor, dt)
+
+        # If the object crosses the boundaries, move the object inside 
+        # the boundaries
+        x = max(0, min(x, wd - cols))
+        y = max(0, min(y, ht - lns))
+
+        if bndryData[0] and (vx < 0 or x <= 1):
+            vx = -vx * lCor
+            x  = 1
+        if bndryData[1] and (vx > 0 or x + cols >= wd):
+            vx = -vx * rCor
+            x  = wd - cols + 1 - 2
+        if bndryData[2] and (vy > 0 or y <= 1):
+            vy = -vy * cCor
+            y  = 1
+        if bndryData[3] and (vy < 0 or y + lns >= ht):
+            vy = -vy * gCor
+            y  = ht - lns + 1 - 2
+
+        pos[j], pos[j + 1] = x, y
+        vel[j], vel[j + 1] = vx, vy
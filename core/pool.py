@@ -0,0 +1,158 @@
+import typing  as ty
+import objects as objs
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import store as st
+
+
+class BodyPool:
+    """
+    Allocator of the movable objects of an engine. Bodies live in a
+    BodyStore, densely, so that the kernels only ever see the range
+    [0, cnt): despawning moves the last body into the freed slot (see
+    BodyStore.swapRemove), in O(1). The despawned object is kept on a free
+    list for its class, and reused by the next spawn of that class instead
+    of allocating a new one.
+    Policies, applied by step: a maximum number of live bodies (the oldest
+    ones are despawned first), a time to live, and despawning bodies which
+    are far outside the view.
+    NOTE: A body's ID changes when another one is despawned, but its object
+          follows it, so only IDs held on to across a despawn are stale.
+    """
+    def __init__(self, store: "st.BodyStore", movObjs: list["objs.MovableObj"],
+                 maxLive: int | None = None, ttl: float | None = None,
+                 offscreen: float | None = None) -> None:
+        """
+        > param store: Store holding the bodies
+        > param movObjs: Objects viewing `store`, in ID order; kept in sync
+        > param maxLive: Maximum number of live bodies; unlimited if None
+        > param ttl: Seconds a body lives for; forever if None
+        > param offscreen: Distance in cells from the view past which bodies
+                           are despawned; never if None
+        """
+        self.free     : dict[type, list["objs.MovableObj"]]
+        self.store     = store
+        self.movObjs   = movObjs
+        self.maxLive   = maxLive
+        self.ttl       = ttl
+        self.offscreen = offscreen
+        self.free      = {}
+        # Bodies despawned so far
+        self.despawned = 0
+
+    def spawn(self, cls: type["objs.MovableObj"], *args: ty.Any,
+              **kwargs: ty.Any) -> "objs.MovableObj":
+        """
+        Create a movable object at the end of the store, reusing a despawned
+        object of the same class if there is one.
+        > param cls: Class of the object
+        > param args, kwargs: Arguments of the class, without the store
+        > return: The object
+        """
+        if (free := self.free.get(cls)):
+            obj = free.pop()
+            obj.__init__(*args, **kwargs, store=self.store)
+        else:
+            obj = cls(*args, **kwargs, store=self.store)
+        self.movObjs.append(obj)
+        return obj
+
+    def despawn(self, obj: "objs.MovableObj") -> None:
+        """
+        Remove a movable object, in O(1). The last body takes its ID.
+        > param obj: Object to remove
+        """
+        i     = obj.id
+        moved = self.store.swapRemove(i)
+        if moved != -1:
+            self.movObjs[i]    = self.movObjs[moved]
+            self.movObjs[i].id = i
+        self.movObjs.pop()
+        self.free.setdefault(type(obj), []).append(obj)
+        self.despawned += 1
+        # The objects no longer match the sprites cached by ID
+        objs.spriteEpoch += 1
+
+    def step(self, dt: float, view: tuple[float, float, float, float] | None,
+             keep: int = -1) -> int:
+        """
+        Age the bodies, and apply the despawn policies.
+        > param dt: Seconds passed since the last call
+        > param view: Rectangle of the world in view, as (x0, y0, x1, y1);
+                      None to never despawn bodies for being out of view
+        > param keep: ID of a body never to despawn (the player)
+        > return: Number of bodies despawned
+        """
+        store = self.store
+        n     = store.cnt
+        if not n or (self.maxLive is None and self.ttl is None
+                     and (self.offscreen is None or view is None)):
+            return 0
+        if self.maxLive is not None or self.ttl is not None:
+            if vecphys.AVAILABLE:
+                vecphys.storeViews(store)["age"][:] += dt
+            else:
+                age = store.age
+                for i in range(n):
+                    age[i] += dt
+        doomed = self._doomed(view, keep)
+        # Highest IDs first, so that the bodies moved into the freed slots
+        # are never ones still to be despawned
+        for i in sorted(doomed, reverse=True):
+            self.despawn(self.movObjs[i])
+        return len(doomed)
+
+    def _doomed(self, view: tuple[float, float, float, float] | None,
+                keep: int) -> set[int]:
+        """
+        > return: IDs of the bodies to despawn under the policies
+        """
+        store = self.store
+        n     = store.cnt
+        if vecphys.AVAILABLE:
+            np     = vecphys.np
+            views  = vecphys.storeViews(store)
+            age    = views["age"]
+            doomed = np.zeros(n, dtype=bool)
+            if self.ttl is not None:
+                doomed |= age >= self.ttl
+            if self.offscreen is not None and view is not None:
+                x0, y0, x1, y1 = view
+                m        = self.offscreen
+                pos, ext = views["pos"], views["ext"]
+                doomed  |= ((pos[:, 0] + ext[:, 0] < x0 - m)
+                            | (pos[:, 0] >= x1 + m)
+                            | (pos[:, 1] + ext[:, 1] < y0 - m)
+                            | (pos[:, 1] >= y1 + m))
+            if keep >= 0:
+                doomed[keep] = False
+            ids  = set(np.flatnonzero(doomed).tolist())
+            over = n - len(ids) - (self.maxLive or n)
+            if over > 0:
+                # The oldest of the remaining bodies
+                age           = np.where(doomed, -1.0, age)
+                if keep >= 0:
+                    age[keep] = -1.0
+                ids.update(np.argpartition(age, n - over)[n - over:].tolist())
+            return ids
+        pos, ext, age = store.pos, store.ext, store.age
+        ids           = set()
+        for i in range(n):
+            if i == keep:
+                continue
+            if self.ttl is not None and age[i] >= self.ttl:
+                ids.add(i)
+            elif self.offscreen is not None and view is not None:
+                x0, y0, x1, y1 = view
+                m, j           = self.offscreen, 2 * i
+                if pos[j] + ext[j] < x0 - m or pos[j] >= x1 + m or \
+                        pos[j + 1] + ext[j + 1] < y0 - m or \
+                        pos[j + 1] >= y1 + m:
+                    ids.add(i)
+        over = n - len(ids) - (self.maxLive or n)
+        if over > 0:
+            ids.update(sorted((i for i in range(n)
+                               if i not in ids and i != keep),
+                              key=lambda i: age[i])[-over:])
+        return ids
@@ -0,0 +1,171 @@
+import array
+import contextvars
+import math
+import time
+
+# Phases of a frame, in the order they happen
+PHASES        = ("update", "collide", "compose", "present", "record",
+                 "publish", "input", "sleep", "refresh")
+# Number of frames the rolling percentiles are computed over
+WINDOW        = 600
+# Percentiles shown and exported
+QUANTILES     = (0.50, 0.95, 0.99)
+# Frames between two updates of the overlay
+OVERLAY_EVERY = 30
+
+
+def noLap(phase: str) -> None:
+    pass
+
+
+class Clock:
+    """
+    Phase times charged by one task (or thread) so far, and the time of its
+    last lap.
+    """
+    __slots__ = ("last", "times")
+
+    def __init__(self) -> None:
+        self.last  = time.perf_counter()
+        self.times = dict.fromkeys(PHASES, 0.0)
+
+
+class Profiler:
+    """
+    Per-phase frame timer. The frame is split into phases by calling lap at
+    the end of each one, which charges the time since the previous lap to
+    it; endFrame then closes the frame. The times of the last WINDOW frames
+    are kept for rolling percentiles, and, if a trace is kept, every frame is
+    kept for export. Each asyncio task and each thread has its own clock 
+    (see Clock), so phases can be timed from several of them at once, e.g. 
+    when simulating and rendering are pipelined (see Engine._run): a clock 
+    is started by begin, and only ever charged by its own task. The times of
+    one are handed to another with take and add, and endFrame closes the 
+    frame with the times of the caller's clock.
+    NOTE: A disabled profiler is just `lap = noLap` (see Engine), so that
+          the hot paths only pay for a call to an empty function.
+    """
+    def __init__(self, trace: bool = False) -> None:
+        """
+        > param trace: Whether to keep the times of every frame, for export
+        """
+        self.ring   : list[array.array]
+        self.shown  : list[str]
+        self.ring    = [array.array('d', bytes(8 * WINDOW)) for _ in PHASES]
+        self.frames  = 0
+        self.trace   = array.array('d') if trace else None
+        # Clock of the calling task or thread; new threads start without one
+        self.clock   = contextvars.ContextVar("clock")
+        # Lines of the overlay, and the frame they were made at
+        self.shown   = []
+        self.shownAt = 0
+
+    def _clock(self) -> Clock:
+        """
+        > return: Clock of the calling task or thread, started if it has none
+        """
+        if (clock := self.clock.get(None)) is None:
+            self.clock.set(clock := Clock())
+        return clock
+
+    def begin(self) -> None:
+        """
+        Give the calling task or thread a new clock, e.g. before the first 
+        frame, so that the time spent before it is not charged to the first
+        phase.
+        """
+        self.clock.set(Clock())
+
+    def lap(self, phase: str) -> None:
+        """
+        Charge the time since the last lap of the caller's clock to a phase.
+        > param phase: One of PHASES
+        """
+        now                 = time.perf_counter()
+        clock               = self._clock()
+        clock.times[phase] += now - clock.last
+        clock.last          = now
+
+    def take(self) -> dict[str, float]:
+        """
+        > return: Phase times charged to the caller's clock so far, which are
+                  reset
+        """
+        clock       = self._clock()
+        times       = clock.times
+        clock.times = dict.fromkeys(PHASES, 0.0)
+        return times
+
+    def add(self, times: dict[str, float]) -> None:
+        """
+        Charge phase times, e.g. taken from another clock, to the caller's.
+        """
+        cur = self._clock().times
+        for phase, t in times.items():
+            cur[phase] += t
+
+    def endFrame(self) -> None:
+        """
+        Close the current frame with the times charged to the caller's clock,
+        and start the next one.
+        """
+        times = self.take()
+        k     = self.frames % WINDOW
+        for ring, phase in zip(self.ring, PHASES):
+            ring[k] = times[phase]
+        if self.trace is not None:
+            self.trace.extend(times.values())
+        self.frames += 1
+
+    def percentiles(self) -> dict[str, tuple[float, ...]]:
+        """
+        > return: Dictionary of phase to its QUANTILES, in seconds, over the
+                  last WINDOW frames (nearest rank)
+        """
+        n = min(self.frames, WINDOW)
+        if not n:
+            return {phase: (0.0, ) * len(QUANTILES) for phase in PHASES}
+        stats = {}
+        for ring, phase in zip(self.ring, PHASES):
+            vals         = sorted(ring[:n])
+            stats[phase] = tuple(vals[max(math.ceil(q * n), 1) - 1]
+                                 for q in QUANTILES)
+        return stats
+
+    def overlay(self) -> list[str]:
+        """
+        > return: Lines of the stats overlay, in milliseconds; only 
+                  recomputed every OVERLAY_EVERY frames
+        """
+        if self.shown and self.frames - self.shownAt < OVERLAY_EVERY:
+            return self.shown
+        lines = ["phase".ljust(8) + ''.join(f"p{round(q * 100)}".rjust(8)
+                                            for q in QUANTILES)]
+        for phase, vals in self.percentiles().items():
+            lines.append(phase.ljust(8)
+                         + ''.join(f"{v * 1e3:8.3f}" for v in vals))
+        self.shown   = lines
+        self.shownAt = self.frames
+        return lines
+
+    def export(self, path: str) -> None:
+        """
+        Write the trace to a file: CSV (one row of phase times per frame, in
+        seconds) if the path ends with .csv, else JSON (the same, plus the
+        rolling percentiles).
+        > param path: Path of the trace file
+        """
+        trace  = self.trace if self.trace is not None else array.array('d')
+        k      = len(PHASES)
+        frames = [trace[i:i + k].tolist() for i in range(0, len(trace), k)]
+        with open(path, 'w', newline='') as f:
+            if path.lower().endswith(".csv"):
+                f.write("frame," + ','.join(PHASES) + '\n')
+                for i, row in enumerate(frames):
+                    f.write(f"{i}," + ','.join(map(repr, row)) + '\n')
+                return
+            import json
+            json.dump({"phases": PHASES,
+                       "quantiles": QUANTILES,
+                       "percentiles": self.percentiles(),
+                       "frames": frames}, f)
@@ -0,0 +1,263 @@
+import mmap
+import os
+import struct
+import time
+import typing as ty
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import store as st
+
+MAGIC       = b"BAPS"
+VERSION     = 1
+# Store fields published, and their number of components
+FIELDS      = (("pos", 2), ("ext", 2), ("still", 1))
+# magic, version, layout generation, body capacity, latest slot
+HEADER      = struct.Struct("<4sHxxIII")
+# Offsets of the layout generation and of the latest slot in the header,
+# and of the first slot (8-byte aligned)
+GEN_AT      = 8
+LATEST_AT   = 16
+SLOTS_AT    = 24
+# seq, frame, seconds since the start, fps, body count, substeps, player ID,
+# world lines, world columns
+SLOT_HEADER = struct.Struct("<QQddIIiII12x")
+SEQ         = struct.Struct("<Q")
+U32         = struct.Struct("<I")
+# `latest` while no slot holds a complete frame of the current layout
+NO_SLOT     = 0xFFFFFFFF
+
+
+def _slotSize(cap: int) -> int:
+    return SLOT_HEADER.size + cap * sum(comps for _, comps in FIELDS) * 8
+
+
+def _slotAt(cap: int, slot: int) -> int:
+    return SLOTS_AT + slot * _slotSize(cap)
+
+
+class Publisher:
+    """
+    Publishes the bodies and the frame counters of an engine to a memory-
+    mapped file, for other processes to watch (see Reader). The file holds
+    two slots, written alternately, each guarded by a sequence number (a
+    seqlock): the number is odd while the slot is being written. Once a slot
+    is written, the header's `latest` is pointed at it, so readers always
+    find a complete frame, which stays intact until the frame after the next
+    one is published. Readers check the sequence number again once done with
+    the slot, to know whether it was overwritten meanwhile.
+    NOTE: The file grows when the bodies outgrow it. Both slots are marked 
+          as being written, and `latest` as NO_SLOT, before it is resized;
+          the layout generation in the header is only bumped once the 
+          first frame of the new layout is written, and readers then remap
+          it. Publishing never waits on readers.
+    NOTE: Ordering between the writes relies on the stores of the CPU being
+          seen in order, as on x86-64.
+    """
+    def __init__(self, path: str, cap: int = 1024) -> None:
+        """
+        > param path: Path of the file; created, or overwritten
+        > param cap: Initial capacity, in bodies
+        """
+        self.path   = path
+        self.f      = open(path, "w+b")
+        self.mm     = None
+        self.cap    = 0
+        self.gen    = 0
+        self.latest = 1
+        # Sequence number of the last frame written; shared by both slots,
+        # so that the number of a slot never takes the same value twice
+        self.seq    = 0
+        # Whether no frame was written since the file was last resized
+        self.fresh  = True
+        self.frame  = 0
+        self.start  = time.perf_counter()
+        self._map(max(cap, 1))
+
+    def _map(self, cap: int) -> None:
+        """
+        Size the file for `cap` bodies, and map it again. Until the next 
+        frame is written, readers find no frame (see NO_SLOT).
+        """
+        if self.mm is not None:
+            # Snapshots of the old layout, and reads in progress, are then
+            # seen as overwritten
+            U32.pack_into(self.mm, LATEST_AT, NO_SLOT)
+            self._invalidate()
+            self.mm.close()
+        size = _slotAt(cap, 2)
+        self.f.truncate(size)
+        self.mm     = mmap.mmap(self.f.fileno(), size)
+        self.cap    = cap
+        self.latest = 1
+        self.fresh  = True
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.gen, cap, NO_SLOT)
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        """
+        Mark both slots of the current layout as being written.
+        """
+        for slot in (0, 1):
+            SEQ.pack_into(self.mm, _slotAt(self.cap, slot), self.seq + 1)
+
+    def publish(self, store: "st.BodyStore", fps: float = 0.0,
+                substeps: int = 1, player: int = -1,
+                worldSize: tuple[int, int] = (0, 0)) -> None:
+        """
+        Publish a frame.
+        > param store: Store holding the bodies; only FIELDS are read
+        > param fps: Frames per second, as last measured
+        > param substeps: Substeps the last update was split into
+        > param player: ID of the player's body; -1 if none
+        > param worldSize: World size (lines, columns)
+        """
+        n = store.cnt
+        if n > self.cap:
+            self._map(max(n, 2 * self.cap))
+        mm   = self.mm
+        slot = 1 - self.latest
+        at   = _slotAt(self.cap, slot)
+        seq  = self.seq + 1
+        SEQ.pack_into(mm, at, seq)
+        SLOT_HEADER.pack_into(mm, at, seq, self.frame,
+                              time.perf_counter() - self.start, fps, n,
+                              substeps, player, *worldSize)
+        off = at + SLOT_HEADER.size
+        for field, comps in FIELDS:
+            k                = comps * n * 8
+            mm[off:off + k]  = getattr(store, field)[:comps * n].cast('B')
+            off             += comps * self.cap * 8
+        SEQ.pack_into(mm, at, seq + 1)
+        if self.fresh:
+            # Readers may now use the new layout
+            self.gen   += 1
+            self.fresh  = False
+            U32.pack_into(mm, GEN_AT, self.gen)
+        U32.pack_into(mm, LATEST_AT, slot)
+        self.seq     = seq + 1
+        self.latest  = slot
+        self.frame  += 1
+
+    def close(self) -> None:
+        """
+        Unmap and close the file. The file is kept, with the last frame.
+        """
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.f.close()
+
+
+class Snapshot:
+    """
+    A published frame, as views over the mapped file: `pos`, `ext` and
+    `still` are NumPy arrays shaped as by vecphys.storeViews if NumPy is
+    installed, else memoryviews laid out as in a BodyStore. The views are
+    only consistent while `valid` returns True; check it once done with them,
+    or use Reader.copy.
+    """
+    __slots__ = ("reader", "at", "seq", "gen", "frame", "time", "fps", "cnt",
+                 "substeps", "player", "worldSize", "pos", "ext", "still")
+
+    def valid(self) -> bool:
+        """
+        > return: Whether the slot has not been written since the snapshot
+                  was taken, i.e. whether the views hold a single frame
+        """
+        mm = self.reader.mm
+        return U32.unpack_from(mm, GEN_AT)[0] == self.gen and \
+            SEQ.unpack_from(mm, self.at)[0] == self.seq
+
+
+class Reader:
+    """
+    Reader of the file written by a Publisher, from any process.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        > param path: Path of the file
+        """
+        self.f   = open(path, "rb")
+        self.mm  = None
+        self.cap = -1
+        self._remap()
+
+    def _remap(self) -> None:
+        # Views of earlier snapshots may still hold the old map, so it is
+        # left to be collected rather than closed
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.cap, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a published state file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported state file version: {version}")
+
+    def read(self, retries: int = 100) -> Snapshot | None:
+        """
+        Take a snapshot of the latest frame, without copying it.
+        > param retries: Attempts to find a slot not being written
+        > return: Snapshot, or None if nothing was published yet, or if every
+                  attempt raced with the publisher
+        """
+        for _ in range(retries):
+            gen, cap = struct.unpack_from("<II", self.mm, GEN_AT)
+            if cap != self.cap or \
+                    os.fstat(self.f.fileno()).st_size != len(self.mm):
+                self._remap()
+                continue
+            slot  = U32.unpack_from(self.mm, LATEST_AT)[0]
+            # Nothing written yet, or since the file grew
+            if slot == NO_SLOT:
+                continue
+            at    = _slotAt(cap, slot)
+            seq, frame, t, fps, n, substeps, player, ht, wd = \
+                SLOT_HEADER.unpack_from(self.mm, at)
+            # Being written
+            if seq % 2:
+                continue
+            snap           = Snapshot()
+            snap.reader    = self
+            snap.at        = at
+            snap.seq       = seq
+            snap.gen       = gen
+            snap.frame     = frame
+            snap.time      = t
+            snap.fps       = fps
+            snap.cnt       = n
+            snap.substeps  = substeps
+            snap.player    = player
+            snap.worldSize = (ht, wd)
+            buf = memoryview(self.mm)
+            off = at + SLOT_HEADER.size
+            for field, comps in FIELDS:
+                view = buf[off:off + comps * n * 8].cast('d')
+                if vecphys.AVAILABLE:
+                    view = vecphys.np.frombuffer(view, dtype=vecphys.np.float64)
+                    view = view.reshape((n, 2) if comps == 2 else (n, ))
+                setattr(snap, field, view)
+                off += comps * cap * 8
+            if snap.valid():
+                return snap
+        return None
+
+    def copy(self, retries: int = 100) -> Snapshot | None:
+        """
+        Like read, but the views are replaced by copies, taken while the
+        slot was not being written, so the snapshot stays consistent.
+        """
+        for _ in range(retries):
+            if (snap := self.read()) is None:
+                return None
+            views = [getattr(snap, field) for field, _ in FIELDS]
+            views = [view.copy() if vecphys.AVAILABLE else
+                     memoryview(bytearray(view.cast('B'))).cast('d')
+                     for view in views]
+            if snap.valid():
+                for (field, _), view in zip(FIELDS, views):
+                    setattr(snap, field, view)
+                return snap
+        return None
+
+    def close(self) -> None:
+        self.f.close()
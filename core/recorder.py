@@ -0,0 +1,226 @@
+import array
+import bisect
+import mmap
+import struct
+import time
+import zlib
+import typing as ty
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import render
+    import store as st
+
+MAGIC        = b"BAPR"
+VERSION      = 1
+# Frames between two keyframes
+KEY_INTERVAL = 60
+# magic, version, keyframe interval
+HEADER       = struct.Struct("<4sHxxI")
+# kind, frame index, seconds since the start, compressed payload length
+RECORD       = struct.Struct("<BxxxIdI")
+# Keyframe: interior lines, interior columns, body count
+KEY_HEADER   = struct.Struct("<HHI")
+# Delta: run count, body count, changed body count
+DELTA_HEADER = struct.Struct("<III")
+# Changed cells: interior row, interior column, length
+RUN          = struct.Struct("<HHH")
+KEY, DELTA   = 0, 1
+
+
+class Recorder:
+    """
+    Append-only frame recorder. Every KEY_INTERVAL frames (and after a 
+    resize) a keyframe holding the whole interior of the screen and every 
+    body position is written; the frames in between only hold the runs of 
+    cells the renderer emitted, and the bodies whose position changed. Each 
+    record is compressed separately, so a stream cut short stays readable up 
+    to its last complete record.
+    """
+    def __init__(self, path: str, keyInterval: int = KEY_INTERVAL) -> None:
+        """
+        > param path: Path of the stream file
+        > param keyInterval: Frames between two keyframes
+        """
+        self.f           = open(path, "wb")
+        self.keyInterval = keyInterval
+        self.frameIdx    = 0
+        self.start       = time.perf_counter()
+        self.lastSize    = (-1, -1)
+        self.lastPos     = array.array('d')
+        self.f.write(HEADER.pack(MAGIC, VERSION, keyInterval))
+
+    def _bodyDelta(self, pos: memoryview, n: int) \
+            -> tuple[array.array, array.array]:
+        """
+        > return: IDs of the bodies whose position changed since the last 
+                  frame (or which are new), and their positions
+        """
+        old = self.lastPos
+        m   = min(n, len(old) // 2)
+        if vecphys.AVAILABLE:
+            np   = vecphys.np
+            cur  = np.frombuffer(pos, dtype=np.float64).reshape(n, 2)
+            prev = np.frombuffer(old, dtype=np.float64,
+                                 count=2 * m).reshape(m, 2)
+            ids  = np.concatenate((np.flatnonzero((cur[:m] != prev).any(1)),
+                                   np.arange(m, n))).astype(np.uint32)
+            return (array.array('I', ids.tobytes()),
+                    array.array('d', cur[ids].tobytes()))
+        ids  = array.array('I', [i for i in range(m)
+                                 if pos[2 * i] != old[2 * i]
+                                 or pos[2 * i + 1] != old[2 * i + 1]])
+        ids.extend(range(m, n))
+        vals = array.array('d')
+        for i in ids:
+            vals.append(pos[2 * i])
+            vals.append(pos[2 * i + 1])
+        return ids, vals
+
+    def frame(self, renderer: "render.Renderer", store: "st.BodyStore") \
+            -> None:
+        """
+        Record the frame the renderer just presented, and the body state.
+        > param renderer: Renderer, with keepRuns set
+        > param store: Store holding the bodies
+        """
+        n    = store.cnt
+        pos  = store.pos[:2 * n]
+        size = (len(renderer.shown), len(renderer.blank))
+        if self.frameIdx % self.keyInterval == 0 or size != self.lastSize:
+            kind    = KEY
+            # Not the front buffer, which may hold DIRTY cells under overlays
+            payload = b''.join((KEY_HEADER.pack(*size, n), *renderer.shown,
+                                pos))
+        else:
+            kind      = DELTA
+            ids, vals = self._bodyDelta(pos, n)
+            parts     = [DELTA_HEADER.pack(len(renderer.runs), n, len(ids))]
+            for r, c, cells in renderer.runs:
+                parts.append(RUN.pack(r, c, len(cells)))
+                parts.append(cells)
+            parts.append(ids.tobytes())
+            parts.append(vals.tobytes())
+            payload   = b''.join(parts)
+        payload = zlib.compress(payload, 1)
+        self.f.write(RECORD.pack(kind, self.frameIdx,
+                                 time.perf_counter() - self.start,
+                                 len(payload)))
+        self.f.write(payload)
+        self.lastSize  = size
+        self.lastPos   = array.array('d', pos)
+        self.frameIdx += 1
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class Frame:
+    """
+    State of the stream at a frame: the interior of the screen, one bytearray
+    per row, and the body positions (interleaved, as in BodyStore.pos).
+    """
+    __slots__ = ("idx", "time", "rows", "pos", "runs")
+
+    def __init__(self) -> None:
+        self.rows: list[bytearray]
+        self.runs: list[tuple[int, int, bytes]] | None
+        self.idx  = -1
+        self.time = 0.0
+        self.rows = []
+        self.pos  = array.array('d')
+        # Runs changed by the last delta applied; None after a keyframe
+        self.runs = None
+
+
+class Reader:
+    """
+    Random-access reader for a recorded stream. The file is memory-mapped
+    and indexed once; any frame is reconstructed from the keyframe before it,
+    without re-simulating anything.
+    """
+    def __init__(self, path: str) -> None:
+        self.index: list[tuple[int, int, float, int, int]]
+        self.keys : list[int]
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.keyInterval = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a recording")
+        if version != VERSION:
+            raise ValueError(f"Unsupported recording version: {version}")
+        # (kind, frame index, time, payload offset, payload length)
+        self.index = []
+        self.keys  = []
+        off        = HEADER.size
+        while off + RECORD.size <= len(self.mm):
+            kind, idx, t, length = RECORD.unpack_from(self.mm, off)
+            off += RECORD.size
+            if off + length > len(self.mm):
+                # Truncated record at the end of the stream
+                break
+            if kind == KEY:
+                self.keys.append(len(self.index))
+            self.index.append((kind, idx, t, off, length))
+            off += length
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def apply(self, frame: Frame, k: int) -> Frame:
+        """
+        Apply record k on top of a frame, in place.
+        > param frame: Frame at record k - 1 (ignored if k is a keyframe)
+        > param k: Record to apply
+        > return: The frame
+        """
+        kind, idx, t, off, length = self.index[k]
+        data = zlib.decompress(self.mm[off:off + length])
+        if kind == KEY:
+            ht, wd, n  = KEY_HEADER.unpack_from(data, 0)
+            p          = KEY_HEADER.size
+            frame.rows = [bytearray(data[p + r * wd:p + (r + 1) * wd])
+                          for r in range(ht)]
+            p         += ht * wd
+            frame.pos  = array.array('d', data[p:p + 16 * n])
+            frame.runs = None
+        else:
+            nRuns, n, nIds = DELTA_HEADER.unpack_from(data, 0)
+            p              = DELTA_HEADER.size
+            runs           = []
+            for _ in range(nRuns):
+                r, c, length  = RUN.unpack_from(data, p)
+                p            += RUN.size
+                cells         = data[p:p + length]
+                p            += length
+                frame.rows[r][c:c + length] = cells
+                runs.append((r, c, cells))
+            ids  = array.array('I', data[p:p + 4 * nIds])
+            p   += 4 * nIds
+            vals = array.array('d', data[p:p + 16 * nIds])
+            pos  = frame.pos
+            if n < len(pos) // 2:
+                del pos[2 * n:]
+            else:
+                pos.extend([0.0] * (2 * n - len(pos)))
+            for j, i in enumerate(ids):
+                pos[2 * i], pos[2 * i + 1] = vals[2 * j], vals[2 * j + 1]
+            frame.runs = runs
+        frame.idx  = idx
+        frame.time = t
+        return frame
+
+    def seek(self, k: int) -> Frame:
+        """
+        > param k: Record to seek to
+        > return: Frame at record k, rebuilt from the keyframe before it
+        """
+        k     = max(0, min(k, len(self.index) - 1))
+        key   = self.keys[max(bisect.bisect_right(self.keys, k) - 1, 0)]
+        frame = Frame()
+        for i in range(key, k + 1):
+            self.apply(frame, i)
+        return frame
+
+    def close(self) -> None:
+        self.mm.close()
@@ -0,0 +1,383 @@
+import curses as cur
+import sleeping
+import typing as ty
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import objects as objs
+
+if ty.TYPE_CHECKING:
+    import store as st
+
+
+# Front buffer cell whose content on screen is unknown; never drawn, so the
+# cell always differs from the back buffer
+DIRTY = b'\0'
+
+
+class Renderer:
+    """
+    Damage-tracked renderer. Keeps a copy of the interior of the screen (the
+    front buffer; the border is drawn once, and again after an overlay 
+    covers it), composes every frame into a back
+    buffer, and only emits the rows that differ between the two, with one 
+    call per row. Bodies are rasterised into the back buffer all at once 
+    with NumPy, if it is installed. The screen is never cleared; on a resize,
+    the front buffer is cut or extended in place, and only the cells it did
+    not cover are redrawn (see resize). The interior shows the part of the world starting at the camera
+    position, `cam`.
+    """
+    def __init__(self, win: cur.window) -> None:
+        self.front    : list[bytearray]
+        self.shown    : list[bytearray]
+        self.win       = win
+        self.front     = []
+        # Rows of the frame presented last, as composed: unlike the front 
+        # buffer, without the cells overlays were drawn over marked DIRTY
+        self.shown     = []
+        self.termSize  = (0, 0)
+        self.blank     = b''
+        # Characters and calls emitted for the last frame
+        self.cellsOut  = 0
+        self.callsOut  = 0
+        # Whether to keep the runs emitted for the last frame in `runs`, as 
+        # (interior row, interior column, cells); used by the recorder
+        self.keepRuns  = False
+        self.runs     : list[tuple[int, int, bytes]]
+        self.runs      = []
+        # Statics and sleeping bodies, drawn once and reused until a body 
+        # falls asleep or wakes up, and the key it was drawn for
+        self.base     : list[bytearray]
+        self.base      = []
+        self.baseKey   = None
+        # Sprite.uid of every body, and Sprite.uid to the (row, column, 
+        # character) arrays of the sprite's cells, for rasterise; refreshed 
+        # when an object's sprite changes (objects.spriteEpoch)
+        self.uids      = None
+        self.uidKey    = None
+        self.cells    : dict[int, tuple[ty.Any, ty.Any, ty.Any]]
+        self.cells     = {}
+        # World coordinates of the top-left interior cell; (1, 1) shows the
+        # world from just inside its boundaries
+        self.cam       = (1, 1)
+        # Whether an overlay was drawn over the border since it was last 
+        # drawn (see overlay)
+        self.bordered  = True
+        self.resize(win.getmaxyx())
+
+    def resize(self, termSize: tuple[int, int]) -> None:
+        """
+        Fit the front buffer to a new terminal size, and redraw the border. 
+        The rows of the front buffer are cut or extended in place: the 
+        cells still on screen (curses keeps them on a resize) are not drawn 
+        again, and the new ones, including where the border was, are marked
+        with DIRTY, so that the next frame draws them.
+        > param termSize: Terminal size, as returned by window.getmaxyx
+        """
+        ht, wd        = max(termSize[0] - 2, 0), max(termSize[1] - 2, 0)
+        self.termSize = termSize
+        self.blank    = b' ' * wd
+        self.baseKey  = None
+        if not self.front:
+            # Nothing drawn yet
+            self.front = [bytearray(self.blank) for _ in range(ht)]
+            self.win.erase()
+        else:
+            del self.front[ht:]
+            for row in self.front:
+                if len(row) > wd:
+                    del row[wd:]
+                else:
+                    row.extend(DIRTY * (wd - len(row)))
+            self.front.extend(bytearray(DIRTY * wd)
+                              for _ in range(ht - len(self.front)))
+        self.win.border()
+        self.bordered = True
+
+    def view(self) -> tuple[int, int, int, int]:
+        """
+        > return: Rectangle of the world shown, as (x0, y0, x1, y1), with x1 
+                  and y1 exclusive
+        """
+        cx, cy = self.cam
+        return cx, cy, cx + len(self.blank), cy + len(self.front)
+
+    def follow(self, x: float, y: float, cols: float, lns: float,
+               worldSize: tuple[int, int]) -> None:
+        """
+        Move the camera to centre a rectangle, without showing anything 
+        beyond the world boundaries.
+        > param x, y, cols, lns: Rectangle to centre, e.g. the player
+        > param worldSize: World size (lines, columns)
+        """
+        ht, wd   = len(self.front), len(self.blank)
+        cx       = int(x + cols / 2) - wd // 2
+        cy       = int(y + lns / 2) - ht // 2
+        self.cam = (max(1, min(cx, worldSize[1] - 1 - wd)),
+                    max(1, min(cy, worldSize[0] - 1 - ht)))
+
+    def compose(self, movObjs: list["objs.MovableObj"], store: "st.BodyStore",
+                player: "objs.MovableObj",
+                statics: ty.Sequence["objs.ImmovableObj"] = (),
+                sleepVer: int | None = None,
+                ids: ty.Iterable[int] | None = None) -> list[bytearray]:
+        """
+        Draw the objects in view into a new back buffer, with the immovable 
+        objects at the bottom and the player on top.
+        > param movObjs: Objects to draw, viewing `store` in ID order
+        > param store: Store holding the positions of the objects
+        > param player: Player object
+        > param statics: Immovable objects to draw
+        > param sleepVer: SleepTracker.version, if bodies can sleep; sleeping
+                          bodies are then drawn below the awake ones, into a
+                          layer that is only redrawn when this changes or the
+                          camera moves
+        > param ids: Sorted IDs of the bodies which might be in view (see 
+                     view); every body is considered if None
+        > return: Back buffer, one bytearray per interior row
+        """
+        ht, wd = len(self.front), len(self.blank)
+        cx, cy = self.cam
+        pos    = store.pos
+        pid    = player.id
+        sleep  = sleeping.ASLEEP
+        back   = [bytearray(self.blank) for _ in range(ht)]
+
+        def blit(obj: "objs.BaseObj", x: int, y: int) -> None:
+            x -= cx
+            y -= cy
+            for line in obj.sprite.data:
+                if 0 <= y < ht:
+                    a = x if x > 0 else 0
+                    b = x + len(line)
+                    b = b if b < wd else wd
+                    if a < b:
+                        back[y][a:b] = line[a - x:b - x]
+                y += 1
+
+        def draw(sel: ty.Any) -> None:
+            if np is not None:
+                self.rasterise(back, movObjs, store, sel)
+                return
+            for i in sel:
+                blit(movObjs[i], int(pos[2 * i]), int(pos[2 * i + 1]))
+
+        # Split the bodies into sleeping and awake ones, leaving the player 
+        # out
+        asleep: ty.Any
+        awake : ty.Any
+        if np is not None:
+            ids = (np.arange(store.cnt) if ids is None
+                   else np.asarray(ids, dtype=np.intp))
+            ids = ids[ids != pid]
+            if sleepVer is not None:
+                mask   = np.frombuffer(store.still, dtype=np.float64,
+                                       count=store.cnt)[ids] >= sleep
+                asleep = ids[mask]
+                awake  = ids[~mask]
+            else:
+                awake  = ids
+        else:
+            ids   = range(store.cnt) if ids is None else ids
+            still = store.still
+            if sleepVer is not None:
+                asleep = [i for i in ids if i != pid and still[i] >= sleep]
+                awake  = [i for i in ids if i != pid and still[i] < sleep]
+            else:
+                awake  = [i for i in ids if i != pid]
+
+        if sleepVer is None:
+            for static in statics:
+                if not static.invis:
+                    blit(static, int(static.pos[0]), int(static.pos[1]))
+        else:
+            key = (sleepVer, len(statics), store.cnt, self.cam)
+            if key != self.baseKey:
+                for static in statics:
+                    if not static.invis:
+                        blit(static, int(static.pos[0]), int(static.pos[1]))
+                draw(asleep)
+                self.base    = back
+                self.baseKey = key
+            back = [bytearray(row) for row in self.base]
+        draw(awake)
+        blit(player, int(pos[2 * pid]), int(pos[2 * pid + 1]))
+        return back
+
+    def rasterise(self, back: list[bytearray],
+                  movObjs: list["objs.MovableObj"], store: "st.BodyStore",
+                  ids: "np.ndarray") -> None:
+        """
+        Draw bodies into a back buffer in one vectorised pass, as if they were
+        drawn one after another in ID order. The bodies are grouped by 
+        sprite, every cell of every body is scattered into the buffer, and 
+        where bodies overlap, the cell of the one with the highest ID is 
+        kept.
+        > param back: Back buffer to draw into
+        > param movObjs: Objects viewing `store`, in ID order
+        > param store: Store holding the positions of the objects
+        > param ids: Sorted IDs of the bodies to draw
+        """
+        if not len(ids):
+            return
+        ht, wd = len(back), len(self.blank)
+        cx, cy = self.cam
+        pos    = np.frombuffer(store.pos, dtype=np.float64,
+                               count=2 * store.cnt).reshape(-1, 2)[ids]
+        # int() truncates, as astype does
+        xs     = pos[:, 0].astype(np.intp) - cx
+        ys     = pos[:, 1].astype(np.intp) - cy
+        if (key := (len(movObjs), objs.spriteEpoch)) != self.uidKey:
+            for obj in movObjs:
+                if obj.sprite.uid not in self.cells:
+                    self.cells[obj.sprite.uid] = _spriteCells(obj.sprite)
+            self.uids   = np.fromiter((obj.sprite.uid for obj in movObjs),
+                                      np.intp, len(movObjs))
+            self.uidKey = key
+        # Group the bodies by sprite
+        uids   = self.uids[ids]
+        order  = np.argsort(uids, kind="stable")
+        uids   = uids[order]
+        starts = [0, *(np.flatnonzero(uids[1:] != uids[:-1]) + 1).tolist(),
+                  len(uids)]
+        cellLst: list[np.ndarray]
+        keyLst : list[np.ndarray]
+        cellLst, keyLst = [], []
+        for lo, hi in zip(starts, starts[1:]):
+            sel = order[lo:hi]
+            dy, dx, chars = self.cells[int(uids[lo])]
+            rows = ys[sel, None] + dy
+            cols = xs[sel, None] + dx
+            ok   = (rows >= 0) & (rows < ht) & (cols >= 0) & (cols < wd)
+            cellLst.append((rows * wd + cols)[ok])
+            # Body ID above the character, so that the largest key of a cell
+            # belongs to the body drawn last, and holds its character
+            keyLst.append((ids[sel, None] << 8 | chars)[ok])
+        top   = np.full(ht * wd, -1, dtype=np.intp)
+        np.maximum.at(top, np.concatenate(cellLst), np.concatenate(keyLst))
+        drawn = top >= 0
+        buf   = bytearray().join(back)
+        np.frombuffer(buf, dtype=np.uint8)[drawn] = top[drawn] & 0xFF
+        for r in range(ht):
+            back[r][:] = buf[r * wd:(r + 1) * wd]
+
+    def present(self, back: list[bytearray]) -> None:
+        """
+        Emit the cells of the back buffer that differ from the front buffer,
+        then make the back buffer the new front buffer. Each changed row is 
+        written with a single call, from its first to its last changed cell,
+        so there are never more calls than rows.
+        > param back: Back buffer returned by compose
+        """
+        runs: list[tuple[int, int, bytes]]
+        cellsOut, callsOut = 0, 0
+        addnstr            = self.win.addnstr
+        runs               = []
+        for r, (new, old) in enumerate(zip(back, self.front)):
+            if new == old:
+                continue
+            i, j = 0, len(new)
+            while new[i] == old[i]:
+                i += 1
+            while new[j - 1] == old[j - 1]:
+                j -= 1
+            addnstr(r + 1, i + 1, new[i:j].decode("ascii"), j - i)
+            if self.keepRuns:
+                runs.append((r, i, bytes(new[i:j])))
+            cellsOut += j - i
+            callsOut += 1
+        if not self.bordered:
+            self.win.border()
+            self.bordered = True
+        self.front    = back
+        self.shown    = list(back)
+        self.runs     = runs
+        self.cellsOut = cellsOut
+        self.callsOut = callsOut
+
+    def overlay(self, y: int, x: int, txt: str, n: int,
+                attr: int = 0) -> None:
+        """
+        Draw text over the frame presented last, e.g. a debug readout. The 
+        interior cells it covers are marked with DIRTY in the front buffer, 
+        and the border is redrawn if it covers any of it, so that the next 
+        frame draws over the text, whether or not it is drawn again.
+        > param y, x: Screen coordinates of the text
+        > param n: Most characters to draw, as in window.addnstr
+        > param attr: Attributes of the text, as in window.addnstr
+        """
+        self.win.addnstr(y, x, txt, n, attr)
+        ht, wd = len(self.front), len(self.blank)
+        end    = x + min(n, len(txt))
+        if y < 1 or y > ht or x < 1 or end > wd + 1:
+            self.bordered = False
+        if 1 <= y <= ht:
+            a, b = max(x, 1) - 1, min(end, wd + 1) - 1
+            if a < b:
+                # A copy, so that the row of `shown` is left as it was
+                row               = bytearray(self.front[y - 1])
+                row[a:b]          = DIRTY * (b - a)
+                self.front[y - 1] = row
+
+
+def _spriteCells(sprite: "objs.Sprite") \
+        -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    > return: Row offsets, column offsets and characters of every cell of a 
+              sprite, as 1-D arrays
+    """
+    dy, dx, chars = [], [], []
+    for r, line in enumerate(sprite.data):
+        dy.extend([r] * len(line))
+        dx.extend(range(len(line)))
+        chars.extend(line)
+    return (np.array(dy, dtype=np.intp), np.array(dx, dtype=np.intp),
+            np.array(chars, dtype=np.uint8))
+
+
+class OffscreenWin:
+    """
+    Stand-in for a curses window that draws into an in-memory character grid,
+    for rendering without a terminal (benchmarks, recordings).
+    """
+    def __init__(self, lns: int, cols: int) -> None:
+        self.lns  = lns
+        self.cols = cols
+        self.grid = [[' '] * cols for _ in range(lns)]
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return self.lns, self.cols
+
+    def addnstr(self, y: int, x: int, txt: str, n: int,
+                attr: int = 0) -> None:
+        row = self.grid[y]
+        for i, char in enumerate(txt[:max(min(n, self.cols - x), 0)]):
+            row[x + i] = char
+
+    def erase(self) -> None:
+        self.grid = [[' '] * self.cols for _ in range(self.lns)]
+
+    clear = erase
+
+    def border(self) -> None:
+        for row in (self.grid[0], self.grid[-1]):
+            row[:] = '-' * self.cols
+        for row in self.grid:
+            row[0] = row[-1] = '|'
+        for y, x in ((0, 0), (0, -1), (-1, 0), (-1, -1)):
+            self.grid[y][x] = '+'
+
+    def refresh(self) -> None:
+        pass
+
+    def getch(self) -> int:
+        return -1
+
+    def lines(self) -> list[str]:
+        """
+        > return: Contents of the window, one string per line
+        """
+        return [''.join(row) for row in self.grid]
@@ -0,0 +1,168 @@
+import array
+import itertools as it
+import typing    as ty
+import objects   as objs
+import physics
+
+if ty.TYPE_CHECKING:
+    import engine
+
+# Rows of a squares block parsed at a time, so that a large scene is never
+# held in memory as a whole
+CHUNK     = 4096
+# Columns of a row of a squares block: x, y, vx, vy, ax, ay, COR, side
+SQ_COLS   = 8
+# Store fields filled from a squares block, as (field, first column, number
+# of components)
+SQ_FIELDS = (("pos", 0, 2), ("vel", 2, 2), ("accl", 4, 2), ("cor", 6, 1))
+
+
+def load(eng: "engine.Engine", path: str) -> None:
+    """
+    Spawn the objects described by a scene file into an engine. A scene file
+    is a text file with one directive per line; everything after a '#' is a
+    comment, and blank lines are ignored:
+        world <lines> <columns>
+            World size. Ignored if the engine was given one
+        integrator <name>
+            Integration method, one of physics.INTEGRATORS. Ignored if the
+            engine was given one
+        player <x> <y> <vx> <vy> <ax> <ay> <COR> <wd> <ht> [<text>]
+            The player; its text, if given, replaces the wd x ht rectangle.
+            The text cannot hold spaces, and "\\n" separates its lines
+        wall <x> <y> <wd> <ht> <COR> [<char>]
+            An internal wall
+        squares <n> [<char>]
+            A block of n squares, followed by exactly n rows of
+            <x> <y> <vx> <vy> <ax> <ay> <COR> <side>, with nothing else in
+            between
+    Texts and characters must be printable ASCII (see objs.Sprite).
+    The rows of a squares block are read CHUNK at a time and written
+    straight into the engine's store, column by column; the objects viewing
+    them are then built without calling __init__, as snapshot.load does.
+    > param eng: Engine to spawn into
+    > param path: Path of the scene file
+    """
+    with open(path, "rb") as f:
+        lineNo = 0
+        for line in f:
+            lineNo += 1
+            text    = line.split(b'#', 1)[0]
+            if not text.isascii():
+                raise ValueError(f"{path}:{lineNo}: Objects can only be "
+                                 "drawn with ASCII characters")
+            words   = text.decode("ascii").split()
+            if not words:
+                continue
+            cmd, vals = words[0].lower(), words[1:]
+            if cmd not in ("world", "integrator", "player", "wall",
+                           "squares"):
+                raise ValueError(f"{path}:{lineNo}: Unknown directive: "
+                                 f"{words[0]}")
+            try:
+                if cmd == "world":
+                    ht, wd = map(int, vals)
+                    ok     = min(ht, wd) >= 4
+                elif cmd == "integrator":
+                    ok = len(vals) == 1 and vals[0] in physics.INTEGRATORS
+                elif cmd == "player":
+                    x, y, vx, vy, ax, ay, cor = map(float, vals[:7])
+                    wd, ht                    = map(int, vals[7:9])
+                    txt                       = (vals[9].replace("\\n", '\n')
+                                                 if len(vals) == 10 else '')
+                    ok                        = len(vals) in (9, 10)
+                elif cmd == "wall":
+                    x, y      = map(float, vals[:2])
+                    wd, ht    = map(int, vals[2:4])
+                    cor, char = float(vals[4]), (vals[5:] or ['#'])[0]
+                    ok        = (len(vals) <= 6 and len(char) == 1
+                                 and wd > 0 and ht > 0)
+                else:
+                    n, char = int(vals[0]), (vals[1:] or ['#'])[0]
+                    ok      = n >= 0 and len(vals) <= 2 and len(char) == 1
+            except (ValueError, IndexError):
+                ok = False
+            if not ok:
+                raise ValueError(f"{path}:{lineNo}: Invalid {cmd} directive")
+
+            if cmd == "world":
+                # A world size given to the engine takes precedence
+                if eng.fitWorld:
+                    eng.fitWorld = False
+                    eng._setWorldSize((ht, wd))
+            elif cmd == "integrator":
+                if not eng.fixIntegr:
+                    eng.integrator = vals[0]
+            elif cmd == "player":
+                eng._spawnPlayer([x, y], [vx, vy], [ax, ay], cor, wd, ht, txt)
+            elif cmd == "wall":
+                eng._createImmovObj(objs.InternalWall,
+                                    f"wall{len(eng.intWalls)}", (x, y), cor,
+                                    wd, ht, char)
+            else:
+                lineNo = _loadSquares(eng, f, n, char, lineNo)
+
+
+def _loadSquares(eng: "engine.Engine", f: ty.BinaryIO, n: int, char: str,
+                 lineNo: int) -> int:
+    """
+    Spawn a block of squares, reading its rows from a scene file.
+    > param f: Scene file, positioned at the first row of the block
+    > param n: Number of rows
+    > param char: Character the squares are drawn with
+    > param lineNo: Line number of the squares directive
+    > return: Line number of the last row
+    """
+    store = eng.store
+    store.reserve(store.cnt + n)
+    left  = n
+    while left:
+        k    = min(left, CHUNK)
+        rows = list(it.islice(f, k))
+        try:
+            vals = memoryview(array.array('d', map(float,
+                                                   b' '.join(rows).split())))
+        except ValueError:
+            vals = memoryview(array.array('d'))
+        sides = vals[SQ_COLS - 1::SQ_COLS].tolist()
+        if len(rows) < k or len(vals) != k * SQ_COLS or \
+                not all(side >= 1 and side.is_integer() for side in sides):
+            raise ValueError(f"{f.name}:{lineNo + 1}: Expected "
+                             f"{k} rows of {SQ_COLS} numbers, with integer "
+                             "sides")
+        lo, hi = store.cnt, store.cnt + k
+        for field, col, comps in SQ_FIELDS:
+            buf = getattr(store, field)
+            for c in range(comps):
+                buf[comps * lo + c:comps * hi:comps] = vals[col + c::SQ_COLS]
+        store.ext[2 * lo:2 * hi:2]     = vals[SQ_COLS - 1::SQ_COLS]
+        store.ext[2 * lo + 1:2 * hi:2] = vals[SQ_COLS - 1::SQ_COLS]
+        store.still[lo:hi]             = memoryview(bytes(8 * k)).cast('d')
+        store.age[lo:hi]               = memoryview(bytes(8 * k)).cast('d')
+        store.cnt = hi
+        _buildSquares(eng, lo, sides, char)
+        left   -= k
+        lineNo += k
+    return lineNo
+
+
+def _buildSquares(eng: "engine.Engine", lo: int, sides: list[float],
+                  char: str) -> None:
+    """
+    Build the Sq objects viewing bodies lo to lo + len(sides) - 1 of the
+    engine's store, whose state is already in place.
+    """
+    store      = eng.store
+    movObjsApp = eng.movObjsApp
+    new        = objs.Sq.__new__
+    for i, side in enumerate(sides, lo):
+        side       = int(side)
+        obj        = new(objs.Sq)
+        obj.store  = store
+        obj.id     = i
+        obj.name   = f"sq{i}"
+        obj.char   = char
+        obj.invis  = False
+        obj.side   = side
+        obj.sprite = objs.getSprite("rect", side, side, char)
+        movObjsApp(obj)
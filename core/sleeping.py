@@ -0,0 +1,131 @@
+import math
+import typing as ty
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import store as st
+
+# A body is calm while the speed along each axis stays below SLEEP_VEL plus
+# the speed it gains falling one cell under its acceleration; bodies resting
+# on a boundary keep hopping within that cell
+SLEEP_VEL  = 0.5
+# Seconds a body has to stay calm for before it is put to sleep, on top of the
+# time a body in free flight can stay calm for (near the top of its arc)
+SLEEP_TIME = 0.5
+# Value of the store's `still` field at and above which a body is asleep
+ASLEEP     = 1.0
+
+
+def isAsleep(still: float) -> bool:
+    return still >= ASLEEP
+
+
+def isCalm(vx: float, vy: float, ax: float, ay: float) -> bool:
+    """
+    > return: Whether a body with the given velocity and acceleration is calm
+    """
+    return abs(vx) < SLEEP_VEL + math.sqrt(2 * abs(ax)) and \
+        abs(vy) < SLEEP_VEL + math.sqrt(2 * abs(ay))
+
+
+class SleepTracker:
+    """
+    Puts bodies which have come to rest to sleep. The store's `still` field
+    holds how long each body has been calm, as a fraction of the time it has
+    to be calm for; once that reaches ASLEEP, the body's velocity is zeroed
+    and the physics kernels and the renderer skip it. Bodies are woken up by
+    wake (player input, collisions) and wakeMany (resizes).
+    """
+    def __init__(self) -> None:
+        # Incremented whenever a body falls asleep or wakes up
+        self.version = 0
+
+    def step(self, store: "st.BodyStore", dt: float) -> None:
+        """
+        Update the still time of every body, and put the bodies which have 
+        settled to sleep.
+        > param store: Store holding the bodies
+        > param dt: Delta time of the step just taken
+        """
+        n = store.cnt
+        if not n:
+            return
+        if vecphys.AVAILABLE:
+            np     = vecphys.np
+            views  = vecphys.storeViews(store)
+            vel    = views["vel"]
+            still  = views["still"]
+            # Reductions along the short axis are slow; work on columns
+            accl   = np.abs(views["accl"])
+            thresh = np.sqrt(2 * accl) + SLEEP_VEL
+            below  = np.abs(vel) < thresh
+            calm   = below[:, 0] & below[:, 1]
+            accl   = np.maximum(accl[:, 0], accl[:, 1])
+            with np.errstate(divide="ignore"):
+                need = SLEEP_TIME + np.where(
+                    accl > 0,
+                    2 * np.maximum(thresh[:, 0], thresh[:, 1]) / accl, 0)
+            fell   = still < ASLEEP
+            still += dt / need
+            still[~calm] = 0.0
+            fell  &= still >= ASLEEP
+            if fell.any():
+                vel[fell] = 0.0
+                self.version += 1
+            return
+        vel, accl, still = store.vel, store.accl, store.still
+        fell             = False
+        for i in range(n):
+            j      = 2 * i
+            if isCalm(vel[j], vel[j + 1], accl[j], accl[j + 1]):
+                a    = max(abs(accl[j]), abs(accl[j + 1]))
+                need = SLEEP_TIME + (2 * (SLEEP_VEL + math.sqrt(2 * a)) / a
+                                     if a > 0 else 0)
+                old       = still[i]
+                still[i] += dt / need
+                if old < ASLEEP <= still[i]:
+                    vel[j] = vel[j + 1] = 0.0
+                    fell   = True
+            else:
+                still[i] = 0.0
+        if fell:
+            self.version += 1
+
+    def wake(self, store: "st.BodyStore", i: int) -> None:
+        """
+        Wake a body up, if it is asleep, and restart its still time.
+        > param store: Store holding the body
+        > param i: ID of the body
+        """
+        if store.still[i] >= ASLEEP:
+            self.version += 1
+        store.still[i] = 0.0
+
+    def wakeMany(self, store: "st.BodyStore", ids: ty.Any) -> None:
+        """
+        Wake a batch of bodies up, and restart their still time.
+        > param store: Store holding the bodies
+        > param ids: IDs of the bodies; a NumPy index array, if NumPy is 
+                     installed, else any iterable
+        """
+        if vecphys.AVAILABLE:
+            still = vecphys.storeViews(store)["still"]
+            if len(ids) and still[ids].max() >= ASLEEP:
+                self.version += 1
+            still[ids] = 0.0
+            return
+        still = store.still
+        fell  = False
+        for i in ids:
+            fell     = fell or still[i] >= ASLEEP
+            still[i] = 0.0
+        if fell:
+            self.version += 1
+
+    def wakeAll(self, store: "st.BodyStore") -> None:
+        """
+        Wake every body up.
+        > param store: Store holding the bodies
+        """
+        store.still[:store.cnt] = memoryview(bytes(8 * store.cnt)).cast('d')
+        self.version += 1
@@ -0,0 +1,219 @@
+import array
+import mmap
+import struct
+import typing  as ty
+import objects as objs
+import physics
+import store   as st
+
+if ty.TYPE_CHECKING:
+    import engine
+
+MAGIC   = b"BAPE"
+VERSION = 4
+# magic, version, lines, columns, time counter, accumulator, fixed dt, 
+# movable count, immovable count, player index, string table size, 
+# integrator (index in the string table), drag, gravity
+HEADER  = struct.Struct("<4sHxxIIqddIIiII4xdd")
+# (x, y, COR) of lWall, rWall, ceiling, ground
+BNDRY   = struct.Struct("<12d")
+# RNG state version, length of the RNG state, gauss_next, has gauss_next
+RNG     = struct.Struct("<IId?7x")
+# type, name, char, sprite, x, y, COR, two type-specific integers, invisible
+IMMOV   = struct.Struct("<BxxxIIIdddiiBxxx")
+
+# Type codes. Appending is fine; reordering breaks existing snapshots
+MOV_TYPES  : tuple[type[objs.MovableObj], ...]   = (objs.MovableObj, objs.Sq,
+                                                    objs.Player, objs.Diamond)
+IMMOV_TYPES: tuple[type[objs.ImmovableObj], ...] = (objs.ImmovableObj,
+                                                    objs.BoundaryObj,
+                                                    objs.InternalWall)
+# Type-specific integer attributes, stored alongside the common ones
+MOV_EXTRA  = {objs.Sq: ("side", ), objs.Player: ("health", ),
+              objs.Diamond: ("ht", )}
+IMMOV_EXTRA = {objs.BoundaryObj: ("size", ), objs.InternalWall: ("wd", "ht")}
+
+
+def _pad(n: int) -> int:
+    """
+    > return: Number of padding bytes to align n to 8 bytes
+    """
+    return -n % 8
+
+
+def save(eng: "engine.Engine", path: str) -> None:
+    """
+    Write the full state of an engine (bodies, walls, terminal size, time 
+    counter, RNG state, integrator, drag and gravity) to a binary snapshot.
+    The store's buffers are written as is, so resuming gives bit-identical 
+    results.
+    > param eng: Engine to save
+    > param path: Path of the snapshot file
+    """
+    strTable: dict[str, int]
+    store    = eng.store
+    n        = store.cnt
+    strTable = {}
+    intern   = lambda s: strTable.setdefault(s, len(strTable))
+
+    types, names, chars, sprites, invis = (array.array('B'), array.array('I'),
+                                           array.array('I'), array.array('I'),
+                                           array.array('B'))
+    extra = array.array('i')
+    for obj in eng.movObjs:
+        types.append(MOV_TYPES.index(type(obj)))
+        names.append(intern(obj.name))
+        chars.append(intern(obj.char))
+        sprites.append(intern(obj.txt))
+        invis.append(obj.invis)
+        attrs = MOV_EXTRA.get(type(obj), ())
+        extra.append(getattr(obj, attrs[0]) if attrs else 0)
+    immov = b''.join(
+        IMMOV.pack(IMMOV_TYPES.index(type(obj)), intern(obj.name),
+                   intern(obj.char), intern(obj.txt), obj.pos[0], obj.pos[1],
+                   obj.cor,
+                   *[getattr(obj, i) for i in IMMOV_EXTRA.get(type(obj), ())],
+                   *[0] * (2 - len(IMMOV_EXTRA.get(type(obj), ()))),
+                   obj.invis)
+        for obj in eng.immovObjs)
+
+    rngVer, rngInts, gauss = eng.rng.getstate()
+    integr  = intern(eng.integrator)
+    strBlob = '\0'.join(strTable).encode("utf-8")
+    player  = eng.movObjs.index(eng.player) if eng.player is not None else -1
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, *eng.worldSize, eng.roughTimeCnt,
+                            eng.accum, eng.fixedDt, n, len(eng.immovObjs),
+                            player, len(strBlob), integr, eng.drag,
+                            eng.gravity))
+        f.write(BNDRY.pack(*[val for wall in (eng.lWall, eng.rWall,
+                                              eng.ceiling, eng.ground)
+                             for val in (*wall.pos, wall.cor)]))
+        f.write(RNG.pack(rngVer, len(rngInts), gauss or 0.0, gauss is not None))
+        f.write(rngArr := array.array('I', rngInts))
+        f.write(b'\0' * _pad(len(rngArr) * rngArr.itemsize))
+        f.write(strBlob + b'\0' * _pad(len(strBlob)))
+        for col in (types, names, chars, sprites, invis, extra):
+            f.write(col)
+            f.write(b'\0' * _pad(len(col) * col.itemsize))
+        for field, comps in st.FIELDS:
+            f.write(getattr(store, field)[:comps * n])
+        f.write(immov)
+
+
+def load(eng: "engine.Engine", path: str) -> None:
+    """
+    Replace the state of an engine with a snapshot written by save. The file
+    is memory-mapped, and the body state is copied straight from it into the
+    engine's store. The integrator, drag and gravity of the snapshot replace
+    the engine's; if the engine was given others (see Engine.fixIntegr), a 
+    ValueError is raised instead, and nothing is replaced.
+    > param eng: Engine to load into
+    > param path: Path of the snapshot file
+    """
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = memoryview(mm)
+        try:
+            _load(eng, buf)
+        finally:
+            buf.release()
+
+
+def _load(eng: "engine.Engine", buf: memoryview) -> None:
+    off = 0
+
+    def take(nbytes: int, fmt: str = 'B') -> memoryview:
+        nonlocal off
+        view = buf[off:off + nbytes]
+        off += nbytes + _pad(nbytes)
+        return view.cast(fmt) if fmt != 'B' else view
+
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError("Not a snapshot file")
+    if (version := struct.unpack_from("<H", buf, 4)[0]) != VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    magic, version, ht, wd, timeCnt, accum, fixedDt, n, nImmov, player, \
+        strLen, integr, drag, gravity = HEADER.unpack_from(buf, 0)
+    off     = HEADER.size
+    bndry   = BNDRY.unpack_from(buf, off)
+    off    += BNDRY.size
+    rngVer, rngLen, gauss, hasGauss = RNG.unpack_from(buf, off)
+    off    += RNG.size
+    rngInts = tuple(take(rngLen * 4, 'I'))
+    strs    = bytes(take(strLen)).decode("utf-8").split('\0')
+    integr  = strs[integr]
+    if integr not in physics.INTEGRATORS:
+        raise ValueError(f"Unknown integrator in snapshot: {integr}")
+    for given, name, val, old in (
+            (eng.fixIntegr, "integrator", integr, eng.integrator),
+            (eng.fixDrag, "drag", drag, eng.drag),
+            (eng.fixGravity, "gravity", gravity, eng.gravity)):
+        if given and val != old:
+            raise ValueError(f"The snapshot was taken with {name} {val}, "
+                             f"not {old}")
+    types   = take(n)
+    names   = take(n * 4, 'I')
+    chars   = take(n * 4, 'I')
+    sprites = take(n * 4, 'I')
+    invis   = take(n)
+    extra   = take(n * 4, 'i')
+
+    store = eng.store
+    store.clear()
+    store.reserve(n)
+    for field, comps in st.FIELDS:
+        getattr(store, field)[:comps * n] = take(comps * n * 8, 'd')
+    store.cnt = n
+
+    # Objects are built without calling __init__, straight from the columns
+    eng.movObjs.clear()
+    movObjsApp = eng.movObjsApp
+    sprites    = [objs.textSprite(strs[i]) for i in sprites]
+    for i, typ, name, char, sprite, hidden, ext in zip(
+            range(n), types, names, chars, sprites, invis, extra):
+        cls        = MOV_TYPES[typ]
+        obj        = cls.__new__(cls)
+        obj.store  = store
+        obj.id     = i
+        obj.name   = strs[name]
+        obj.char   = strs[char]
+        obj.sprite = sprite
+        obj.invis  = hidden == 1
+        if (attrs := MOV_EXTRA.get(cls)) is not None:
+            setattr(obj, attrs[0], ext)
+        movObjsApp(obj)
+
+    eng.immovObjs.clear()
+    eng.intWalls.clear()
+    for rec in IMMOV.iter_unpack(take(nImmov * IMMOV.size)):
+        typ, name, char, sprite, x, y, cor, a, b, hidden = rec
+        cls        = IMMOV_TYPES[typ]
+        obj        = cls.__new__(cls)
+        obj.name   = strs[name]
+        obj.char   = strs[char]
+        obj.sprite = objs.textSprite(strs[sprite])
+        obj.pos    = (x, y)
+        obj.cor    = cor
+        obj.invis  = bool(hidden)
+        obj.lns    = obj.sprite.lns
+        obj.cols   = obj.sprite.cols
+        for attr, val in zip(IMMOV_EXTRA.get(cls, ()), (a, b)):
+            setattr(obj, attr, val)
+        eng.immovObjsApp(obj)
+        if isinstance(obj, objs.InternalWall):
+            eng.intWalls.append(obj)
+
+    for wall, k in zip((eng.lWall, eng.rWall, eng.ceiling, eng.ground),
+                       range(0, 12, 3)):
+        wall.pos = (bndry[k], bndry[k + 1])
+        wall.cor = bndry[k + 2]
+    eng.worldSize    = (ht, wd)
+    eng.roughTimeCnt = timeCnt
+    eng.accum        = accum
+    eng.fixedDt      = fixedDt
+    eng.integrator   = integr
+    eng.drag         = drag
+    eng.gravity      = gravity
+    eng.player       = eng.movObjs[player] if player >= 0 else None
+    eng.rng.setstate((rngVer, rngInts, gauss if hasGauss else None))
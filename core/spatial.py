@@ -0,0 +1,177 @@
+import math
+import typing as ty
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Smallest cell size of a CellGrid, so that large worlds of small bodies do 
+# not need a huge number of cells
+MIN_CELL = 4
+
+
+class SpatialHash:
+    """
+    Uniform grid broadphase. Each body is bucketed by the cell holding its
+    top-left corner; since the cell size is at least the largest body extent,
+    two overlapping bodies are always in the same or in adjacent cells.
+    """
+    # Half of the 8-neighbourhood, so that each pair of cells is only visited
+    # once
+    NEIGHBOURS = ((1, 0), (1, 1), (0, 1), (-1, 1))
+
+    def __init__(self) -> None:
+        self.cells   : dict[tuple[int, int], list[int]]
+        self.cells    = {}
+        self.cellSize = 1.0
+
+    def build(self, pos: list[float], ext: list[float],
+              ids: ty.Iterable[int]) -> None:
+        """
+        Rebuild the grid.
+        > param pos: Interleaved positions, as in BodyStore.pos
+        > param ext: Interleaved extents (cols, lns), as in BodyStore.ext
+        > param ids: IDs of the bodies to insert
+        """
+        cells: dict[tuple[int, int], list[int]]
+        cells = {}
+        cs    = float(max(math.ceil(max(ext, default=1)), 1))
+        self.cellSize = cs
+        for i in ids:
+            key = (int(pos[2 * i] // cs), int(pos[2 * i + 1] // cs))
+            if (bucket := cells.get(key)) is None:
+                cells[key] = [i]
+            else:
+                bucket.append(i)
+        self.cells = cells
+
+    def pairs(self) -> ty.Iterator[tuple[int, int]]:
+        """
+        > return: Iterator over candidate pairs of body IDs; each pair is
+                  yielded once
+        """
+        cells = self.cells
+        for (cx, cy), bucket in cells.items():
+            n = len(bucket)
+            for a in range(n - 1):
+                i = bucket[a]
+                for b in range(a + 1, n):
+                    yield i, bucket[b]
+            for dx, dy in self.NEIGHBOURS:
+                if (other := cells.get((cx + dx, cy + dy))) is not None:
+                    for i in bucket:
+                        for j in other:
+                            yield i, j
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> list[int]:
+        """
+        > return: IDs of the bodies which might overlap the rectangle
+                  [x0, x1) x [y0, y1)
+        """
+        found: list[int]
+        cs    = self.cellSize
+        cells = self.cells
+        found = []
+        # Last cells holding points before x1 and y1, which need not be 
+        # integers
+        for cx in range(int((x0 - cs) // cs),
+                        int((math.ceil(x1) - 1) // cs) + 1):
+            for cy in range(int((y0 - cs) // cs),
+                            int((math.ceil(y1) - 1) // cs) + 1):
+                if (bucket := cells.get((cx, cy))) is not None:
+                    found.extend(bucket)
+        return found
+
+
+class CellGrid:
+    """
+    Uniform grid over the world, built with NumPy: the body IDs sorted by the
+    cell holding their top-left corner, and the offset of each cell's run of
+    IDs. Cells are numbered row by row, so the cells a rectangle covers in 
+    one row form a single run, and a query only costs one slice per row of 
+    cells. Bodies outside the world are put in the nearest cell.
+    NOTE: Few bodies change cells between two builds, so the order of the 
+          last build is sorted again rather than the keys from scratch; it is
+          nearly sorted already, which the stable sort (Timsort) is fast for.
+    """
+    def __init__(self) -> None:
+        if np is None:
+            raise ImportError("NumPy is required for CellGrid")
+        self.cellSize = MIN_CELL
+        self.gridSize = (1, 1)
+        self.order    = np.zeros(0, dtype=np.intp)
+        self.starts   = np.zeros(2, dtype=np.intp)
+
+    def build(self, pos: "np.ndarray", ext: "np.ndarray",
+              worldSize: tuple[int, int]) -> None:
+        """
+        Rebuild the grid.
+        > param pos: (n, 2) array of positions
+        > param ext: (n, 2) array of extents, as (cols, lns)
+        > param worldSize: World size (lines, columns)
+        """
+        cs     = max(math.ceil(ext.max()) if len(ext) else 1, MIN_CELL)
+        gh, gw = worldSize[0] // cs + 1, worldSize[1] // cs + 1
+        keys   = (np.clip(pos[:, 1] // cs, 0, gh - 1).astype(np.intp) * gw
+                  + np.clip(pos[:, 0] // cs, 0, gw - 1).astype(np.intp))
+        starts = np.zeros(gh * gw + 1, dtype=np.intp)
+        np.cumsum(np.bincount(keys, minlength=gh * gw), out=starts[1:])
+        if len(self.order) == len(keys):
+            order = self.order[np.argsort(keys[self.order], kind="stable")]
+        else:
+            order = np.argsort(keys, kind="stable")
+        self.cellSize = cs
+        self.gridSize = (gh, gw)
+        self.order    = order
+        self.starts   = starts
+
+    def pairs(self) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Candidate pairs, as SpatialHash.pairs gives them, all at once: the 
+        bodies after each one in its cell, and every body in the cells of 
+        SpatialHash.NEIGHBOURS, expanded from the runs of `order`.
+        > return: Arrays of the first and second body IDs of the pairs; each
+                  pair is in them once
+        """
+        gh, gw = self.gridSize
+        order  = self.order
+        starts = self.starts
+        counts = np.diff(starts)
+        at     = np.arange(len(order))
+        cell   = np.repeat(np.arange(gh * gw), counts)
+        cy, cx = np.divmod(cell, gw)
+        # Runs of partners of each body, as (first index in order, length)
+        firsts = [at + 1]
+        nums   = [starts[cell + 1] - at - 1]
+        for dx, dy in SpatialHash.NEIGHBOURS:
+            nx, ny = cx + dx, cy + dy
+            ok     = (nx >= 0) & (nx < gw) & (ny < gh)
+            other  = np.where(ok, ny * gw + nx, 0)
+            firsts.append(starts[other])
+            nums.append(np.where(ok, counts[other], 0))
+        first = np.concatenate(firsts)
+        num   = np.concatenate(nums)
+        owner = np.repeat(np.tile(at, len(firsts)), num)
+        # Index of each pair within its run
+        within = (np.arange(int(num.sum()))
+                  - np.repeat(np.cumsum(num) - num, num))
+        return order[owner], order[np.repeat(first, num) + within]
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) \
+            -> "np.ndarray":
+        """
+        > return: Sorted IDs of the bodies which might overlap the rectangle
+                  [x0, x1) x [y0, y1)
+        """
+        cs, (gh, gw) = self.cellSize, self.gridSize
+        cx0 = min(max(int((x0 - cs) // cs), 0), gw - 1)
+        cx1 = min(max((math.ceil(x1) - 1) // cs, 0), gw - 1)
+        cy0 = min(max(int((y0 - cs) // cs), 0), gh - 1)
+        cy1 = min(max((math.ceil(y1) - 1) // cs, 0), gh - 1)
+        order, starts = self.order, self.starts
+        found = np.concatenate([
+            order[starts[cy * gw + cx0]:starts[cy * gw + cx1 + 1]]
+            for cy in range(cy0, cy1 + 1)])
+        found.sort()
+        return found
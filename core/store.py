@@ -0,0 +1,169 @@
+import typing as ty
+
+# Per-body float64 fields, and the number of components of each. `still` is
+# the time the body has been settled for (see sleeping.SleepTracker), and 
+# `age` the time since it was spawned (see pool.BodyPool)
+FIELDS = (("pos", 2), ("vel", 2), ("accl", 2), ("cor", 1), ("ext", 2),
+          ("still", 1), ("age", 1))
+
+
+class BodyStore:
+    """
+    Struct-of-arrays storage for movable bodies. Every field is a contiguous
+    float64 buffer (a memoryview cast to 'd'), indexed by body ID; vector
+    fields are interleaved, i.e. body i's position is pos[2 * i],
+    pos[2 * i + 1]. The buffers can be wrapped by NumPy without copying.
+    NOTE: Growing the store replaces every buffer, so anything holding on to
+          one (e.g. a NumPy view) must check `gen` and re-fetch it.
+    """
+    def __init__(self, cap: int = 64,
+                 alloc: ty.Callable[[int], ty.Any] = bytearray) -> None:
+        """
+        > param cap: Initial capacity, in bodies
+        > param alloc: Callable returning a writable buffer of the given size
+                       in bytes
+        """
+        self.pos  : memoryview
+        self.vel  : memoryview
+        self.accl : memoryview
+        self.cor  : memoryview
+        self.ext  : memoryview
+        self.still: memoryview
+        self.age  : memoryview
+        self.cnt   = 0
+        self.cap   = 0
+        self.gen   = 0
+        self.alloc = alloc
+        for field, _ in FIELDS:
+            setattr(self, field, memoryview(bytearray()).cast('d'))
+        self._grow(max(cap, 1))
+
+    def _grow(self, cap: int) -> None:
+        for field, comps in FIELDS:
+            old = getattr(self, field)
+            new = memoryview(self.alloc(cap * comps * 8)).cast('d')
+            new[:len(old)] = old
+            setattr(self, field, new)
+        self.cap  = cap
+        self.gen += 1
+
+    def realloc(self, alloc: ty.Callable[[int], ty.Any]) -> None:
+        """
+        Move every buffer to one from another allocator, e.g. into shared 
+        memory. Like growing, this replaces every buffer.
+        > param alloc: As in __init__; also used when the store grows later
+        """
+        self.alloc = alloc
+        self._grow(self.cap)
+
+    def reserve(self, cap: int) -> None:
+        """
+        Make sure the store can hold at least `cap` bodies without growing.
+        """
+        if cap > self.cap:
+            self._grow(cap)
+
+    def clear(self) -> None:
+        """
+        Remove every body. The buffers are kept.
+        """
+        self.cnt = 0
+
+    def copyFrom(self, src: "BodyStore",
+                 fields: ty.Iterable[str] | None = None) -> None:
+        """
+        Make this store a copy of the bodies of another one, e.g. to keep a 
+        frame's state while the next one is being stepped.
+        > param src: Store to copy
+        > param fields: Names of the fields to copy; every field if None
+        """
+        comps = dict(FIELDS)
+        self.reserve(src.cnt)
+        for field in (fields if fields is not None else comps):
+            n = comps[field] * src.cnt
+            getattr(self, field)[:n] = getattr(src, field)[:n]
+        self.cnt = src.cnt
+
+    def add(self, pos: ty.Sequence[float], vel: ty.Sequence[float],
+            accl: ty.Sequence[float], cor: float) -> int:
+        """
+        Append a body to the store. Extents are zeroed, and are to be set by
+        the object once its text is built.
+        > return: ID of the new body
+        """
+        if self.cnt == self.cap:
+            self._grow(self.cap * 2)
+        i  = self.cnt
+        j  = 2 * i
+        self.pos[j], self.pos[j + 1]   = pos
+        self.vel[j], self.vel[j + 1]   = vel
+        self.accl[j], self.accl[j + 1] = accl
+        self.cor[i]                    = cor
+        self.ext[j], self.ext[j + 1]   = 0.0, 0.0
+        self.still[i]                  = 0.0
+        self.age[i]                    = 0.0
+        self.cnt += 1
+        return i
+
+    def swapRemove(self, i: int) -> int:
+        """
+        Remove a body in O(1), by moving the last body into its slot, so that
+        the live bodies stay contiguous.
+        > param i: ID of the body to remove
+        > return: Former ID of the body moved into slot i, or -1 if the 
+                  removed body was the last one
+        """
+        last      = self.cnt - 1
+        self.cnt -= 1
+        if i == last:
+            return -1
+        for field, comps in FIELDS:
+            buf, a, b        = getattr(self, field), comps * i, comps * last
+            buf[a:a + comps] = buf[b:b + comps]
+        return last
+
+    def nbytes(self) -> int:
+        """
+        > return: Bytes used by the live part of the store
+        """
+        return self.cnt * sum(comps for _, comps in FIELDS) * 8
+
+
+class Vec2:
+    """
+    Two-component view over a vector field of a BodyStore, so that
+    `obj.pos[0] += 1` writes straight into the store.
+    """
+    __slots__ = ("store", "field", "i")
+
+    def __init__(self, store: BodyStore, field: str, i: int) -> None:
+        self.store = store
+        self.field = field
+        self.i     = 2 * i
+
+    def __getitem__(self, k: int) -> float:
+        if not -2 <= k < 2:
+            raise IndexError("Vec2 index out of range")
+        return getattr(self.store, self.field)[self.i + k % 2]
+
+    def __setitem__(self, k: int, val: float) -> None:
+        if not -2 <= k < 2:
+            raise IndexError("Vec2 index out of range")
+        getattr(self.store, self.field)[self.i + k % 2] = val
+
+    def __len__(self) -> int:
+        return 2
+
+    def __iter__(self) -> ty.Iterator[float]:
+        buf = getattr(self.store, self.field)
+        yield buf[self.i]
+        yield buf[self.i + 1]
+
+    def __eq__(self, other: object) -> bool:
+        try:
+            return list(self) == list(other)   # type: ignore[call-overload]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
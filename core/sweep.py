@@ -0,0 +1,354 @@
+import array
+import itertools as it
+import json
+import math
+import os
+import struct
+import time
+import argparse  as ap
+import logging   as lg
+import typing    as ty
+import engine
+import physics
+import sleeping
+import vecphys
+
+if ty.TYPE_CHECKING:
+    import store as st
+
+MAGIC          = b"BAPW"
+VERSION        = 1
+# magic, version, runs, columns, metadata size, stored positions
+HEADER         = struct.Struct("<4sHxxIIIQ")
+# Steps each run takes, unless its config says otherwise
+DEFAULT_STEPS  = 600
+# Squares of the default scene, unless a config says otherwise; less than
+# main.py spawns, so that large sweeps stay fast
+DEFAULT_BODIES = 1000
+# Metrics of a run, one column each in the output
+COLUMNS        = ("seconds", "stepsPerSec", "objects", "asleep", "energy0",
+                  "energy", "kinetic", "bounces", "playerX", "playerY",
+                  "meanX", "meanY")
+# Arguments a config may hold (as in main.parseArgs), and their types
+KEYS           = {"wallCOR": float, "gravity": float, "drag": float,
+                  "playerVel": list, "bodies": int, "seed": int,
+                  "steps": int, "dt": float, "integrator": str,
+                  "backend": str, "collide": bool, "sleep": bool,
+                  "worldSize": list, "scene": str, "load": str,
+                  "maxBodies": int, "ttl": float, "offscreen": float}
+# Smallest change of velocity taken as a bounce, so that rounding errors
+# around 0 are not
+BOUNCE_EPS     = 1e-9
+
+
+def _pad(n: int) -> int:
+    """
+    > return: Number of padding bytes to align n to 8 bytes
+    """
+    return -n % 8
+
+
+def expand(spec: list[dict[str, ty.Any]] | dict[str, ty.Any],
+           steps: int = DEFAULT_STEPS, seed: int = 0) \
+        -> list[dict[str, ty.Any]]:
+    """
+    Turn a sweep specification into the configs of its runs, and check them.
+    > param spec: Either a list of configs, or a single config whose list
+                  values are the values to sweep over; every combination of
+                  them is then a run, in order (the last key varying
+                  fastest). Values which are lists themselves, like a
+                  playerVel, must then be given as a list of lists
+    > param steps: Steps of the runs whose config has none
+    > param seed: Seed of the runs whose config has none; the same for every
+                  run, so that the runs only differ by their config
+    > return: Configs, with their steps and seed filled in
+    """
+    if isinstance(spec, dict):
+        axes = [val if isinstance(val, list) else [val]
+                for val in spec.values()]
+        spec = [dict(zip(spec, vals)) for vals in it.product(*axes)]
+    configs = []
+    for i, config in enumerate(spec):
+        if not isinstance(config, dict):
+            raise ValueError(f"Run {i}: a config must be an object")
+        config = {"steps": steps, "seed": seed, **config}
+        for key, val in config.items():
+            if key not in KEYS:
+                raise ValueError(f"Run {i}: unknown argument: {key}")
+            cls = KEYS[key]
+            ok  = (isinstance(val, (int, float)) if cls is float
+                   else isinstance(val, cls))
+            if key == "integrator":
+                ok = ok and val in physics.INTEGRATORS
+            elif key == "backend":
+                # Runs already get a process each
+                ok = ok and val in ("scalar", "numpy")
+            elif cls is list:
+                ok = ok and len(val) == 2 and \
+                    all(isinstance(v, (int, float)) for v in val)
+            if not ok or (key in ("steps", "bodies", "drag") and val < 0):
+                raise ValueError(f"Run {i}: invalid value for {key}: {val!r}")
+        configs.append(config)
+    return configs
+
+
+def energy(store: "st.BodyStore") -> tuple[float, float]:
+    """
+    > param store: Store holding the bodies
+    > return: Total mechanical energy (kinetic, plus potential in the field
+              of each body's acceleration) and kinetic energy of the bodies,
+              each of unit mass
+    NOTE: The sums are exact (math.fsum), so that they do not depend on 
+          whether NumPy is installed.
+    """
+    n2 = 2 * store.cnt
+    if vecphys.AVAILABLE:
+        views = vecphys.storeViews(store)
+        vel   = views["vel"].ravel()
+        kin   = math.fsum((0.5 * vel * vel).tolist())
+        pot   = math.fsum((views["accl"] * views["pos"]).ravel().tolist())
+    else:
+        pos, vel, accl = store.pos, store.vel, store.accl
+        kin            = math.fsum(0.5 * vel[j] * vel[j] for j in range(n2))
+        pot            = math.fsum(accl[j] * pos[j] for j in range(n2))
+    return kin - pot, kin
+
+
+class Tracker:
+    """
+    Gathers the metrics of a run, step by step (see Engine.runHeadless).
+    A bounce is counted whenever a velocity component of a body ends a step
+    with the opposite sign to the one its acceleration alone would have
+    given it, i.e. at most once per body, axis and step.
+    NOTE: The steps in which bodies are despawned are not looked at, since
+          the IDs of the bodies change.
+    """
+    def __init__(self, eng: engine.Engine) -> None:
+        """
+        > param eng: Engine to watch, with its bodies spawned
+        """
+        self.eng     = eng
+        self.bounces = 0
+        self.energy0 = energy(eng.store)[0]
+        self._keep()
+
+    def _keep(self) -> None:
+        """
+        Keep the velocities, and what they belong to, for the next step.
+        """
+        store    = self.eng.store
+        self.key = (store.cnt, self.eng.pool.despawned)
+        self.vel = (vecphys.storeViews(store)["vel"].copy() if vecphys.AVAILABLE
+                    else array.array('d', store.vel[:2 * store.cnt]))
+
+    def step(self, dt: float) -> None:
+        """
+        > param dt: Timestep of the step just taken
+        """
+        store = self.eng.store
+        if (store.cnt, self.eng.pool.despawned) == self.key:
+            if vecphys.AVAILABLE:
+                views = vecphys.storeViews(store)
+                vel   = views["vel"]
+                free  = self.vel + views["accl"] * dt
+                self.bounces += int(((vel * free < 0)
+                                     & (abs(vel - free) > BOUNCE_EPS)).sum())
+            else:
+                vel, accl, prev = store.vel, store.accl, self.vel
+                for j in range(2 * store.cnt):
+                    free = prev[j] + accl[j] * dt
+                    if vel[j] * free < 0 and abs(vel[j] - free) > BOUNCE_EPS:
+                        self.bounces += 1
+        self._keep()
+
+
+def run(config: dict[str, ty.Any], positions: bool = False) \
+        -> tuple[list[float], bytes]:
+    """
+    Run one config headless (see expand for its keys).
+    > param config: Config of the run, with its steps and seed
+    > param positions: Whether to also return the final positions
+    > return: The run's metrics, in the order of COLUMNS, and the final
+              positions, interleaved as in a BodyStore (empty unless asked
+              for)
+    """
+    args = dict(config)
+    if vecphys.AVAILABLE:
+        # Same results as the scalar backend, faster
+        args.setdefault("backend", "numpy")
+    eng = engine.Engine(None, lg.getLogger(__name__), args)
+    try:
+        if "load" in args:
+            eng.loadSnapshot(args["load"])
+        elif "scene" in args:
+            eng.loadScene(args["scene"])
+        if not eng.movObjs:
+            eng._spawnDefaultScene(args.get("bodies", DEFAULT_BODIES))
+        tracker = Tracker(eng)
+        start   = time.perf_counter()
+        sps     = eng.runHeadless(args["steps"], onStep=tracker.step)
+        secs    = time.perf_counter() - start
+    finally:
+        eng.close()
+    store      = eng.store
+    n          = store.cnt
+    total, kin = energy(store)
+    pos        = store.pos[:2 * n]
+    still      = store.still[:n]
+    asleep     = (sum(1 for s in still if s >= sleeping.ASLEEP)
+                  if eng.sleeper is not None else 0)
+    player     = ((pos[2 * eng.player.id], pos[2 * eng.player.id + 1])
+                  if eng.player is not None else (float("nan"), ) * 2)
+    mean       = ((math.fsum(pos[0::2]) / n, math.fsum(pos[1::2]) / n) if n
+                  else (float("nan"), ) * 2)
+    return ([secs, sps, n, asleep, tracker.energy0, total, kin,
+             tracker.bounces, *player, *mean],
+            pos.tobytes() if positions else b'')
+
+
+def _runStar(args: tuple[dict[str, ty.Any], bool]) \
+        -> tuple[list[float], bytes]:
+    return run(*args)
+
+
+def runAll(configs: list[dict[str, ty.Any]], jobs: int | None = None,
+           positions: bool = False) -> list[tuple[list[float], bytes]]:
+    """
+    Run configs across a pool of worker processes.
+    > param configs: Configs of the runs, as returned by expand
+    > param jobs: Number of worker processes; defaults to the number of
+                  CPUs. With 1, the runs are made in this process
+    > param positions: Whether to also return the final positions
+    > return: Result of each run (see run), in the order of the configs
+    """
+    jobs = jobs or os.cpu_count() or 1
+    work = [(config, positions) for config in configs]
+    if jobs == 1 or len(configs) <= 1:
+        return [_runStar(args) for args in work]
+    from concurrent import futures as cf
+    with cf.ProcessPoolExecutor(min(jobs, len(configs))) as pool:
+        return list(pool.map(_runStar, work,
+                             chunksize=max(len(work) // (4 * jobs), 1)))
+
+
+def write(path: str, configs: list[dict[str, ty.Any]],
+          results: list[tuple[list[float], bytes]]) -> None:
+    """
+    Write the results of a sweep to a file: CSV (one row per run, with its
+    config and metrics) if the path ends with .csv, else a columnar binary
+    file (see load), which also holds the final positions if they were
+    kept.
+    > param path: Path of the output file
+    > param configs: Configs of the runs
+    > param results: Results of the runs, as returned by runAll
+    """
+    if path.lower().endswith(".csv"):
+        import csv
+        keys = list(dict.fromkeys(key for config in configs for key in config))
+        with open(path, 'w', newline='') as f:
+            out = csv.writer(f)
+            out.writerow(["run", *keys, *COLUMNS])
+            for i, (config, (row, _)) in enumerate(zip(configs, results)):
+                out.writerow([i, *[json.dumps(config[key]) if key in config
+                                   else '' for key in keys],
+                              *map(repr, row)])
+        return
+    meta = json.dumps({"columns": COLUMNS, "configs": configs}).encode("utf-8")
+    pos  = b''.join(res[1] for res in results)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(results), len(COLUMNS),
+                            len(meta), len(pos) // 16))
+        f.write(meta + bytes(_pad(HEADER.size + len(meta))))
+        for k in range(len(COLUMNS)):
+            f.write(array.array('d', [row[k] for row, _ in results]).tobytes())
+        f.write(pos)
+
+
+def load(path: str) -> dict[str, ty.Any]:
+    """
+    Read a columnar file written by write. It holds a header (HEADER), the
+    metadata as JSON (the column names and the config of each run), padded
+    to 8 bytes, then each column as one float64 per run, and finally the
+    final positions of the runs one after another, if they were kept, each
+    interleaved as in a BodyStore (the `objects` column gives their counts).
+    > param path: Path of the file
+    > return: Dictionary with the keys "configs" (list of configs),
+              "columns" (column name to its values: a NumPy array if NumPy is
+              installed, else an array.array) and "positions" (per run, its
+              final positions in the same form; None if not kept)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, runs, cols, metaSize, nPos = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a sweep file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported sweep file version: {version}")
+    off  = HEADER.size + metaSize
+    meta = json.loads(data[HEADER.size:off].decode("utf-8"))
+    off += _pad(off)
+    if vecphys.AVAILABLE:
+        vals = vecphys.np.frombuffer(data, dtype=vecphys.np.float64,
+                                     count=cols * runs + 2 * nPos, offset=off)
+    else:
+        vals = array.array('d', data[off:off + 8 * (cols * runs + 2 * nPos)])
+    columns = {name: vals[k * runs:(k + 1) * runs]
+               for k, name in enumerate(meta["columns"])}
+    positions = None
+    if nPos:
+        positions = []
+        at        = cols * runs
+        for n in columns["objects"]:
+            positions.append(vals[at:at + 2 * int(n)])
+            at += 2 * int(n)
+    return {"configs": meta["configs"], "columns": columns,
+            "positions": positions}
+
+
+def cli(argv: list[str]) -> int:
+    """
+    Command line of main.py sweep.
+    > param argv: Arguments after "sweep"
+    > return: Exit status
+    """
+    parser = ap.ArgumentParser(
+        prog="main.py sweep",
+        description="Run many variants of a scene headless, across worker "
+                    "processes, and write their metrics to a file")
+    parser.add_argument("configs",
+                        help="JSON file holding either a list of configs, or"
+                             " one config whose list values are swept over "
+                             "(every combination is a run). A config is an "
+                             "object of arguments as named in main.py, e.g. "
+                             '{"wallCOR": 0.8, "gravity": 5, "bodies": 100}')
+    parser.add_argument("-o", "--output", default="sweep.dat",
+                        help="File to write the results to: CSV if it ends "
+                             "with .csv, else a columnar binary file (see "
+                             "load in core/sweep.py)")
+    parser.add_argument("-s", "--steps", type=int, default=DEFAULT_STEPS,
+                        help="Steps of each run, unless its config says "
+                             "otherwise")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of each run, unless its config says "
+                             "otherwise")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Number of worker processes. Default: number of "
+                             "CPUs")
+    parser.add_argument("--positions", action="store_true", default=False,
+                        help="Also keep the final position of every body "
+                             "(not written to CSV files)")
+    args = parser.parse_args(argv)
+    try:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = expand(json.load(f), args.steps, args.seed)
+    except (OSError, ValueError) as e:
+        print(f"Invalid sweep: {e}")
+        return 2
+    start   = time.perf_counter()
+    results = runAll(configs, args.jobs, args.positions)
+    elapsed = time.perf_counter() - start
+    write(args.output, configs, results)
+    print(f"{len(configs)} runs in {elapsed:.2f} s "
+          f"({len(configs) / elapsed if elapsed else float('inf'):.2f} "
+          f"runs/s); results written to {args.output}")
+    return 0
@@ -0,0 +1,166 @@
+import typing as ty
+import store  as st
+import sleeping
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if ty.TYPE_CHECKING:
+    import engine
+
+AVAILABLE = np is not None
+
+
+def stepBodies(pos: "np.ndarray", vel: "np.ndarray", accl: "np.ndarray",
+               ext: "np.ndarray", dt: float, worldSize: tuple[int, int],
+               bndry: tuple[float, ...], still: "np.ndarray | None" = None,
+               integrator: str = "euler", drag: float = 0.0) -> None:
+    """
+    Integrate, clamp and reflect a batch of bodies in place. This is the
+    array form of physics.stepRange, and gives bit-identical results to it.
+    Sleeping bodies are skipped, and fast bodies are swept against the 
+    boundaries in the same way.
+    > param pos: (n, 2) float64 array of positions
+    > param vel: (n, 2) float64 array of velocities
+    > param accl: (n, 2) float64 array of accelerations
+    > param ext: (n, 2) float64 array of extents, as (cols, lns)
+    > param dt: Delta time
+    > param worldSize: World size (lines, columns)
+    > param bndry: Tuple (lWall x, rWall x, ceiling y, ground y, lWall COR,
+                   rWall COR, ceiling COR, ground COR)
+    > param still: (n, ) array of still times; None if no body sleeps
+    > param integrator: One of physics.INTEGRATORS
+    > param drag: Linear drag coefficient, in 1 / seconds
+    """
+    if still is not None and \
+            not (awake := still < sleeping.ASLEEP).all():
+        idx = np.flatnonzero(awake)
+        sub = [pos[idx], vel[idx], accl[idx], ext[idx]]
+        stepBodies(*sub, dt, worldSize, bndry, None, integrator, drag)
+        pos[idx] = sub[0]
+        vel[idx] = sub[1]
+        return
+    lX, rX, cY, gY, lCor, rCor, cCor, gCor = bndry
+    ht, wd    = worldSize
+    x, y      = pos[:, 0], pos[:, 1]
+    vx, vy    = vel[:, 0], vel[:, 1]
+    cols, lns = ext[:, 0], ext[:, 1]
+
+    # Boundary data is computed from the positions *before* integration,
+    # same as the scalar path
+    lCross = x - 1 < lX
+    rCross = x + cols > rX
+    cCross = y - 1 < cY
+    gCross = y + lns > gY
+    # Positions before integration, for the boundary sweeps
+    pos0   = pos.copy()
+
+    # Same operations, in the same order, as the scalar path
+    h = dt * 0.5
+    if integrator == "euler":
+        vel += (accl - drag * vel) * dt
+        pos += vel * dt
+    elif integrator == "verlet":
+        pos += (vel + (accl - drag * vel) * h) * dt
+        vel *= 1 - drag * h
+        vel += accl * dt
+        vel /= 1 + drag * h
+    elif integrator == "rk4":
+        v2   = vel + (accl - drag * vel) * h
+        v3   = vel + (accl - drag * v2) * h
+        v4   = vel + (accl - drag * v3) * dt
+        s    = vel + 2 * v2 + 2 * v3 + v4
+        pos += s * dt / 6
+        vel += (6 * accl - drag * s) * dt / 6
+    else:
+        raise ValueError(f"Unknown integrator: {integrator}")
+
+    # physics.sweep, for the bodies which were clear of a boundary and ended
+    # up past the world's edge; only those past it are looked at
+    xMax, yMax = wd - cols, ht - lns
+    for p, p0, v, pMax, loCross, hiCross, loCor, hiCor in (
+            (x, pos0[:, 0], vx, xMax, lCross, rCross, lCor, rCor),
+            (y, pos0[:, 1], vy, yMax, cCross, gCross, cCor, gCor)):
+        past = np.flatnonzero((p < 0) | (p > pMax))
+        if not len(past):
+            continue
+        lo     = (p[past] < 0) & ~loCross[past]
+        # Exclusive with lo, as in the scalar path
+        hi     = (p[past] > pMax[past]) & ~hiCross[past] & ~lo
+        m      = lo | hi
+        sel    = past[m]
+        plane  = np.where(lo, 1, pMax[past] - 1)[m]
+        since  = dt * (p[sel] - plane) / (p[sel] - p0[sel])
+        v[sel] = -v[sel] * np.where(lo, loCor, hiCor)[m]
+        p[sel] = plane + v[sel] * since
+
+    # max(0, min(p, size - extent)); the order matters for oversized bodies
+    np.minimum(x, xMax, out=x)
+    np.maximum(x, 0, out=x)
+    np.minimum(y, yMax, out=y)
+    np.maximum(y, 0, out=y)
+
+    # Reflections are applied one after another, since each one can change
+    # the velocity seen by the next
+    m     = lCross & ((vx < 0) | (x <= 1))
+    vx[m] = -vx[m] * lCor
+    x[m]  = 1
+    m     = rCross & ((vx > 0) | (x + cols >= wd))
+    vx[m] = -vx[m] * rCor
+    x[m]  = wd - cols[m] + 1 - 2
+    m     = cCross & ((vy > 0) | (y <= 1))
+    vy[m] = -vy[m] * cCor
+    y[m]  = 1
+    m     = gCross & ((vy < 0) | (y + lns >= ht))
+    vy[m] = -vy[m] * gCor
+    y[m]  = ht - lns[m] + 1 - 2
+
+
+def storeViews(store: "st.BodyStore", cnt: int | None = None) \
+        -> dict[str, "np.ndarray"]:
+    """
+    Wrap the buffers of a BodyStore in NumPy arrays, without copying.
+    > param store: Store to wrap
+    > param cnt: Number of bodies to cover; defaults to every live body
+    > return: Dictionary of field name to array; vector fields have the shape
+              (cnt, 2), scalar fields (cnt, )
+    """
+    cnt = store.cnt if cnt is None else cnt
+    return {field: np.frombuffer(getattr(store, field), dtype=np.float64,
+                                 count=cnt * comps).reshape(
+                                     (cnt, 2) if comps == 2 else (cnt, ))
+            for field, comps in st.FIELDS}
+
+
+class VecIntegrator:
+    """
+    Struct-of-arrays physics backend. Works on zero-copy NumPy views over the
+    engine's BodyStore, so every body is stepped at once with stepBodies and 
+    nothing is gathered or written back. The views are only rebuilt when the 
+    store grows or its body count changes.
+    """
+    def __init__(self) -> None:
+        if np is None:
+            raise ImportError("NumPy is required for the vectorised backend")
+        self.key  : tuple[int, int, int]
+        self.views: dict[str, np.ndarray]
+        self.key   = (0, -1, 0)
+        self.views = {}
+
+    def step(self, eng: "engine.Engine", dt: float) -> None:
+        """
+        Step every movable object of the engine.
+        > param eng: Engine whose movable objects are to be updated
+        > param dt: Delta time
+        """
+        store = eng.store
+        if (key := (id(store), store.gen, store.cnt)) != self.key:
+            self.key   = key
+            self.views = storeViews(store)
+        if not store.cnt:
+            return
+        stepBodies(self.views["pos"], self.views["vel"], self.views["accl"],
+                   self.views["ext"], dt, eng.worldSize, eng._bndry(),
+                   self.views["still"], eng.integrator, eng.drag)
@@ -1,29 +1,58 @@
-import ast
 import os
 import sys
 import curses     as cur
-import datetime   as dttm
 import logging    as lg
-import subprocess as sp
-import traceback  as tb
+import queue
 import typing     as ty
 
+# Kept on the path: the engine is only imported once the arguments are 
+# parsed, and imports some core modules only when they are used
 sys.path.insert(1, os.path.dirname(__file__) + os.sep + "core")
-import engine
-sys.path.pop(1)
 
 FATAL             = 60
+# Log records waiting to be written, past which new ones are dropped
+LOG_QUEUE_SIZE    = 1024
 prevKeyboardDelay = None
-try:
-    modeCommRunLower  = sp.run(("MODE", ), capture_output=True, shell=True,
-                               text=True, check=True).stdout.lower()
-    txt               = [i for i in modeCommRunLower.splitlines()
-                         if "delay" in i]
-    prevKeyboardDelay = int(txt[0].split(":")[1].strip())
-    sp.run("mode CON: DELAY=0", check=True, shell=True)
+# Writes the queued log records (see initLogger)
+logListener       = None
 
-except sp.CalledProcessError:
-    print("Cannot set keyboard delay to 0")
+
+def setKeyboardDelay() -> None:
+    """
+    Set the keyboard delay to 0, keeping the previous one in 
+    prevKeyboardDelay. Only the Windows console has one (set with MODE); 
+    elsewhere, this does nothing, rather than spawn a shell that would fail.
+    """
+    global prevKeyboardDelay
+    if sys.platform != "win32":
+        return
+    import subprocess as sp
+    try:
+        modeCommRunLower  = sp.run(("MODE", ), capture_output=True, shell=True,
+                                   text=True, check=True).stdout.lower()
+        txt               = [i for i in modeCommRunLower.splitlines()
+                             if "delay" in i]
+        prevKeyboardDelay = int(txt[0].split(":")[1].strip())
+        sp.run("mode CON: DELAY=0", check=True, shell=True)
+
+    except (sp.CalledProcessError, IndexError, ValueError):
+        print("Cannot set keyboard delay to 0")
+
+
+def restoreKeyboardDelay() -> None:
+    """
+    Restore the keyboard delay changed by setKeyboardDelay, if it was.
+    """
+    if prevKeyboardDelay is None:
+        return
+    import subprocess as sp
+    try:
+        sp.run(("MODE", "CON:", f"DELAY={prevKeyboardDelay}"), check=True,
+               shell=True)
+    except sp.CalledProcessError:
+        print("Unable to set keyboard delay to original value; you can "
+              "try to set it yourself.\nOriginal value: "
+              f"{prevKeyboardDelay}")
 
 
 class CustomLogger(lg.getLoggerClass()):
@@ -51,11 +80,37 @@ class CustomLogFormatter(lg.Formatter):
         super().__init__(fmt, datefmt, style, validate, defaults=defaults)
     
     def format(self, record: lg.LogRecord) -> str:
+        # First word of the last line, without its last character (e.g. the
+        # exception name of a traceback)
         record.msg  = record.getMessage().strip()
-        record.msg2 = record.msg.splitlines()[-1].strip().split(' ')[0][:-1]
+        record.msg2 = record.msg[record.msg.rfind('\n') + 1:].lstrip() \
+                          .split(' ', 1)[0][:-1]
         return super().format(record)
 
 
+class DroppingQueue(queue.Queue):
+    """
+    Bounded queue of log records, which drops the records that do not fit 
+    instead of blocking the thread logging them. The number of records 
+    dropped is kept in `dropped`.
+    NOTE: Only records are dropped; anything else (the sentinel 
+          logging.handlers.QueueListener.stop enqueues) waits for room, as
+          the listener would otherwise never stop.
+    """
+    def __init__(self, maxsize: int = 0) -> None:
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_nowait(self, item: ty.Any) -> None:
+        if not isinstance(item, lg.LogRecord):
+            self.put(item)
+            return
+        try:
+            super().put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+
 def parseArgs() -> tuple[int, dict[str, ty.Any] | str]:
     """
     Parse command line arguments.
@@ -86,10 +141,12 @@ def parseArgs() -> tuple[int, dict[str, ty.Any] | str]:
                     argData["debug"].append(sys.argv[i + 1])
                 else:
                     argData["debug"] = [sys.argv[i + 1]]
-                if set([i.lower() for i in argData["debug"]]) > {"fps", "objc"}:
+                if not set([i.lower() for i in argData["debug"]]) <= \
+                        {"fps", "objc", "prof"}:
                     return 2, sys.argv[i]
                 i += 1
             elif curArg in ("-pv", "--player-vel"):
+                import ast
                 if not len(playerVel := ast.literal_eval(sys.argv[i + 1])):
                     return 1, sys.argv[i]
                 argData["playerVel"] =  playerVel
@@ -97,6 +154,94 @@ def parseArgs() -> tuple[int, dict[str, ty.Any] | str]:
             elif curArg == "--wall-cor":
                 argData["wallCOR"]  = float(sys.argv[i + 1])
                 i                  += 1
+            elif curArg == "--gravity":
+                argData["gravity"]  = float(sys.argv[i + 1])
+                i                  += 1
+            elif curArg == "--drag":
+                if (drag := float(sys.argv[i + 1])) < 0:
+                    return 2, sys.argv[i]
+                argData["drag"]  = drag
+                i               += 1
+            elif curArg in ("-b", "--backend"):
+                if (backend := sys.argv[i + 1].lower()) not in ("scalar",
+                                                                "numpy",
+                                                                "parallel"):
+                    return 2, sys.argv[i]
+                argData["backend"]  = backend
+                i                  += 1
+            elif curArg in ("-i", "--integrator"):
+                if (integrator := sys.argv[i + 1].lower()) not in (
+                        "euler", "verlet", "rk4"):
+                    return 2, sys.argv[i]
+                argData["integrator"]  = integrator
+                i                     += 1
+            elif curArg in ("-j", "--workers"):
+                if (workers := int(sys.argv[i + 1])) < 1:
+                    return 2, sys.argv[i]
+                argData["workers"]  = workers
+                i                  += 1
+            elif curArg in ("-c", "--collide"):
+                argData["collide"] = True
+            elif curArg == "--no-sleep":
+                argData["sleep"] = False
+            elif curArg in ("-n", "--bodies"):
+                if (bodies := int(sys.argv[i + 1])) < 0:
+                    return 2, sys.argv[i]
+                argData["bodies"]  = bodies
+                i                 += 1
+            elif curArg == "--max-bodies":
+                if (maxBodies := int(sys.argv[i + 1])) < 1:
+                    return 2, sys.argv[i]
+                argData["maxBodies"]  = maxBodies
+                i                    += 1
+            elif curArg == "--ttl":
+                if (ttl := float(sys.argv[i + 1])) <= 0:
+                    return 2, sys.argv[i]
+                argData["ttl"]  = ttl
+                i              += 1
+            elif curArg == "--despawn-offscreen":
+                if (offscreen := float(sys.argv[i + 1])) < 0:
+                    return 2, sys.argv[i]
+                argData["offscreen"]  = offscreen
+                i                    += 1
+            elif curArg == "--headless":
+                if (steps := int(sys.argv[i + 1])) <= 0:
+                    return 2, sys.argv[i]
+                argData["headless"]  = steps
+                i                   += 1
+            elif curArg == "--dt":
+                if (dt := float(sys.argv[i + 1])) <= 0:
+                    return 2, sys.argv[i]
+                argData["dt"]  = dt
+                i             += 1
+            elif curArg == "--seed":
+                argData["seed"]  = int(sys.argv[i + 1])
+                i               += 1
+            elif curArg == "--load":
+                argData["load"]  = sys.argv[i + 1]
+                i               += 1
+            elif curArg == "--scene":
+                argData["scene"]  = sys.argv[i + 1]
+                i                += 1
+            elif curArg == "--save":
+                argData["save"]  = sys.argv[i + 1]
+                i               += 1
+            elif curArg == "--record":
+                argData["record"]  = sys.argv[i + 1]
+                i                 += 1
+            elif curArg == "--publish":
+                argData["publish"]  = sys.argv[i + 1]
+                i                  += 1
+            elif curArg == "--trace":
+                argData["trace"]  = sys.argv[i + 1]
+                i                += 1
+            elif curArg == "--world-size":
+                import ast
+                worldSize = ast.literal_eval(sys.argv[i + 1])
+                if len(worldSize) != 2 or min(worldSize) < 4:
+                    return 2, sys.argv[i]
+                argData["worldSize"]  = tuple(worldSize)
+                i                    += 1
             else:
                 # Invalid (i.e. unknown) argument
                 return 1, sys.argv[i]
@@ -117,7 +262,13 @@ def initLogger() -> lg.Logger:
     > return: Logger object after applying all formatting rules and handlers
     NOTE: Please note that the Logger class is changed in this function with 
           the function logging.setLogger
+    NOTE: The logger only queues the records (see DroppingQueue); they are 
+          formatted and written by a background thread, logListener, so that
+          logging never waits on I/O. Call stopLogger before exiting, to 
+          write the records still queued.
     """
+    global logListener
+    import logging.handlers as lh
     lg.captureWarnings(True)
     lg.setLoggerClass(CustomLogger)
     lgr         = lg.getLogger(__name__)
@@ -140,13 +291,31 @@ def initLogger() -> lg.Logger:
     
     conHdler.setFormatter(cnFormatter)
     fileHdler.setFormatter(lgFormatter)
+    logQueue    = DroppingQueue(LOG_QUEUE_SIZE)
+    logListener = lh.QueueListener(logQueue, conHdler, fileHdler,
+                                   respect_handler_level=True)
     lgr.setLevel(lg.WARNING)
-    lgr.addHandler(conHdler)
-    lgr.addHandler(fileHdler)
+    lgr.addHandler(lh.QueueHandler(logQueue))
+    logListener.start()
     
     return lgr
 
 
+def stopLogger() -> None:
+    """
+    Write the queued log records and stop the thread writing them, if 
+    initLogger started it.
+    """
+    global logListener
+    if logListener is None:
+        return
+    logListener.stop()
+    if (dropped := logListener.queue.dropped):
+        print(f"{dropped} log records were dropped, as they were logged "
+              "faster than they could be written")
+    logListener = None
+
+
 def main(stdscr: cur.window, args: dict[str, ty.Any], lgr: lg.Logger) -> None:
     """
     Wrapped function for the curses program.
@@ -161,12 +330,45 @@ def main(stdscr: cur.window, args: dict[str, ty.Any], lgr: lg.Logger) -> None:
     stdscr.nodelay(True)
     cur.curs_set(0)
 
+    import engine
     eng = engine.Engine(stdscr, lgr, args)
-    eng.start()
+    if "load" in args:
+        eng.loadSnapshot(args["load"])
+    elif "scene" in args:
+        eng.loadScene(args["scene"])
+    eng.start(args.get("bodies", 30000))
+    if "save" in args:
+        eng.saveSnapshot(args["save"])
+
+
+def mainHeadless(args: dict[str, ty.Any], lgr: lg.Logger) -> None:
+    """
+    Run the simulation without a window, and report its throughput.
+    > param args: Arguments passed to this program after processing
+    > param lgr: CustomLogger object, for logging
+    """
+    import engine
+    eng   = engine.Engine(None, lgr, args)
+    steps = args["headless"]
+    if "load" in args:
+        eng.loadSnapshot(args["load"])
+    elif "scene" in args:
+        eng.loadScene(args["scene"])
+    try:
+        sps = eng.runHeadless(steps, args.get("bodies", 30000))
+    finally:
+        eng.close()
+    if "save" in args:
+        eng.saveSnapshot(args["save"])
+    print(f"{steps} steps, {len(eng.movObjs)} objects, "
+          f"dt={eng.fixedDt or engine.DEFAULT_DT:g}: {sps:.2f} steps/s")
 
 
 if __name__ == "__main__":
     try:
+        if sys.argv[1:2] == ["sweep"]:
+            import sweep
+            sys.exit(sweep.cli(sys.argv[2:]))
         args = parseArgs()
         if args[0] == -1:
             print((
@@ -174,13 +376,87 @@ if __name__ == "__main__":
                 "\t-f, --fps\n"
                 "\t\tSpecify the target frame rate\n"
                 "\t-d, --debug <val>\n"
-                "\t\tEnable debug options. Valid values: fps\n"
+                "\t\tEnable debug options. Valid values: fps, objc, prof (overlay "
+                "of the p50/p95/p99 time of each phase of a frame)\n"
                 "\t-pv, --player-vel <val>\n"
                 "\t\tAdjust initial velocity of the player object. Value must "
                 "be in Python list syntax\n"
                 "\t--wall-cor <val>\n"
                 "\t\tAdjust wall, ground and ceiling COR. Value must be a "
-                "floating-point number"
+                "floating-point number\n"
+                "\t--gravity <val>\n"
+                "\t\tDownward acceleration of the objects of the default "
+                "scene, in cells per second squared. Default: 10\n"
+                "\t--drag <val>\n"
+                "\t\tLinear drag of the objects, in 1 / seconds: their "
+                "acceleration is less this times their velocity. Default: 0\n"
+                "\t-b, --backend <val>\n"
+                "\t\tPhysics backend. Valid values: scalar (default), numpy "
+                "(requires NumPy), parallel (steps shards of the objects in "
+                "worker processes; only faster than numpy with a CPU per "
+                "worker and tens of thousands of objects)\n"
+                "\t-i, --integrator <val>\n"
+                "\t\tIntegration method. Valid values: euler (semi-implicit, "
+                "default), verlet (velocity Verlet), rk4 (fourth-order "
+                "Runge-Kutta; only differs from verlet with --drag)\n"
+                "\t-j, --workers <val>\n"
+                "\t\tNumber of worker processes for the parallel backend. "
+                "Default: number of CPUs\n"
+                "\t-c, --collide\n"
+                "\t\tEnable object-to-object collisions\n"
+                "\t--no-sleep\n"
+                "\t\tKeep simulating objects which have come to rest, instead "
+                "of putting them to sleep\n"
+                "\t-n, --bodies <val>\n"
+                "\t\tNumber of squares to spawn. Default: 30000\n"
+                "\t--max-bodies <val>\n"
+                "\t\tMaximum number of objects alive at once; the oldest ones "
+                "are despawned past it\n"
+                "\t--ttl <val>\n"
+                "\t\tDespawn objects once they have lived for the given number "
+                "of seconds\n"
+                "\t--despawn-offscreen <val>\n"
+                "\t\tDespawn objects once they are more than the given number "
+                "of cells outside the view\n"
+                "\t--headless <val>\n"
+                "\t\tRun the given number of steps without a window, as fast "
+                "as possible, and report steps per second\n"
+                "\t--dt <val>\n"
+                "\t\tFixed timestep in seconds. Without it, the measured "
+                "frame time is used (headless runs default to 1/60)\n"
+                "\t--seed <val>\n"
+                "\t\tSeed for the random number generator\n"
+                "\t--load <val>\n"
+                "\t\tResume from a snapshot file instead of spawning the "
+                "default scene, with the integrator, drag and gravity it was "
+                "saved with; giving others is an error\n"
+                "\t--scene <val>\n"
+                "\t\tSpawn the objects described by a scene file instead of "
+                "the default scene (see scene.load in core/scene.py for the "
+                "format)\n"
+                "\t--save <val>\n"
+                "\t\tSave a snapshot of the simulation to the given file on "
+                "exit\n"
+                "\t--record <val>\n"
+                "\t\tRecord the rendered frames and body positions to the "
+                "given file; play it back with replay.py\n"
+                "\t--publish <val>\n"
+                "\t\tPublish the body positions and frame counters of every "
+                "frame to the given memory-mapped file, for other processes "
+                "to watch (see observe.py)\n"
+                "\t--trace <val>\n"
+                "\t\tTime each phase of every frame, and write the times to "
+                "the given file on exit: CSV if it ends with .csv, else JSON\n"
+                "\t--world-size <val>\n"
+                "\t\tWorld size, as [lines, columns] in Python list syntax. "
+                "The view scrolls to follow the player if the world is larger "
+                "than the terminal. Default: the terminal size ([24, 80] for "
+                "headless runs)\n"
+                "Subcommands\n"
+                "\tsweep <val>\n"
+                "\t\tRun the variants of a scene listed in the given JSON file "
+                "headless, in parallel, and write their metrics to a columnar "
+                "file. See main.py sweep --help"
             ).expandtabs(4))
         if args[0] == 1:
             print(f"Invalid argument: {args[1]}")
@@ -191,10 +467,16 @@ if __name__ == "__main__":
         if args[0]:
             sys.exit(args[0] if args[0] != -1 else 0)
         lgr = initLogger()
-        cur.wrapper(main, args[1], lgr)
+        if "headless" in args[1]:
+            mainHeadless(args[1], lgr)
+        else:
+            setKeyboardDelay()
+            cur.wrapper(main, args[1], lgr)
 
     except Exception as e:
         # Manualo logging. Yeah, I know, it's crap.
+        import datetime  as dttm
+        import traceback as tb
         print(f"FATAL:UnknownErr:({e.__class__.__name__}) {e}")
         with open("fatalLog.log", 'a') as f:
             f.write(f"{dttm.datetime.now().strftime(r"[%d-%m-%Y/%H:%M:%S.%f]")}\n"
@@ -204,10 +486,5 @@ if __name__ == "__main__":
         pass
 
     finally:
-        try:
-            sp.run(("MODE", "CON:", f"DELAY={prevKeyboardDelay}"), check=True,
-                   shell=True)
-        except sp.CalledProcessError:
-            print("Unable to set keyboard delay to original value; you can "
-                  "try to set it yourself.\nOriginal value: "
-                  f"{prevKeyboardDelay}")
+        stopLogger()
+        restoreKeyboardDelay()
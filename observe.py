@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse as ap
+import typing   as ty
+
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)) + os.sep + "core")
+import publish
+import sleeping
+import vecphys
+sys.path.pop(1)
+
+
+def flat(view: ty.Any) -> memoryview:
+    """
+    > param view: Field of a snapshot
+    > return: The field as a flat memoryview of doubles, as in a BodyStore
+    """
+    return memoryview(view).cast('B').cast('d')
+
+
+def status(snap: publish.Snapshot) -> str:
+    """
+    > param snap: Snapshot to describe
+    > return: One-line summary of a published frame
+    """
+    n      = snap.cnt
+    asleep = (int((snap.still >= sleeping.ASLEEP).sum()) if vecphys.AVAILABLE
+              else sum(1 for s in snap.still if s >= sleeping.ASLEEP))
+    line   = (f"frame {snap.frame} at {snap.time:.3f}s: {n} bodies, "
+              f"{asleep} asleep, fps={snap.fps:.2f}, "
+              f"substeps={snap.substeps}, world={list(snap.worldSize)}")
+    if 0 <= snap.player < n:
+        pos   = flat(snap.pos)
+        j     = 2 * snap.player
+        line += f", player=({pos[j]:.2f}, {pos[j + 1]:.2f})"
+    return line
+
+
+def bodies(snap: publish.Snapshot, k: int) -> list[str]:
+    """
+    > return: Position and extents of the first k bodies, one per line
+    """
+    pos, ext = flat(snap.pos), flat(snap.ext)
+    return [f"{i:>8}: ({pos[2 * i]:10.3f}, {pos[2 * i + 1]:10.3f}) "
+            f"{int(ext[2 * i])}x{int(ext[2 * i + 1])}"
+            for i in range(min(k, snap.cnt))]
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Watch a simulation run with "
+                                           "main.py --publish")
+    parser.add_argument("file", help="File the simulation publishes to")
+    parser.add_argument("-i", "--interval", type=float, default=1.0,
+                        help="Seconds between two reports")
+    parser.add_argument("-n", "--bodies", type=int, default=0,
+                        help="Also print the first n bodies")
+    parser.add_argument("--once", action="store_true", default=False,
+                        help="Report once and exit")
+    args   = parser.parse_args()
+    reader = publish.Reader(args.file)
+    try:
+        while True:
+            # The report is built from the mapped file without copying it,
+            # and thrown away if the frame was overwritten meanwhile
+            lines = None
+            while lines is None:
+                if (snap := reader.read()) is None:
+                    break
+                lines = [status(snap), *bodies(snap, args.bodies)]
+                if not snap.valid():
+                    lines = None
+            print('\n'.join(lines) if lines is not None
+                  else "Nothing published yet", flush=True)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import argparse as ap
+import curses   as cur
+
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)) + os.sep + "core")
+import recorder
+sys.path.pop(1)
+
+
+def draw(stdscr: cur.window, frame: recorder.Frame, full: bool,
+         status: str) -> None:
+    """
+    Draw a frame of the recording.
+    > param stdscr: Window to draw to
+    > param frame: Frame to draw
+    > param full: Whether to redraw every row, or only the runs the frame
+                  changed
+    > param status: Status line, drawn on the bottom border
+    """
+    ht, wd = stdscr.getmaxyx()
+    if full or frame.runs is None:
+        stdscr.erase()
+        stdscr.border()
+        for r, row in enumerate(frame.rows[:ht - 2]):
+            stdscr.addnstr(r + 1, 1, row.decode("ascii"), wd - 2)
+    else:
+        for r, c, cells in frame.runs:
+            if r < ht - 2 and c < wd - 2:
+                stdscr.addnstr(r + 1, c + 1, cells.decode("ascii"),
+                               wd - 2 - c)
+    stdscr.addnstr(ht - 1, 1, status, wd - 2, cur.A_REVERSE)
+    stdscr.refresh()
+
+
+def play(stdscr: cur.window, reader: recorder.Reader, speed: float,
+         start: int) -> None:
+    """
+    Play a recording back. Keys: space pauses, '+'/'-' double/halve the 
+    speed, '['/']' jump a keyframe back/forward, 'q' or ^C quits.
+    > param stdscr: Window to draw to
+    > param reader: Reader of the recording
+    > param speed: Playback speed multiplier
+    > param start: Record to start at
+    """
+    stdscr.nodelay(True)
+    cur.raw()
+    cur.noecho()
+    cur.curs_set(0)
+    k        = max(0, min(start, len(reader) - 1))
+    frame    = reader.seek(k)
+    paused   = False
+    full     = True
+    # Wall clock time at which the current frame's recorded time was shown
+    clock    = time.perf_counter() - frame.time / speed
+    while True:
+        draw(stdscr, frame, full, f" {k + 1}/{len(reader)} x{speed:g}"
+                                  f"{' PAUSED' if paused else ''} ")
+        full = False
+        key  = stdscr.getch()
+        if key in (3, ord('q')):
+            break
+        elif key == ord(' '):
+            paused = not paused
+        elif key in (ord('+'), ord('-')):
+            speed *= 2 if key == ord('+') else 0.5
+        elif key in (ord('['), ord(']')):
+            k     = max(0, min(k + (reader.keyInterval if key == ord(']')
+                                    else -reader.keyInterval), len(reader) - 1))
+            frame = reader.seek(k)
+            full  = True
+        if key != -1 or paused:
+            clock = time.perf_counter() - frame.time / speed
+        if paused or k + 1 >= len(reader):
+            time.sleep(1 / 60)
+            continue
+        wait = clock + reader.index[k + 1][2] / speed - time.perf_counter()
+        if wait > 0:
+            time.sleep(min(wait, 1 / 60))
+            continue
+        k    += 1
+        frame = reader.apply(frame, k)
+
+
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Play back a recording made with "
+                                           "main.py --record")
+    parser.add_argument("file", help="Recording to play")
+    parser.add_argument("-s", "--speed", type=float, default=1.0,
+                        help="Playback speed multiplier")
+    parser.add_argument("--seek", type=int, default=0,
+                        help="Frame to start at")
+    parser.add_argument("--dump", type=int, default=None, metavar="FRAME",
+                        help="Print the given frame to stdout and exit")
+    args   = parser.parse_args()
+    reader = recorder.Reader(args.file)
+    try:
+        if not len(reader):
+            print("The recording has no frames")
+        elif args.dump is not None:
+            frame = reader.seek(args.dump)
+            print(f"Frame {frame.idx} at {frame.time:.3f}s, "
+                  f"{len(frame.pos) // 2} bodies")
+            print('\n'.join(row.decode("ascii") for row in frame.rows))
+        else:
+            cur.wrapper(play, reader, args.speed, args.seek)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+import unittest
+import logging          as lg
+import logging.handlers as lh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+class BlockingHandler(lg.Handler):
+    """
+    Handler whose emit waits until `go` is set.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.go      = threading.Event()
+        self.started = threading.Event()
+
+    def emit(self, record: lg.LogRecord) -> None:
+        self.started.set()
+        self.go.wait()
+
+
+class DroppingQueueTest(unittest.TestCase):
+    def test_stopWhileFull(self) -> None:
+        hdler    = BlockingHandler()
+        self.addCleanup(hdler.go.set)
+        logQueue = main.DroppingQueue(4)
+        listener = lh.QueueListener(logQueue, hdler)
+        lgr      = lg.Logger("test_stopWhileFull")
+        lgr.addHandler(lh.QueueHandler(logQueue))
+        listener.start()
+        lgr.warning("first")
+        self.assertTrue(hdler.started.wait(5))
+        for i in range(10):
+            lgr.warning("record %d", i)
+        self.assertTrue(logQueue.full())
+        dropped = logQueue.dropped
+        self.assertGreater(dropped, 0)
+
+        stopper = threading.Thread(target=listener.stop, daemon=True)
+        stopper.start()
+        stopper.join(0.2)
+        # Waiting for room for the sentinel, which is not dropped
+        self.assertTrue(stopper.is_alive())
+        self.assertEqual(logQueue.dropped, dropped)
+        hdler.go.set()
+        stopper.join(5)
+        self.assertFalse(stopper.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import logging as lg
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import engine
+import parallel
+
+
+def run(backend: str, steps: int) -> bytes:
+    eng = engine.Engine(None, lg.getLogger("test"),
+                        {"seed": 0, "backend": backend, "workers": 2,
+                         "collide": False})
+    try:
+        eng._spawnDefaultScene(2 * parallel.MIN_SHARD)
+        for k in range(steps):
+            eng.update(engine.DEFAULT_DT)
+            if k == steps // 2:
+                # Replaces every buffer of the store
+                eng.store.reserve(2 * eng.store.cap)
+        n2 = 2 * eng.store.cnt
+        return bytes(eng.store.pos[:n2]) + bytes(eng.store.vel[:n2])
+    finally:
+        eng.close()
+
+
+class ShardedIntegratorTest(unittest.TestCase):
+    def test_matchesScalar(self) -> None:
+        self.assertEqual(run("parallel", 6), run("scalar", 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
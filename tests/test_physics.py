@@ -0,0 +1,131 @@
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import collision
+import objects as objs
+import physics
+import store   as st
+import vecphys
+
+DT        = 1 / 60
+WORLDSIZE = (40, 120)
+BNDRY     = (0, WORLDSIZE[1] - 1, 0, WORLDSIZE[0] - 1, 1.0, 1.0, 1.0, 1.0)
+
+
+class SweepTest(unittest.TestCase):
+    # With verlet, a body starting clear of the left wall, decelerated to a
+    # stop by the end of the step, but past the wall by then
+    POS  = [1.0, 20.0]
+    VEL  = [-600.0, 0.0]
+    ACCL = [600.0 / DT, 0.0]
+
+    def test_stoppedScalar(self) -> None:
+        pos, vel = list(self.POS), list(self.VEL)
+        physics.stepRange(pos, vel, self.ACCL, [1.0, 1.0], 0, 1, DT,
+                          WORLDSIZE, BNDRY, integrator="verlet")
+        self.assertEqual(pos[0], 1.0)
+        self.assertEqual(vel[0], 0.0)
+
+    @unittest.skipIf(not vecphys.AVAILABLE, "NumPy is not installed")
+    def test_stoppedNumpy(self) -> None:
+        np  = vecphys.np
+        pos = np.array([self.POS])
+        vel = np.array([self.VEL])
+        with np.errstate(all="raise"):
+            vecphys.stepBodies(pos, vel, np.array([self.ACCL]),
+                               np.array([[1.0, 1.0]]), DT, WORLDSIZE, BNDRY,
+                               integrator="verlet")
+        self.assertEqual(pos[0, 0], 1.0)
+        self.assertEqual(vel[0, 0], 0.0)
+
+
+class IntegratorTest(unittest.TestCase):
+    # A body flying in a world large enough for it not to reach a boundary,
+    # with drag
+    POS   = [500.0, 500.0]
+    VEL   = [20.0, -15.0]
+    ACCL  = [0.0, 10.0]
+    DRAG  = 1.5
+    STEPS = 60
+    SIZE  = (1000, 1000)
+    WALLS = (0, SIZE[1] - 1, 0, SIZE[0] - 1, 1.0, 1.0, 1.0, 1.0)
+
+    def step(self, integrator: str) -> tuple[list[float], list[float]]:
+        pos, vel = list(self.POS), list(self.VEL)
+        for _ in range(self.STEPS):
+            physics.stepRange(pos, vel, self.ACCL, [1.0, 1.0], 0, 1, DT,
+                              self.SIZE, self.WALLS, integrator=integrator,
+                              drag=self.DRAG)
+        return pos, vel
+
+    def error(self, pos: list[float]) -> float:
+        # Exact solution of p'' = a - k p'
+        t, k = self.STEPS * DT, self.DRAG
+        return max(abs(pos[c] - (self.POS[c] + self.ACCL[c] / k * t
+                                 + (self.VEL[c] - self.ACCL[c] / k)
+                                 * (1 - math.exp(-k * t)) / k))
+                   for c in range(2))
+
+    def test_rk4(self) -> None:
+        verlet, rk4 = self.step("verlet")[0], self.step("rk4")[0]
+        self.assertNotEqual(verlet, rk4)
+        self.assertLess(self.error(rk4), self.error(verlet) / 100)
+
+    @unittest.skipIf(not vecphys.AVAILABLE, "NumPy is not installed")
+    def test_numpy(self) -> None:
+        np = vecphys.np
+        for integrator in physics.INTEGRATORS:
+            pos, vel = np.array([self.POS]), np.array([self.VEL])
+            for _ in range(self.STEPS):
+                vecphys.stepBodies(pos, vel, np.array([self.ACCL]),
+                                   np.array([[1.0, 1.0]]), DT, self.SIZE,
+                                   self.WALLS, integrator=integrator,
+                                   drag=self.DRAG)
+            self.assertEqual((pos[0].tolist(), vel[0].tolist()),
+                             self.step(integrator), integrator)
+
+
+class SweepWallTest(unittest.TestCase):
+    def test_reflectedBefore(self) -> None:
+        # Moved from x = 0 to x = 10 through a wall at x = 5, its velocity
+        # having been reflected since (by a boundary, or another body): it is
+        # put back against the side it entered through, and keeps moving away
+        for batch in {False, vecphys.AVAILABLE}:
+            store = st.BodyStore()
+            store.add([10.0, 0.0], [-600.0, 0.0], [0.0, 0.0], 1.0)
+            store.ext[0], store.ext[1] = 1.0, 1.0
+            wall  = objs.InternalWall("wall", (5, 0), 1.0, 1, 10)
+            collision.Collider(batch=batch).step(store, [wall],
+                                                 prev=[0.0, 0.0])
+            self.assertEqual(store.pos[0], 4.0, batch)
+            self.assertEqual(store.vel[0], -600.0, batch)
+
+
+@unittest.skipIf(not vecphys.AVAILABLE, "NumPy is not installed")
+class BatchTest(unittest.TestCase):
+    def test_contacts(self) -> None:
+        # Contacts each body is in only once of, resolved as pair by pair
+        stores = []
+        for batch in (False, True):
+            store = st.BodyStore()
+            for x, y, vx in ((10.0, 5.0, 4.0), (10.5, 5.25, -2.0),
+                             (30.0, 5.0, 0.0), (30.25, 5.75, 3.0)):
+                i = store.add([x, y], [vx, 1.0], [0.0, 0.0], 0.5)
+                store.ext[2 * i], store.ext[2 * i + 1] = 1.0, 1.0
+            collider = collision.Collider(batch=batch)
+            collider.step(store, [])
+            self.assertEqual(collider.hits, 2)
+            stores.append(store)
+        scalar, numpy = stores
+        for buf in ("pos", "vel"):
+            for a, b in zip(getattr(scalar, buf)[:8],
+                            getattr(numpy, buf)[:8]):
+                self.assertAlmostEqual(a, b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import profiler as pf
+
+
+def lastFrame(prof: pf.Profiler, phase: str) -> float:
+    """
+    > return: Time charged to a phase in the last frame closed
+    """
+    return prof.ring[pf.PHASES.index(phase)][(prof.frames - 1) % pf.WINDOW]
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_tasksHaveTheirOwnClocks(self) -> None:
+        prof = pf.Profiler()
+
+        async def render() -> None:
+            prof.begin()
+            await asyncio.sleep(0.05)
+            prof.lap("sleep")
+            prof.endFrame()
+
+        async def simulate() -> None:
+            await asyncio.sleep(0.04)
+            # Must not restart the clock of render
+            prof.begin()
+            prof.lap("input")
+
+        async def run() -> None:
+            await asyncio.gather(render(), simulate())
+
+        asyncio.run(run())
+        self.assertGreaterEqual(lastFrame(prof, "sleep"), 0.045)
+        self.assertLess(lastFrame(prof, "input"), 0.01)
+
+    def test_workerTimesFollowTheirFrame(self) -> None:
+        prof    = pf.Profiler()
+        taken   = []
+        started = threading.Event()
+        go      = threading.Event()
+
+        def work() -> None:
+            prof.begin()
+            started.set()
+            go.wait()
+            time.sleep(0.02)
+            prof.lap("update")
+            taken.append(prof.take())
+
+        prof.begin()
+        worker = threading.Thread(target=work)
+        worker.start()
+        started.wait()
+        go.set()
+        # Closed while the worker is stepping; none of its time is in it
+        prof.endFrame()
+        worker.join()
+        self.assertEqual(lastFrame(prof, "update"), 0.0)
+        prof.add(taken[0])
+        prof.endFrame()
+        self.assertGreaterEqual(lastFrame(prof, "update"), 0.015)
+
+
+if __name__ == "__main__":
+    unittest.main()
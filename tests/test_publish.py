@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import publish
+import store as st
+
+
+def makeStore(n: int) -> st.BodyStore:
+    """
+    > return: Store of n bodies, body i at (i, i + 0.5), of extent (2, 3)
+    """
+    store = st.BodyStore(n)
+    for i in range(n):
+        store.pos[2 * i], store.pos[2 * i + 1] = i, i + 0.5
+        store.ext[2 * i], store.ext[2 * i + 1] = 2, 3
+    store.cnt = n
+    return store
+
+
+class PublishTest(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.pub    = publish.Publisher(self.path, 4)
+        self.reader = publish.Reader(self.path)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(self.reader.close)
+        self.addCleanup(self.pub.close)
+
+    def assertFrame(self, snap: publish.Snapshot, n: int) -> None:
+        self.assertIsNotNone(snap)
+        self.assertTrue(snap.valid())
+        self.assertEqual(snap.cnt, n)
+        ext = list(memoryview(snap.ext).cast('B').cast('d'))
+        pos = list(memoryview(snap.pos).cast('B').cast('d'))
+        self.assertEqual(ext, [2.0, 3.0] * n)
+        self.assertEqual(pos, [v for i in range(n) for v in (i, i + 0.5)])
+
+    def test_nothingPublished(self) -> None:
+        self.assertIsNone(self.reader.read(retries=3))
+
+    def test_read(self) -> None:
+        self.pub.publish(makeStore(3))
+        self.assertFrame(self.reader.read(), 3)
+        self.pub.publish(makeStore(4))
+        self.assertFrame(self.reader.copy(), 4)
+
+    def test_readWhileGrowing(self) -> None:
+        # Both slots written, the latest being the first one, which does not
+        # move when the file grows
+        for _ in range(3):
+            self.pub.publish(makeStore(3))
+        old = self.reader.read()
+        self.assertFrame(old, 3)
+        # Between the resize and the first frame of the new layout, the
+        # slots of neither layout may be taken for complete frames
+        self.pub._map(16)
+        self.assertFalse(old.valid())
+        self.assertIsNone(self.reader.read(retries=3))
+        self.pub.publish(makeStore(10))
+        self.assertFalse(old.valid())
+        self.assertFrame(self.reader.read(), 10)
+
+    def test_overwritten(self) -> None:
+        self.pub.publish(makeStore(2))
+        snap = self.reader.read()
+        self.pub.publish(makeStore(2))
+        self.assertTrue(snap.valid())
+        self.pub.publish(makeStore(2))
+        self.assertFalse(snap.valid())
+
+
+if __name__ == "__main__":
+    unittest.main()
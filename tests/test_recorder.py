@@ -0,0 +1,43 @@
+import os
+import sys
+import logging  as lg
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT + os.sep + "core")
+sys.path.insert(0, ROOT)
+import engine
+import recorder
+import render
+import replay
+
+
+class RecorderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_overlays(self) -> None:
+        eng = engine.Engine(None, lg.getLogger("test"),
+                            {"seed": 0, "collide": False, "record": self.path,
+                             "debug": ["fps", "objc", "prof"]})
+        try:
+            # More frames than between two keyframes
+            eng.runHeadless(recorder.KEY_INTERVAL + 5, 20)
+        finally:
+            eng.close()
+        reader = recorder.Reader(self.path)
+        self.addCleanup(reader.close)
+        win   = render.OffscreenWin(*eng.termSize)
+        frame = reader.seek(0)
+        for k in range(len(reader)):
+            frame = reader.apply(frame, k)
+            self.assertTrue(all(render.DIRTY not in row
+                                for row in frame.rows), k)
+            replay.draw(win, frame, k % 10 == 0, f" {k} ")
+
+
+if __name__ == "__main__":
+    unittest.main()
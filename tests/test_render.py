@@ -0,0 +1,92 @@
+import logging  as lg
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import engine
+import objects  as objs
+import render
+import scene
+import vecphys
+
+
+class OverlayTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.win      = render.OffscreenWin(6, 20)
+        self.renderer = render.Renderer(self.win)
+        self.clean    = self.win.lines()
+
+    def blank(self) -> list[bytearray]:
+        return [bytearray(self.renderer.blank)
+                for _ in self.renderer.front]
+
+    def test_interior(self) -> None:
+        self.renderer.present(self.blank())
+        self.renderer.overlay(2, 1, "profile", 18)
+        self.renderer.present(self.blank())
+        self.assertEqual(self.win.lines(), self.clean)
+
+    def test_border(self) -> None:
+        self.renderer.present(self.blank())
+        self.renderer.overlay(0, 10, "FPS=60.0000", 20)
+        self.renderer.overlay(5, 8, "@T=1 OBJCNT=1000", 20)
+        self.renderer.present(self.blank())
+        self.assertEqual(self.win.lines(), self.clean)
+
+
+class ViewTest(unittest.TestCase):
+    def test_inView(self) -> None:
+        # A world larger than the window: drawing only the bodies found in
+        # view draws the same as drawing every body
+        for numpy in {False, vecphys.AVAILABLE}:
+            available, vecphys.AVAILABLE = vecphys.AVAILABLE, numpy
+            try:
+                self.compare(numpy)
+            finally:
+                vecphys.AVAILABLE = available
+
+    def compare(self, numpy: bool) -> None:
+        eng = engine.Engine(None, lg.getLogger(__name__),
+                            {"seed": 0, "worldSize": (60, 200)})
+        eng._spawnDefaultScene(500)
+        for _ in range(30):
+            eng.update(engine.DEFAULT_DT)
+        frames = []
+        for ids in (eng._inView, lambda rect, store: None):
+            renderer = render.Renderer(render.OffscreenWin(20, 40))
+            renderer.follow(100.0, 30.0, 2, 2, eng.worldSize)
+            renderer.present(renderer.compose(
+                eng.movObjs, eng.store, eng.player,
+                ids=ids(renderer.view(), eng.store)))
+            frames.append(renderer.win.lines())
+        eng.close()
+        self.assertEqual(frames[0], frames[1], numpy)
+
+
+class TextTest(unittest.TestCase):
+    def test_sprite(self) -> None:
+        # Drawn one byte per cell, so not replaced by '?' but refused
+        self.assertEqual(objs.textSprite("ab\ncd").data, (b"ab", b"cd"))
+        for txt in ("\u00e9", "a\u2588", "a\0", "a\tb"):
+            with self.assertRaises(ValueError):
+                objs.textSprite(txt)
+
+    def test_scene(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scene.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# Sc\u00e8ne\nwall 5 5 3 2 0.5 #\n"
+                        "wall 9 5 3 2 0.5 \u2588\n")
+            eng = engine.Engine(None, lg.getLogger(__name__),
+                                {"worldSize": (40, 40)})
+            with self.assertRaisesRegex(ValueError, "scene.txt:3: "):
+                scene.load(eng, path)
+            eng.close()
+            self.assertEqual(len(eng.intWalls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
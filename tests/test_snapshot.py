@@ -0,0 +1,57 @@
+import logging as lg
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import engine
+
+
+class SettingsTest(unittest.TestCase):
+    # Taken with other settings than the engine defaults
+    ARGS = {"integrator": "verlet", "drag": 0.5, "gravity": 3.0}
+
+    def setUp(self) -> None:
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snap.bin")
+        eng       = self.engine(self.ARGS)
+        eng._spawnDefaultScene(50)
+        eng.update(engine.DEFAULT_DT)
+        eng.saveSnapshot(self.path)
+        eng.update(engine.DEFAULT_DT)
+        self.want = bytes(eng.store.pos[:2 * eng.store.cnt])
+        eng.close()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def engine(self, args: dict) -> engine.Engine:
+        return engine.Engine(None, lg.getLogger(__name__),
+                             {"seed": 0, "worldSize": (40, 120), **args})
+
+    def test_restored(self) -> None:
+        # Whether given the same settings or none, the run resumes as it was
+        for args in ({}, self.ARGS):
+            eng = self.engine(args)
+            eng.loadSnapshot(self.path)
+            self.assertEqual((eng.integrator, eng.drag, eng.gravity),
+                             ("verlet", 0.5, 3.0))
+            eng.update(engine.DEFAULT_DT)
+            self.assertEqual(bytes(eng.store.pos[:2 * eng.store.cnt]),
+                             self.want)
+            eng.close()
+
+    def test_conflict(self) -> None:
+        for key, val in (("integrator", "rk4"), ("drag", 0.0),
+                         ("gravity", 10.0)):
+            eng = self.engine({key: val})
+            with self.assertRaisesRegex(ValueError, key):
+                eng.loadSnapshot(self.path)
+            self.assertEqual(eng.store.cnt, 0)
+            eng.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                + os.sep + "core")
+import spatial
+
+
+class SpatialHashTest(unittest.TestCase):
+    def test_fractionalBounds(self) -> None:
+        # Bodies of extent 1 (so cells of size 1) at x = 10.2 and x = 11.2
+        grid = spatial.SpatialHash()
+        grid.build([10.2, 0.0, 11.2, 0.0], [1, 1, 1, 1], range(2))
+        self.assertIn(0, grid.query(0, 0, 10.5, 1))
+        self.assertNotIn(1, grid.query(0, 0, 10.5, 1))
+        self.assertIn(0, grid.query(0, 0, 11.0, 0.5))
+        # Widened by a fractional reach, as the wall queries are
+        self.assertIn(0, grid.query(12.7 - 2.5, -0.3, 8.0 + 2.5, 0.7))
+
+    def test_integerBounds(self) -> None:
+        grid = spatial.SpatialHash()
+        grid.build([10.0, 0.0], [1, 1], range(1))
+        self.assertIn(0, grid.query(0, 0, 11, 1))
+
+
+@unittest.skipIf(spatial.np is None, "NumPy is not installed")
+class CellGridTest(unittest.TestCase):
+    def test_fractionalBounds(self) -> None:
+        np   = spatial.np
+        grid = spatial.CellGrid()
+        # Cells of size MIN_CELL, the body being in the third column of them
+        x    = 2 * spatial.MIN_CELL + 0.2
+        grid.build(np.array([[x, 0.0]]), np.array([[1.0, 1.0]]), (40, 40))
+        self.assertEqual(grid.query(0, 0, x + 0.3, 1).tolist(), [0])
+        self.assertEqual(grid.query(0, 0, x - 0.2, 1).tolist(), [])
+
+    def test_pairs(self) -> None:
+        # The same pairs as SpatialHash, once each, bodies spanning cells
+        np   = spatial.np
+        rng  = np.random.default_rng(1)
+        pos  = rng.uniform(0, 60, (300, 2))
+        ext  = rng.uniform(1, 6, (300, 2))
+        grid = spatial.CellGrid()
+        grid.build(pos, ext, (60, 60))
+        i, j = grid.pairs()
+        hash = spatial.SpatialHash()
+        hash.build(pos.reshape(-1).tolist(), ext.reshape(-1).tolist(),
+                   range(len(pos)))
+        got  = sorted(zip(np.minimum(i, j).tolist(),
+                          np.maximum(i, j).tolist()))
+        self.assertEqual(len(got), len(set(got)))
+        self.assertEqual(set(got), {(min(a, b), max(a, b))
+                                    for a, b in hash.pairs()})
+
+
+if __name__ == "__main__":
+    unittest.main()